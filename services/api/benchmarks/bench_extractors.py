@@ -0,0 +1,61 @@
+import argparse
+import time
+
+from worker import html_text
+
+SIZES = {
+    "100KB": 100_000,
+    "1MB": 1_000_000,
+    "10MB": 10_000_000,
+}
+BLOCK = (
+    '<div class="post"><h2><a href="/p/{i}">Post {i}</a></h2>'
+    "<p>Lorem ipsum dolor sit amet, <b>consectetur</b> adipiscing elit &amp; "
+    "sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.</p>"
+    "<!-- tracking --><script>window.dataLayer.push({{id: {i}}});</script>"
+    '<ul><li>one</li><li>two</li><li>caf&eacute;</li></ul><img src="/i/{i}.png">'
+    "</div>\n"
+)
+
+
+def page(target_bytes: int) -> bytes:
+    blocks, size, i = [], 0, 0
+    while size < target_bytes:
+        blocks.append(BLOCK.format(i=i))
+        size += len(blocks[-1])
+        i += 1
+    return f"<html><body>{''.join(blocks)}</body></html>".encode()
+
+
+def measure(label: str, engine: str, content: bytes, repeat: int) -> None:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        strings = html_text.stripped_strings(content, engine)
+    elapsed = (time.perf_counter() - started) / repeat
+    print(
+        f"{label:>10} {engine:<8} {elapsed * 1000:>10.2f}ms "
+        f"{len(content) / elapsed / 1_000_000:>8.2f}MB/s {len(strings):>10} strings",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare HTML text extraction engine throughput"
+    )
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=SIZES)
+    parser.add_argument("--engines", nargs="+", default=html_text.ENGINES)
+    parser.add_argument("--files", nargs="*", default=[])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    pages = [(size, page(SIZES[size])) for size in args.sizes]
+    for path in args.files:
+        with open(path, "rb") as f:
+            pages.append((path.rsplit("/", 1)[-1][:10], f.read()))
+    for label, content in pages:
+        for engine in args.engines:
+            measure(label, engine, content, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import multiprocessing
+import re
+import time
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from worker import word_histogram
+
+SIZES = {
+    "1KB": 1_000,
+    "1MB": 1_000_000,
+    "10MB": 10_000_000,
+    "100MB": 100_000_000,
+    "500MB": 500_000_000,
+}
+WORDS = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit; sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua. Don't stop the users' "
+    "n4t3 under_score 'quoted' words\n"
+)
+UNICODE_WORDS = "Café naïve ΟΔΥΣΣΕΥΣ straße Ἀθῆναι d'été\n"
+
+
+def text(target_chars: int, unicode: bool) -> str:
+    block = WORDS + UNICODE_WORDS if unicode else WORDS
+    return (block * (target_chars // len(block) + 1))[:target_chars]
+
+
+def measure(label: str, name: str, build, string: str, repeat: int) -> None:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        histogram = build(string)
+    elapsed = (time.perf_counter() - started) / repeat
+    print(
+        f"{label:>6} {name:<10} {elapsed * 1000:>10.2f}ms "
+        f"{len(string) / elapsed / 1_000_000:>8.2f}MB/s {len(histogram):>8} words",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare word histogram construction throughput"
+    )
+    parser.add_argument(
+        "--sizes", nargs="+", default=["1KB", "1MB", "10MB", "100MB"], choices=SIZES
+    )
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--chunk-chars", type=int, default=word_histogram.CHUNK_CHARS)
+    parser.add_argument("--unicode", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    pattern = re.compile(word_histogram.WORDS.pattern)
+    with ProcessPoolExecutor(
+        args.processes, mp_context=multiprocessing.get_context("forkserver")
+    ) as executor:
+        builds = {
+            "regex": lambda s: dict(Counter(pattern.findall(s.lower()))),
+            "build": word_histogram.build,
+            "parallel": lambda s: word_histogram.build_parallel(
+                s, executor, args.chunk_chars
+            ),
+        }
+        for size in args.sizes:
+            string = text(SIZES[size], args.unicode)
+            for name, build in builds.items():
+                measure(size, name, build, string, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
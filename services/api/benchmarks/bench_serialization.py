@@ -0,0 +1,73 @@
+import argparse
+import json
+import time
+import tracemalloc
+
+from typing import Any, Callable, Iterable
+
+from web import serialization
+
+SIZES = {
+    "1KB": 1_000,
+    "10KB": 10_000,
+    "100KB": 100_000,
+    "1MB": 1_000_000,
+    "10MB": 10_000_000,
+    "50MB": 50_000_000,
+}
+
+
+def job_payload(target_bytes: int) -> dict[str, Any]:
+    entries = max(1, target_bytes // len(b'"word000000":123,'))
+    return {
+        "success": True,
+        "message": "Fetched Job: 625f4e3229942e20c16ca336",
+        "data": {
+            "job_id": "625f4e3229942e20c16ca336",
+            "status": "COMPLETE",
+            "url": "https://www.gutenberg.org/files/2600/2600-h/2600-h.htm",
+            "word_count": {f"word{i:06}": i % 997 for i in range(entries)},
+        },
+    }
+
+
+def measure(label: str, size: str, run: Callable[[], Iterable[bytes]]) -> None:
+    started = time.perf_counter()
+    length = sum(len(chunk) for chunk in run())
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    sum(len(chunk) for chunk in run())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(
+        f"{size:>6} {label:<22} {elapsed * 1000:>10.2f}ms {length:>12}B "
+        f"peak {peak / 1_000_000:>8.2f}MB",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare job response serialization and compression strategies"
+    )
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=SIZES)
+    parser.add_argument("--chunk-bytes", type=int, default=65536)
+    args = parser.parse_args()
+    for size in args.sizes:
+        payload = job_payload(SIZES[size])
+
+        def streamed(encoding=None):
+            chunks = serialization.iter_encode(payload)
+            return serialization.compress(
+                serialization.buffered(chunks, args.chunk_bytes), encoding
+            )
+
+        measure("stdlib json", size, lambda: [json.dumps(payload).encode()])
+        measure("orjson", size, lambda: [serialization.encode(payload)])
+        measure("orjson streamed", size, streamed)
+        measure("orjson streamed gzip", size, lambda: streamed("gzip"))
+        measure("orjson streamed zstd", size, lambda: streamed("zstd"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import time
+
+import bson
+
+from common.mongo.models import histogram as Histogram
+from common.mongo.models import job as Job
+
+SIZES = {
+    "1K": 1_000,
+    "10K": 10_000,
+    "100K": 100_000,
+    "1M": 1_000_000,
+}
+
+
+def word_count(distinct: int) -> dict[str, int]:
+    return {f"w{i:x}ord": max(distinct // (i + 1), 1) for i in range(distinct)}
+
+
+def document_format(histogram: dict[str, int]) -> bytes:
+    return bson.encode({"word_count": histogram, "word_ranking": Job.rank(histogram)})
+
+
+def blob_format(histogram: dict[str, int]) -> bytes:
+    blob = Histogram.encode(histogram)
+    return bson.encode({Histogram.FIELD: Histogram.inline(blob, len(histogram))})
+
+
+def document_decode(encoded: bytes) -> dict[str, int]:
+    return bson.decode(encoded)["word_count"]
+
+
+def blob_decode(encoded: bytes) -> dict[str, int]:
+    return Histogram.decode(bson.decode(encoded)[Histogram.FIELD]["blob"])
+
+
+def timed(function, argument, repeat: int) -> tuple[float, object]:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function(argument)
+    return (time.perf_counter() - started) / repeat, result
+
+
+def measure(label: str, name: str, encode, decode, histogram, repeat: int) -> None:
+    encode_time, encoded = timed(encode, histogram, repeat)
+    decode_time, _ = timed(decode, encoded, repeat)
+    print(
+        f"{label:>5} {name:<9} {len(encoded) / 1000:>10.1f}KB "
+        f"encode {encode_time * 1000:>9.2f}ms decode {decode_time * 1000:>9.2f}ms",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare histogram storage size and encode/decode time"
+    )
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for size in args.sizes:
+        histogram = word_count(SIZES[size])
+        measure(
+            size, "document", document_format, document_decode, histogram, args.repeat
+        )
+        measure(size, "blob", blob_format, blob_decode, histogram, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
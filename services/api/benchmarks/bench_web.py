@@ -0,0 +1,69 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+from typing import Any
+
+import aiohttp
+
+
+async def run(base_url: str, total: int, concurrency: int) -> dict[str, Any]:
+    async def submit_and_poll(session: aiohttp.ClientSession) -> None:
+        started = time.perf_counter()
+        async with session.post(
+            f"{base_url}/word-count", json={"url": "https://example.com"}
+        ) as response:
+            job_id = (await response.json())["data"]["job_id"]
+        async with session.get(
+            f"{base_url}/word-count", json={"job_id": job_id}
+        ) as response:
+            await response.read()
+            statuses.append(response.status)
+        latencies.append(time.perf_counter() - started)
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        while remaining:
+            remaining.pop()
+            try:
+                await submit_and_poll(session)
+            except (aiohttp.ClientError, KeyError, ValueError):
+                errors.append(1)
+
+    latencies: list[float] = []
+    statuses: list[int] = []
+    errors: list[int] = []
+    remaining = list(range(total))
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else []
+    return {
+        "base_url": base_url,
+        "requests": total * 2,
+        "concurrency": concurrency,
+        "errors": len(errors) + sum(1 for s in statuses if s != 200),
+        "requests_per_second": round(total * 2 / elapsed, 1),
+        "p50_ms": round(quantiles[49] * 1000, 1) if quantiles else None,
+        "p95_ms": round(quantiles[94] * 1000, 1) if quantiles else None,
+        "p99_ms": round(quantiles[98] * 1000, 1) if quantiles else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare POST + GET /word-count throughput between web tiers"
+    )
+    parser.add_argument("base_urls", nargs="+")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    for concurrency in args.concurrency:
+        for base_url in args.base_urls:
+            print(asyncio.run(run(base_url, args.requests, concurrency)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
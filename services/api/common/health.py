@@ -0,0 +1,112 @@
+import asyncio
+import os
+import threading
+import time
+
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+HealthStatus = Enum("HealthStatus", "PASS FAIL")
+Probe = Callable[[], bool]
+AsyncProbe = Callable[[], Awaitable[bool]]
+
+
+class _HealthState:
+    def __init__(self, names: Iterable[str], interval: float):
+        self._interval = interval
+        self._state: dict[str, dict[str, Any]] = {
+            name: {
+                "healthy": False,
+                "latency_ms": None,
+                "last_checked": None,
+                "last_success": None,
+            }
+            for name in names
+        }
+
+    @property
+    def is_healthy(self) -> bool:
+        return all(dependency["healthy"] for dependency in self._state.values())
+
+    @property
+    def report(self) -> dict[str, dict[str, Any]]:
+        return {name: dict(dependency) for name, dependency in self._state.items()}
+
+    def _record(self, name: str, healthy: bool, started: float) -> None:
+        latency_ms = round((time.perf_counter() - started) * 1000, 3)
+        checked_at = datetime.now(timezone.utc).isoformat()
+        last_success = checked_at if healthy else self._state[name]["last_success"]
+        self._state = {
+            **self._state,
+            name: {
+                "healthy": healthy,
+                "latency_ms": latency_ms,
+                "last_checked": checked_at,
+                "last_success": last_success,
+            },
+        }
+
+
+class HealthMonitor(_HealthState):
+    def __init__(self, probes: dict[str, Probe], interval: float):
+        super().__init__(probes, interval)
+        self._probes = probes
+        self._lock = threading.Lock()
+        self._started_pid: Optional[int] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+        self.refresh()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def refresh(self) -> None:
+        for name, probe in self._probes.items():
+            started = time.perf_counter()
+            try:
+                healthy = bool(probe())
+            except Exception:
+                healthy = False
+            self._record(name, healthy, started)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self._interval)
+            self.refresh()
+
+
+class AsyncHealthMonitor(_HealthState):
+    def __init__(self, probes: dict[str, AsyncProbe], interval: float, timeout: float):
+        super().__init__(probes, interval)
+        self._probes = probes
+        self._timeout = timeout
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self.refresh()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+
+    async def refresh(self) -> None:
+        await asyncio.gather(*(self._check(n, p) for n, p in self._probes.items()))
+
+    async def _check(self, name: str, probe: AsyncProbe) -> None:
+        started = time.perf_counter()
+        try:
+            healthy = bool(await asyncio.wait_for(probe(), self._timeout))
+        except Exception:
+            healthy = False
+        self._record(name, healthy, started)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            await self.refresh()
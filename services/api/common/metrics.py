@@ -0,0 +1,63 @@
+import math
+import threading
+
+from collections import defaultdict, deque
+from typing import Any
+
+SAMPLE_WINDOW = 1024
+PERCENTILES = [50, 90, 99]
+
+_lock = threading.Lock()
+_counters: dict[str, int] = defaultdict(int)
+_gauges: dict[str, float] = {}
+_samples: dict[str, deque[float]] = {}
+
+
+def increment(name: str, amount: int = 1) -> None:
+    with _lock:
+        _counters[name] += amount
+
+
+def set_gauge(name: str, value: float) -> None:
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, value: float) -> None:
+    with _lock:
+        if name not in _samples:
+            _samples[name] = deque(maxlen=SAMPLE_WINDOW)
+        _samples[name].append(value)
+
+
+def discard(prefix: str) -> None:
+    with _lock:
+        for series in (_counters, _gauges, _samples):
+            for name in [name for name in series if name.startswith(prefix)]:
+                del series[name]
+
+
+def snapshot() -> dict[str, Any]:
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "percentiles": {
+                name: _percentiles(samples) for name, samples in _samples.items()
+            },
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _samples.clear()
+
+
+def _percentiles(samples: deque[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        f"p{p}": ordered[max(math.ceil(len(ordered) * p / 100) - 1, 0)]
+        for p in PERCENTILES
+    }
@@ -0,0 +1,70 @@
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import DESCENDING
+from pymongo.errors import PyMongoError
+from pymongo.results import InsertOneResult
+from typing import Optional, Any
+from bson.objectid import ObjectId as OID
+
+
+class AsyncMongoDBClient:
+    def __init__(self, host: str, db: str, health_timeout: float = 2.0):
+        self.client = AsyncIOMotorClient(host, 27017)
+        self.db = self.client[db]
+        timeout_ms = int(health_timeout * 1000)
+        self._health_client = AsyncIOMotorClient(
+            host,
+            27017,
+            serverSelectionTimeoutMS=timeout_ms,
+            connectTimeoutMS=timeout_ms,
+            socketTimeoutMS=timeout_ms,
+        )
+
+    async def create(
+        self, collection: str, document: dict[str, Any]
+    ) -> InsertOneResult:
+        result: InsertOneResult = await self.db[collection].insert_one(document)
+        return result
+
+    async def retrieve(
+        self,
+        collection: str,
+        oid: str,
+        projection: Optional[dict[str, Any]] = None,
+    ) -> Optional[Any]:
+        return await self.db[collection].find_one(OID(oid), projection)
+
+    async def retrieve_latest(
+        self,
+        collection: str,
+        query: dict[str, Any],
+        sort_key: str,
+        projection: Optional[dict[str, Any]] = None,
+    ) -> Optional[Any]:
+        return await self.db[collection].find_one(
+            query, projection, sort=[(sort_key, DESCENDING)]
+        )
+
+    async def aggregate(
+        self, collection: str, pipeline: list[dict[str, Any]]
+    ) -> list[Any]:
+        cursor = self.db[collection].aggregate(pipeline)
+        documents: list[Any] = await cursor.to_list(length=None)
+        return documents
+
+    async def count(self, collection: str, query: dict[str, Any]) -> int:
+        count: int = await self.db[collection].count_documents(query)
+        return count
+
+    async def get_file(self, bucket: str, file_id: OID) -> bytes:
+        stream = await AsyncIOMotorGridFSBucket(self.db, bucket).open_download_stream(
+            file_id
+        )
+        blob: bytes = await stream.read()
+        return blob
+
+    async def is_healthy(self) -> bool:
+        try:
+            response = await self._health_client.admin.command("ping")
+            return bool(response.get("ok"))
+        except PyMongoError:
+            return False
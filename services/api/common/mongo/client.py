@@ -1,26 +1,128 @@
-from pymongo import MongoClient
-from pymongo.errors import ServerSelectionTimeoutError
-from pymongo.results import InsertOneResult, UpdateResult
+from gridfs import GridFSBucket
+from pymongo import DESCENDING, MongoClient, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import PyMongoError
+from pymongo.results import (
+    BulkWriteResult,
+    InsertManyResult,
+    InsertOneResult,
+    UpdateResult,
+)
 from typing import Optional, Any
 from bson.objectid import ObjectId as OID
 
 
 class MongoDBClient:
-    def __init__(self, host: str, db: str):
+    def __init__(self, host: str, db: str, health_timeout: float = 2.0):
         self.client: MongoClient = MongoClient(host, 27017)
+        timeout_ms = int(health_timeout * 1000)
+        self._health_client: MongoClient = MongoClient(
+            host,
+            27017,
+            serverSelectionTimeoutMS=timeout_ms,
+            connectTimeoutMS=timeout_ms,
+            socketTimeoutMS=timeout_ms,
+        )
         self.db = self.client[db]
 
     def create(self, collection: str, document: dict[str, Any]) -> InsertOneResult:
         return self.db[collection].insert_one(document)
 
+    def create_many(
+        self, collection: str, documents: list[dict[str, Any]]
+    ) -> InsertManyResult:
+        return self.db[collection].insert_many(documents)
+
     def update(
         self, collection: str, oid: str, updates: dict[str, Any]
     ) -> UpdateResult:
 
         return self.db[collection].update_one(self._id_query(oid), {"$set": updates})
 
-    def retrieve(self, collection: str, oid: str) -> Optional[Any]:
-        return self.db[collection].find_one(OID(oid))
+    def bulk_update(
+        self, collection: str, updates: list[tuple[str, dict[str, Any]]]
+    ) -> BulkWriteResult:
+        return self.db[collection].bulk_write(
+            [
+                UpdateOne(self._id_query(oid), {"$set": update})
+                for oid, update in updates
+            ],
+            ordered=False,
+        )
+
+    def replace(
+        self, collection: str, oid: str, document: dict[str, Any]
+    ) -> UpdateResult:
+        return self.db[collection].replace_one(
+            self._id_query(oid), document, upsert=True
+        )
+
+    def bulk_replace(
+        self, collection: str, documents: list[tuple[str, dict[str, Any]]]
+    ) -> BulkWriteResult:
+        return self.db[collection].bulk_write(
+            [
+                ReplaceOne(self._id_query(oid), document, upsert=True)
+                for oid, document in documents
+            ],
+            ordered=False,
+        )
+
+    def update_and_retrieve(
+        self,
+        collection: str,
+        oid: str,
+        updates: dict[str, Any],
+        projection: Optional[dict[str, Any]] = None,
+    ) -> Optional[Any]:
+        return self.db[collection].find_one_and_update(
+            self._id_query(oid),
+            {"$set": updates},
+            projection=projection,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def retrieve(
+        self,
+        collection: str,
+        oid: str,
+        projection: Optional[dict[str, Any]] = None,
+    ) -> Optional[Any]:
+        return self.db[collection].find_one(OID(oid), projection)
+
+    def retrieve_many(
+        self,
+        collection: str,
+        oids: list[str],
+        projection: Optional[dict[str, Any]] = None,
+    ) -> list[Any]:
+        query = {"_id": {"$in": [OID(oid) for oid in oids]}}
+        return list(self.db[collection].find(query, projection))
+
+    def retrieve_latest(
+        self,
+        collection: str,
+        query: dict[str, Any],
+        sort_key: str,
+        projection: Optional[dict[str, Any]] = None,
+    ) -> Optional[Any]:
+        return self.db[collection].find_one(
+            query, projection, sort=[(sort_key, DESCENDING)]
+        )
+
+    def aggregate(self, collection: str, pipeline: list[dict[str, Any]]) -> list[Any]:
+        return list(self.db[collection].aggregate(pipeline))
+
+    def put_file(self, bucket: str, data: bytes) -> OID:
+        return GridFSBucket(self.db, bucket).upload_from_stream(bucket, data)
+
+    def get_file(self, bucket: str, file_id: OID) -> bytes:
+        return GridFSBucket(self.db, bucket).open_download_stream(file_id).read()
+
+    def create_index(self, collection: str, keys: list[tuple[str, int]]) -> str:
+        return self.db[collection].create_index(keys)
+
+    def count(self, collection: str, query: dict[str, Any]) -> int:
+        return self.db[collection].count_documents(query)
 
     def exists(self, collection: str, oid: str) -> bool:
         return bool(self.db[collection].count_documents(self._id_query(oid), limit=1))
@@ -28,8 +130,8 @@ class MongoDBClient:
     @property
     def is_healthy(self) -> bool:
         try:
-            return bool(self.client.server_info())
-        except ServerSelectionTimeoutError:
+            return bool(self._health_client.admin.command("ping").get("ok"))
+        except PyMongoError:
             return False
 
     def _id_query(self, oid) -> dict[str, OID]:
@@ -0,0 +1,97 @@
+import time
+
+from typing import Any, Optional
+
+from common.mongo.async_client import AsyncMongoDBClient
+from common.mongo.models import histogram as Histogram
+from common.mongo.models.job import (
+    COLLECTION,
+    HISTOGRAM_FIELDS,
+    cache_query,
+    fresh_view,
+    histogram_source,
+    histogram_view,
+    new_document,
+    public_view,
+    ranking_pipeline,
+    ranking_view,
+    shared_view,
+)
+
+
+async def create(mongodb_client: AsyncMongoDBClient, url: str) -> dict[str, Any]:
+    document = new_document(url)
+    await mongodb_client.create(COLLECTION, document)
+    return public_view(document)
+
+
+async def fetch(
+    mongodb_client: AsyncMongoDBClient, oid: str
+) -> Optional[dict[str, Any]]:
+    document = await mongodb_client.retrieve(COLLECTION, oid)
+    if document is None:
+        return None
+    source = None
+    if source_oid := histogram_source(document):
+        source = await mongodb_client.retrieve(
+            Histogram.COLLECTION, source_oid, projection={"word_ranking": False}
+        )
+        document = shared_view(document, source)
+    stored = source.get(Histogram.FIELD) if source else None
+    blob = await load_histogram(mongodb_client, stored) if stored else None
+    return histogram_view(document, blob)
+
+
+async def fetch_ranking(
+    mongodb_client: AsyncMongoDBClient,
+    oid: str,
+    limit: int,
+    offset: int = 0,
+    min_count: int = 0,
+    prefix: str = "",
+) -> Optional[dict[str, Any]]:
+    documents = await mongodb_client.aggregate(
+        COLLECTION, ranking_pipeline(oid, limit, offset, min_count, prefix)
+    )
+    if not documents:
+        return None
+    document = documents[0]
+    source = None
+    if source_oid := histogram_source(document):
+        sources = await mongodb_client.aggregate(
+            Histogram.COLLECTION,
+            ranking_pipeline(source_oid, limit, offset, min_count, prefix, ranked=True),
+        )
+        source = sources[0] if sources else None
+        document = shared_view(document, source)
+    stored = source.get(Histogram.FIELD) if source else None
+    blob = await load_histogram(mongodb_client, stored) if stored else None
+    return ranking_view(document, limit, offset, min_count, prefix, blob)
+
+
+async def find_cached(
+    mongodb_client: AsyncMongoDBClient, url: str, max_age: float
+) -> Optional[dict[str, Any]]:
+    latest = await mongodb_client.retrieve_latest(
+        COLLECTION,
+        cache_query(url),
+        "completed_at",
+        projection={field: False for field in HISTOGRAM_FIELDS},
+    )
+    return fresh_view(latest, max_age)
+
+
+async def drain_rate(mongodb_client: AsyncMongoDBClient, window: float) -> float:
+    finished = await mongodb_client.count(
+        COLLECTION, {"completed_at": {"$gte": time.time() - window}}
+    )
+    return finished / window
+
+
+async def load_histogram(
+    mongodb_client: AsyncMongoDBClient, stored: dict[str, Any]
+) -> bytes:
+    if "blob" in stored:
+        blob: bytes = stored["blob"]
+        return blob
+    return await mongodb_client.get_file(Histogram.BUCKET, stored["file_id"])
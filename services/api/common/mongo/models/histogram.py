@@ -0,0 +1,64 @@
+import struct
+import sys
+import zlib
+
+from array import array
+from itertools import islice, takewhile
+from typing import Any, Iterator
+
+from bson.binary import Binary
+
+COLLECTION = "histograms"
+FIELD = "word_histogram"
+BUCKET = "histograms"
+ENCODING = "columnar-zlib"
+STORAGE_FORMATS = ["document", "blob"]
+INLINE_MAX_BYTES = 4 * 1024 * 1024
+COMPRESSION_LEVEL = 6
+HEADER = struct.Struct("<QQ")
+
+
+def encode(word_count: dict[str, int]) -> bytes:
+    ranked = sorted(word_count.items(), key=lambda e: (-e[1], e[0]))
+    words = "\0".join(word for word, _ in ranked).encode()
+    counts = array("Q", (count for _, count in ranked))
+    if sys.byteorder == "big":
+        counts.byteswap()
+    words = zlib.compress(words, COMPRESSION_LEVEL)
+    return (
+        HEADER.pack(len(ranked), len(words))
+        + words
+        + zlib.compress(counts.tobytes(), COMPRESSION_LEVEL)
+    )
+
+
+def decode(blob: bytes) -> dict[str, int]:
+    return dict(entries(blob))
+
+
+def entries(blob: bytes) -> Iterator[tuple[str, int]]:
+    size, words_length = HEADER.unpack_from(blob)
+    if not size:
+        return iter(())
+    words_end = HEADER.size + words_length
+    words = zlib.decompress(blob[HEADER.size : words_end]).decode().split("\0")
+    counts = array("Q", zlib.decompress(blob[words_end:]))
+    if sys.byteorder == "big":
+        counts.byteswap()
+    return zip(words, counts)
+
+
+def ranking(
+    blob: bytes, limit: int, offset: int = 0, min_count: int = 0, prefix: str = ""
+) -> list[list[Any]]:
+    counted = takewhile(lambda e: e[1] >= min_count, entries(blob))
+    matching = (entry for entry in counted if entry[0].startswith(prefix))
+    return [[word, count] for word, count in islice(matching, offset, offset + limit)]
+
+
+def inline(blob: bytes, size: int) -> dict[str, Any]:
+    return {"encoding": ENCODING, "size": size, "blob": Binary(blob)}
+
+
+def spilled(file_id: Any, size: int) -> dict[str, Any]:
+    return {"encoding": ENCODING, "size": size, "file_id": file_id}
@@ -1,42 +1,444 @@
+import base64
+import binascii
+import time
+
 from enum import Enum
-from typing import Any
+from typing import Any, Callable, Optional
+
+from bson.objectid import ObjectId as OID
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
 
+from common import metrics, url as URL
 from common.mongo.client import MongoDBClient
+from common.mongo.models import histogram as Histogram
 
 COLLECTION = "jobs"
 JobStatus = Enum("JobStatus", "IN_PROGRESS COMPLETE FAIL")
+STATUS_FIELDS = ["status", "url", "error", "completed_at"]
+HISTOGRAM_FIELDS = ["word_count", "histogram_id"]
+SHARED_FIELDS = ["word_count", "word_ranking"]
+PRIVATE_FIELDS = ["_id", "url_key", "validators", "content_hash", "histogram_id"]
 
 
 def create(mongodb_client: MongoDBClient, url: str) -> dict[str, Any]:
-    oid = mongodb_client.create(
-        COLLECTION, {**_status(JobStatus.IN_PROGRESS), "url": url}
-    ).inserted_id
-    return fetch(mongodb_client, str(oid))
+    document = new_document(url)
+    mongodb_client.create(COLLECTION, document)
+    return public_view(document)
+
+
+def create_many(mongodb_client: MongoDBClient, urls: list[str]) -> list[dict[str, Any]]:
+    documents = [new_document(url) for url in urls]
+    mongodb_client.create_many(COLLECTION, documents)
+    return [public_view(document) for document in documents]
 
 
 def complete(
-    mongodb_client: MongoDBClient, oid: str, word_count: dict[str, Any]
+    mongodb_client: MongoDBClient,
+    oid: str,
+    word_count: dict[str, Any],
+    validators: Optional[dict[str, str]] = None,
+    storage: str = "document",
+    content_hash: Optional[str] = None,
+) -> Optional[dict[str, Any]]:
+    mongodb_client.replace(
+        Histogram.COLLECTION, oid, histogram(mongodb_client, word_count, storage)
+    )
+    updated = mongodb_client.update_and_retrieve(
+        COLLECTION,
+        oid,
+        completion(oid, validators, content_hash),
+        projection=_without(HISTOGRAM_FIELDS),
+    )
+    return public_view(updated) if updated else None
+
+
+def complete_shared(
+    mongodb_client: MongoDBClient,
+    oid: str,
+    histogram_id: str,
+    content_hash: str,
+    validators: Optional[dict[str, str]] = None,
+) -> Optional[dict[str, Any]]:
+    updated = mongodb_client.update_and_retrieve(
+        COLLECTION,
+        oid,
+        completion(histogram_id, validators, content_hash),
+        projection=_without(HISTOGRAM_FIELDS),
+    )
+    return public_view(updated) if updated else None
+
+
+def complete_from(
+    mongodb_client: MongoDBClient,
+    oid: str,
+    source_oid: str,
+    validators: Optional[dict[str, str]] = None,
+) -> Optional[dict[str, Any]]:
+    mongodb_client.aggregate(COLLECTION, copy_pipeline(oid, source_oid, validators))
+    document = mongodb_client.retrieve(
+        COLLECTION, oid, projection=_without(HISTOGRAM_FIELDS)
+    )
+    return public_view(document) if document else None
+
+
+def fail(
+    mongodb_client: MongoDBClient, oid: str, error: str
+) -> Optional[dict[str, Any]]:
+    updated = mongodb_client.update_and_retrieve(COLLECTION, oid, failure(error))
+    return public_view(updated) if updated else None
+
+
+def apply(
+    mongodb_client: MongoDBClient,
+    results: list[tuple[str, dict[str, Any], Optional[dict[str, Any]]]],
+) -> dict[int, str]:
+    def bulk_errors(write: Callable[[], Any], indices: list[int]) -> dict[int, str]:
+        if not indices:
+            return {}
+        try:
+            write()
+        except BulkWriteError as e:
+            return {
+                indices[error["index"]]: error["errmsg"]
+                for error in e.details["writeErrors"]
+            }
+        return {}
+
+    stored = {
+        i: (oid, histogram)
+        for i, (oid, _, histogram) in enumerate(results)
+        if histogram is not None
+    }
+    errors = bulk_errors(
+        lambda: mongodb_client.bulk_replace(
+            Histogram.COLLECTION, list(stored.values())
+        ),
+        list(stored),
+    )
+    updated = [i for i in range(len(results)) if i not in errors]
+    errors.update(
+        bulk_errors(
+            lambda: mongodb_client.bulk_update(
+                COLLECTION, [(results[i][0], results[i][1]) for i in updated]
+            ),
+            updated,
+        )
+    )
+    return errors
+
+
+def histogram(
+    mongodb_client: MongoDBClient, word_count: dict[str, Any], storage: str = "document"
 ) -> dict[str, Any]:
+    if storage == "document":
+        return {"word_count": word_count, "word_ranking": rank(word_count)}
+    if storage != "blob":
+        raise ValueError(f"Unknown histogram storage format: {storage}")
+    blob = Histogram.encode(word_count)
+    if len(blob) <= Histogram.INLINE_MAX_BYTES:
+        return {Histogram.FIELD: Histogram.inline(blob, len(word_count))}
+    file_id = mongodb_client.put_file(Histogram.BUCKET, blob)
+    return {Histogram.FIELD: Histogram.spilled(file_id, len(word_count))}
+
+
+def completion(
+    histogram_id: str,
+    validators: Optional[dict[str, str]] = None,
+    content_hash: Optional[str] = None,
+) -> dict[str, Any]:
+    return {
+        **_status(JobStatus.COMPLETE),
+        "histogram_id": OID(histogram_id),
+        "completed_at": time.time(),
+        **({"validators": validators} if validators else {}),
+        **({"content_hash": content_hash} if content_hash else {}),
+    }
+
+
+def failure(error: str) -> dict[str, Any]:
+    return {**_status(JobStatus.FAIL), "error": error, "completed_at": time.time()}
+
+
+def fetch(
+    mongodb_client: MongoDBClient, oid: str, histogram: bool = True
+) -> Optional[dict[str, Any]]:
+    document = mongodb_client.retrieve(
+        COLLECTION, oid, projection=None if histogram else _without(HISTOGRAM_FIELDS)
+    )
+    if document is None:
+        return None
+    if not histogram:
+        return public_view(document)
+    source = None
+    if source_oid := histogram_source(document):
+        source = mongodb_client.retrieve(
+            Histogram.COLLECTION, source_oid, projection=_without(["word_ranking"])
+        )
+        document = shared_view(document, source)
+    stored = source.get(Histogram.FIELD) if source else None
+    blob = load_histogram(mongodb_client, stored) if stored else None
+    return histogram_view(document, blob)
+
 
-    mongodb_client.update(
-        COLLECTION, oid, {**_status(JobStatus.COMPLETE), "word_count": word_count}
+def fetch_ranking(
+    mongodb_client: MongoDBClient,
+    oid: str,
+    limit: int,
+    offset: int = 0,
+    min_count: int = 0,
+    prefix: str = "",
+) -> Optional[dict[str, Any]]:
+    documents = mongodb_client.aggregate(
+        COLLECTION, ranking_pipeline(oid, limit, offset, min_count, prefix)
     )
-    return fetch(mongodb_client, oid)
+    if not documents:
+        return None
+    document = documents[0]
+    source = None
+    if source_oid := histogram_source(document):
+        sources = mongodb_client.aggregate(
+            Histogram.COLLECTION,
+            ranking_pipeline(source_oid, limit, offset, min_count, prefix, ranked=True),
+        )
+        source = sources[0] if sources else None
+        document = shared_view(document, source)
+    stored = source.get(Histogram.FIELD) if source else None
+    blob = load_histogram(mongodb_client, stored) if stored else None
+    return ranking_view(document, limit, offset, min_count, prefix, blob)
 
 
-def fail(mongodb_client: MongoDBClient, oid: str, error: str) -> dict[str, Any]:
-    mongodb_client.update(COLLECTION, oid, {**_status(JobStatus.FAIL), "error": error})
-    return fetch(mongodb_client, oid)
+def fetch_statuses(
+    mongodb_client: MongoDBClient, oids: list[str]
+) -> dict[str, dict[str, Any]]:
+    documents = mongodb_client.retrieve_many(
+        COLLECTION, oids, projection={field: True for field in STATUS_FIELDS}
+    )
+    return {view["job_id"]: view for view in map(public_view, documents)}
+
+
+def is_valid_id(oid: Any) -> bool:
+    return isinstance(oid, str) and OID.is_valid(oid)
+
+
+def find_cached(
+    mongodb_client: MongoDBClient, url: str, max_age: float
+) -> Optional[dict[str, Any]]:
+    latest = mongodb_client.retrieve_latest(
+        COLLECTION,
+        cache_query(url),
+        "completed_at",
+        projection=_without(HISTOGRAM_FIELDS),
+    )
+    return fresh_view(latest, max_age)
+
 
+def find_validated(mongodb_client: MongoDBClient, url: str) -> Optional[dict[str, Any]]:
+    latest = mongodb_client.retrieve_latest(
+        COLLECTION,
+        {**cache_query(url), "validators": {"$exists": True}},
+        "completed_at",
+        projection={"validators": True},
+    )
+    if latest is None:
+        return None
+    return {"job_id": str(latest["_id"]), "validators": latest["validators"]}
 
-def fetch(mongodb_client: MongoDBClient, oid: str) -> dict[str, Any]:
-    def public_view(obj) -> dict[str, Any]:
+
+def find_shared(mongodb_client: MongoDBClient, content_hash: str) -> Optional[str]:
+    latest = mongodb_client.retrieve_latest(
+        COLLECTION,
+        {
+            "content_hash": content_hash,
+            **_status(JobStatus.COMPLETE),
+            "histogram_id": {"$exists": True},
+        },
+        "completed_at",
+        projection={"histogram_id": True},
+    )
+    return str(latest["histogram_id"]) if latest else None
+
+
+def cache_query(url: str) -> dict[str, Any]:
+    return {"url_key": URL.normalize(url), **_status(JobStatus.COMPLETE)}
+
+
+def fresh_view(latest: Optional[Any], max_age: float) -> Optional[dict[str, Any]]:
+    if latest is None:
+        metrics.increment("result_cache.misses")
+        return None
+    if latest.get("completed_at", 0) < time.time() - max_age:
+        metrics.increment("result_cache.evictions")
+        return None
+    metrics.increment("result_cache.hits")
+    return public_view(latest)
+
+
+def drain_rate(mongodb_client: MongoDBClient, window: float) -> float:
+    finished = mongodb_client.count(
+        COLLECTION, {"completed_at": {"$gte": time.time() - window}}
+    )
+    return finished / window
+
+
+def ensure_indexes(mongodb_client: MongoDBClient) -> None:
+    mongodb_client.create_index(
+        COLLECTION,
+        [("url_key", ASCENDING), ("status", ASCENDING), ("completed_at", DESCENDING)],
+    )
+    mongodb_client.create_index(COLLECTION, [("completed_at", DESCENDING)])
+    mongodb_client.create_index(
+        COLLECTION,
+        [
+            ("content_hash", ASCENDING),
+            ("status", ASCENDING),
+            ("completed_at", DESCENDING),
+        ],
+    )
+
+
+def rank(word_count: dict[str, int]) -> list[list[Any]]:
+    return [
+        [word, count]
+        for word, count in sorted(word_count.items(), key=lambda e: (-e[1], e[0]))
+    ]
+
+
+def ranking_pipeline(
+    oid: str,
+    limit: int,
+    offset: int,
+    min_count: int,
+    prefix: str,
+    ranked: bool = False,
+) -> list[dict[str, Any]]:
+    def legacy_ranking() -> dict[str, Any]:
+        entries = {"$objectToArray": {"$ifNull": ["$word_count", {}]}}
         return {
-            **{k: v for k, v in obj.items() if k != "_id"},
-            "job_id": str(obj["_id"]),
+            "$map": {
+                "input": {
+                    "$sortArray": {"input": entries, "sortBy": {"v": -1, "k": 1}}
+                },
+                "as": "entry",
+                "in": ["$$entry.k", "$$entry.v"],
+            }
         }
 
-    return public_view(mongodb_client.retrieve(COLLECTION, oid))
+    word = {"$arrayElemAt": ["$$entry", 0]}
+    count = {"$arrayElemAt": ["$$entry", 1]}
+    conditions = [
+        *([{"$gte": [count, min_count]}] if min_count else []),
+        *([{"$eq": [{"$substrCP": [word, 0, len(prefix)]}, prefix]}] if prefix else []),
+    ]
+    ranking: Any = "$word_ranking" if ranked else legacy_ranking()
+    if conditions:
+        ranking = {
+            "$filter": {"input": ranking, "as": "entry", "cond": {"$and": conditions}}
+        }
+    return [
+        {"$match": {"_id": OID(oid)}},
+        {"$set": {"word_ranking": {"$slice": [ranking, offset, limit + 1]}}},
+        {"$project": {"word_count": False}},
+    ]
+
+
+def copy_pipeline(
+    oid: str, source_oid: str, validators: Optional[dict[str, str]]
+) -> list[dict[str, Any]]:
+    return [
+        {"$match": {"_id": OID(source_oid), **_status(JobStatus.COMPLETE)}},
+        {"$project": {field: True for field in [*HISTOGRAM_FIELDS, "content_hash"]}},
+        {
+            "$set": {
+                "_id": OID(oid),
+                **_status(JobStatus.COMPLETE),
+                "completed_at": time.time(),
+                **({"validators": {"$literal": validators}} if validators else {}),
+            }
+        },
+        {
+            "$merge": {
+                "into": COLLECTION,
+                "on": "_id",
+                "whenMatched": "merge",
+                "whenNotMatched": "discard",
+            }
+        },
+    ]
+
+
+def load_histogram(mongodb_client: MongoDBClient, stored: dict[str, Any]) -> bytes:
+    if "blob" in stored:
+        blob: bytes = stored["blob"]
+        return blob
+    return mongodb_client.get_file(Histogram.BUCKET, stored["file_id"])
+
+
+def histogram_source(document: Any) -> Optional[str]:
+    histogram_id = document.get("histogram_id")
+    return str(histogram_id) if histogram_id else None
+
+
+def shared_view(document: Any, source: Optional[Any]) -> Any:
+    if source is None:
+        return document
+    shared = {field: source[field] for field in SHARED_FIELDS if field in source}
+    return {**document, **shared}
+
+
+def histogram_view(document: Any, blob: Optional[bytes]) -> dict[str, Any]:
+    view = public_view(document)
+    if blob is not None:
+        view["word_count"] = Histogram.decode(blob)
+    return view
+
+
+def ranking_view(
+    document: Any,
+    limit: int,
+    offset: int,
+    min_count: int = 0,
+    prefix: str = "",
+    blob: Optional[bytes] = None,
+) -> dict[str, Any]:
+    view = public_view(document)
+    if blob is not None:
+        view["word_ranking"] = Histogram.ranking(
+            blob, limit + 1, offset, min_count, prefix
+        )
+    ranking = view.get("word_ranking") or []
+    return {
+        **view,
+        "word_ranking": ranking[:limit],
+        "next_cursor": encode_cursor(offset + limit) if len(ranking) > limit else None,
+    }
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def decode_cursor(cursor: Any) -> Optional[int]:
+    try:
+        offset = int(base64.urlsafe_b64decode(str(cursor).encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return offset if offset >= 0 else None
+
+
+def new_document(url: str) -> dict[str, Any]:
+    return {**_status(JobStatus.IN_PROGRESS), "url": url, "url_key": URL.normalize(url)}
+
+
+def public_view(obj) -> dict[str, Any]:
+    return {
+        **{k: v for k, v in obj.items() if k not in PRIVATE_FIELDS},
+        "job_id": str(obj["_id"]),
+    }
+
+
+def _without(fields: list[str]) -> dict[str, bool]:
+    return {field: False for field in fields}
 
 
 def _status(job_status: JobStatus) -> dict[str, str]:
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+from typing import Any, Callable, Optional, Tuple
+
+from aio_pika import DeliveryMode, ExchangeType, Message
+from aio_pika.abc import (
+    AbstractChannel,
+    AbstractExchange,
+    AbstractIncomingMessage,
+    AbstractRobustConnection,
+)
+from aio_pika.exceptions import AMQPException
+import aio_pika
+
+from common.rabbit import lanes as Lanes
+
+
+class AsyncRabbitMQClient:
+    def __init__(
+        self,
+        host: str,
+        queue: str,
+        health_timeout: float = 2.0,
+        events_exchange: Optional[str] = None,
+    ):
+        self._host = host
+        self._queue = queue
+        self._events_exchange_name = events_exchange or f"{queue}.events"
+        self._health_timeout = health_timeout
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._channel: Optional[AbstractChannel] = None
+        self._events_exchange: Optional[AbstractExchange] = None
+
+    async def connect(self) -> Tuple[AbstractChannel, AbstractExchange]:
+        self._connection = await aio_pika.connect_robust(host=self._host)
+        channel = await self._connection.channel(publisher_confirms=True)
+        for lane in Lanes.LANES:
+            await channel.declare_queue(
+                Lanes.queue_name(self._queue, lane), durable=True
+            )
+        events_exchange = await channel.declare_exchange(
+            self._events_exchange_name, ExchangeType.FANOUT
+        )
+        self._channel, self._events_exchange = channel, events_exchange
+        return channel, events_exchange
+
+    async def close(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.close()
+
+    async def publish(
+        self, body: dict[str, Any], lane: str = Lanes.DEFAULT_LANE
+    ) -> None:
+        channel, _ = await self._ready()
+        await channel.default_exchange.publish(
+            Message(
+                bytes(json.dumps(body), encoding="raw_unicode_escape"),
+                delivery_mode=DeliveryMode.PERSISTENT,
+            ),
+            routing_key=Lanes.queue_name(self._queue, lane),
+        )
+
+    async def queue_depth(self) -> int:
+        channel, _ = await self._ready()
+        depth = 0
+        for lane in Lanes.LANES:
+            queue = await channel.declare_queue(
+                Lanes.queue_name(self._queue, lane), passive=True
+            )
+            depth += queue.declaration_result.message_count or 0
+        return depth
+
+    async def subscribe(self, callback: Callable[[dict[str, Any]], None]) -> None:
+        async def on_message(message: AbstractIncomingMessage) -> None:
+            try:
+                callback(json.loads(message.body))
+            except json.decoder.JSONDecodeError:
+                print(
+                    f"Unable to parse event from json body({str(message.body)})",
+                    flush=True,
+                )
+
+        channel, events_exchange = await self._ready()
+        queue = await channel.declare_queue(exclusive=True)
+        await queue.bind(events_exchange)
+        await queue.consume(on_message, no_ack=True)
+
+    async def _ready(self) -> Tuple[AbstractChannel, AbstractExchange]:
+        if self._channel is None or self._events_exchange is None:
+            return await self.connect()
+        return self._channel, self._events_exchange
+
+    async def is_healthy(self) -> bool:
+        try:
+            connection = await asyncio.wait_for(
+                aio_pika.connect(host=self._host), self._health_timeout
+            )
+            await connection.close()
+            return True
+        except (AMQPException, ConnectionError, asyncio.TimeoutError):
+            return False
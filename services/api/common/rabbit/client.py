@@ -1,27 +1,87 @@
 import json
+import os
+import threading
 
-from typing import Any, Callable, Tuple
+from numbers import Real
+from typing import Any, Callable, Iterable, Optional, Tuple, cast
 
 from pika.exceptions import AMQPError
 import pika
 
+from common.rabbit import lanes as Lanes
+
 
 class RabbitMQClient:
-    def __init__(self, host: str, queue: str):
+    def __init__(
+        self,
+        host: str,
+        queue: str,
+        health_timeout: float = 2.0,
+        events_exchange: Optional[str] = None,
+    ):
         self._connection_parameters = pika.ConnectionParameters(host=host)
+        timeout = cast(Real, health_timeout)
+        self._health_check_parameters = pika.ConnectionParameters(
+            host=host,
+            connection_attempts=1,
+            socket_timeout=timeout,
+            stack_timeout=timeout,
+            blocked_connection_timeout=timeout,
+        )
         self._queue = queue
+        self._events_exchange = events_exchange or f"{queue}.events"
+        self._publisher_lock = threading.Lock()
+        self._publisher: Optional[
+            Tuple[
+                pika.adapters.blocking_connection.BlockingConnection,
+                pika.adapters.blocking_connection.BlockingChannel,
+            ]
+        ] = None
+        self._publisher_pid: Optional[int] = None
 
-    def publish(self, body: dict[str, Any]) -> None:
-        connection, channel = self._create_connection_and_channel()
-        self._create_queue(channel)
-        props = pika.BasicProperties(delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE)
-        channel.basic_publish(
+    def publish(self, body: dict[str, Any], lane: str = Lanes.DEFAULT_LANE) -> None:
+        self.publish_many([body], lane)
+
+    def publish_many(
+        self, bodies: Iterable[dict[str, Any]], lane: str = Lanes.DEFAULT_LANE
+    ) -> None:
+        self._publish(
+            bodies, exchange="", routing_key=Lanes.queue_name(self._queue, lane)
+        )
+
+    def publish_delayed(
+        self, body: dict[str, Any], lane: str = Lanes.DEFAULT_LANE, delay: float = 0
+    ) -> None:
+        self._publish(
+            [body],
             exchange="",
-            routing_key=self._queue,
-            body=bytes(json.dumps(body), encoding="raw_unicode_escape"),
-            properties=props,
+            routing_key=Lanes.delay_queue_name(self._queue, lane),
+            expiration=str(max(int(delay * 1000), 0)),
         )
-        connection.close()
+
+    def notify(self, body: dict[str, Any]) -> None:
+        self._publish([body], exchange=self._events_exchange, routing_key="")
+
+    def subscribe(self, callback: Callable[[dict[str, Any]], None]) -> None:
+        def on_message(
+            ch: pika.adapters.blocking_connection.BlockingChannel,
+            method: pika.spec.Basic.Deliver,
+            properties: pika.spec.BasicProperties,
+            body: bytes,
+        ) -> None:
+            try:
+                callback(json.loads(body))
+            except json.decoder.JSONDecodeError:
+                print(f"Unable to parse event from json body({str(body)})", flush=True)
+
+        connection, channel = self._create_connection_and_channel()
+        self._create_events_exchange(channel)
+        queue = cast(str, channel.queue_declare(queue="", exclusive=True).method.queue)
+        channel.queue_bind(queue=queue, exchange=self._events_exchange)
+        channel.basic_consume(
+            queue=queue, on_message_callback=on_message, auto_ack=True
+        )
+        channel.start_consuming()
 
     def consume(
         self,
@@ -34,25 +94,130 @@ class RabbitMQClient:
             ],
             None,
         ],
+        prefetch_count: int = 1,
     ) -> None:
         connection, channel = self._create_connection_and_channel()
         self._create_queue(channel)
-        channel.basic_qos(prefetch_count=1)
-        channel.basic_consume(queue=self._queue, on_message_callback=callback)
+        channel.basic_qos(prefetch_count=prefetch_count)
+        for lane in Lanes.LANES:
+            channel.basic_consume(
+                queue=Lanes.queue_name(self._queue, lane), on_message_callback=callback
+            )
         channel.start_consuming()
 
+    def queue_depth(self) -> int:
+        with self._publisher_lock:
+            try:
+                return self._passive_queue_depth()
+            except AMQPError:
+                self._close_publisher()
+                return self._passive_queue_depth()
+
     @property
     def is_healthy(self) -> bool:
         try:
-            connection, channel = self._create_connection_and_channel()
-            return all(not e for e in [connection.is_closed, channel.is_closed])
+            connection = pika.BlockingConnection(self._health_check_parameters)
+            try:
+                channel = connection.channel()
+                return all(not e for e in [connection.is_closed, channel.is_closed])
+            finally:
+                connection.close()
         except AMQPError:
             return False
 
+    def _publish(
+        self,
+        bodies: Iterable[dict[str, Any]],
+        exchange: str,
+        routing_key: str,
+        expiration: Optional[str] = None,
+    ) -> None:
+        messages = [bytes(json.dumps(b), encoding="raw_unicode_escape") for b in bodies]
+        if not messages:
+            return
+        with self._publisher_lock:
+            try:
+                self._publish_batch(messages, exchange, routing_key, expiration)
+            except AMQPError:
+                self._close_publisher()
+                self._publish_batch(messages, exchange, routing_key, expiration)
+
+    def _passive_queue_depth(self) -> int:
+        channel = self._publisher_channel()
+        return sum(
+            channel.queue_declare(
+                queue=Lanes.queue_name(self._queue, lane), passive=True
+            ).method.message_count
+            or 0
+            for lane in Lanes.LANES
+        )
+
+    def _publish_batch(
+        self,
+        messages: list[bytes],
+        exchange: str,
+        routing_key: str,
+        expiration: Optional[str] = None,
+    ) -> None:
+        channel = self._publisher_channel()
+        props = pika.BasicProperties(
+            delivery_mode=pika.spec.PERSISTENT_DELIVERY_MODE, expiration=expiration
+        )
+        for message in messages:
+            channel.basic_publish(
+                exchange=exchange,
+                routing_key=routing_key,
+                body=message,
+                properties=props,
+            )
+        channel.tx_commit()
+
+    def _publisher_channel(self) -> pika.adapters.blocking_connection.BlockingChannel:
+        if self._publisher_pid != os.getpid():
+            self._publisher = None
+        if self._publisher is None or any(e.is_closed for e in self._publisher):
+            self._close_publisher()
+            connection, channel = self._create_connection_and_channel()
+            self._create_queue(channel)
+            self._create_delay_queues(channel)
+            self._create_events_exchange(channel)
+            channel.tx_select()
+            self._publisher, self._publisher_pid = (connection, channel), os.getpid()
+        return self._publisher[1]
+
+    def _close_publisher(self) -> None:
+        publisher, self._publisher = self._publisher, None
+        if publisher is not None and self._publisher_pid == os.getpid():
+            try:
+                publisher[0].close()
+            except AMQPError:
+                pass
+
     def _create_queue(
         self, channel: pika.adapters.blocking_connection.BlockingChannel
     ) -> None:
-        channel.queue_declare(queue=self._queue, durable=True)
+        for lane in Lanes.LANES:
+            channel.queue_declare(
+                queue=Lanes.queue_name(self._queue, lane), durable=True
+            )
+
+    def _create_delay_queues(
+        self, channel: pika.adapters.blocking_connection.BlockingChannel
+    ) -> None:
+        for lane in Lanes.LANES:
+            channel.queue_declare(
+                queue=Lanes.delay_queue_name(self._queue, lane),
+                durable=True,
+                arguments={  # type: ignore
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": Lanes.queue_name(self._queue, lane),
+                },
+            )
+
+    def _create_events_exchange(
+        self, channel: pika.adapters.blocking_connection.BlockingChannel
+    ) -> None:
+        channel.exchange_declare(exchange=self._events_exchange, exchange_type="fanout")
 
     def _create_connection_and_channel(
         self,
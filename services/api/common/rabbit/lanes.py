@@ -0,0 +1,24 @@
+import time
+
+from typing import Any
+
+LANES = ["high", "normal", "low"]
+DEFAULT_LANE = "normal"
+BULK_LANE = "low"
+
+
+def queue_name(queue: str, lane: str) -> str:
+    return queue if lane == DEFAULT_LANE else f"{queue}.{lane}"
+
+
+def delay_queue_name(queue: str, lane: str) -> str:
+    return f"{queue_name(queue, lane)}.delay"
+
+
+def job_message(job_id: str, url: str, lane: str) -> dict[str, Any]:
+    return {"job_id": job_id, "url": url, "priority": lane, "queued_at": time.time()}
+
+
+def lane_of(message: dict[str, Any]) -> str:
+    priority = message.get("priority")
+    return priority if priority in LANES else DEFAULT_LANE
@@ -0,0 +1,56 @@
+from typing import Optional
+from urllib.parse import SplitResult, unquote_plus, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = {
+    "_ga",
+    "_gl",
+    "dclid",
+    "fbclid",
+    "gclid",
+    "gclsrc",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "msclkid",
+    "ref_src",
+    "yclid",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+
+def normalize(url: str) -> str:
+    def port_of(parsed: SplitResult) -> Optional[int]:
+        try:
+            return parsed.port
+        except ValueError:
+            return None
+
+    parsed = urlsplit(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    host = f"[{host}]" if ":" in host else host
+    port = port_of(parsed)
+    netloc = host if port in (None, DEFAULT_PORTS.get(scheme)) else f"{host}:{port}"
+    userinfo, at, _ = parsed.netloc.rpartition("@")
+    netloc = f"{userinfo}{at}{netloc}"
+    query = strip_tracking(parsed.query)
+    return urlunsplit((scheme, netloc, parsed.path or "/", query, ""))
+
+
+def strip_tracking(query: str) -> str:
+    def is_empty(param: str) -> bool:
+        name, equals, value = param.partition("=")
+        return not name or (equals == "=" and not value)
+
+    def is_tracking(param: str) -> bool:
+        name = unquote_plus(param.partition("=")[0]).lower()
+        return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+    return "&".join(
+        p for p in query.split("&") if not is_empty(p) and not is_tracking(p)
+    )
+
+
+def host_of(url: str) -> str:
+    return (urlsplit(url.strip()).hostname or "").lower()
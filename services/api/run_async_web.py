@@ -0,0 +1,8 @@
+from aiohttp import web
+
+from web.async_endpoints import create_app
+
+app = create_app()
+
+if __name__ == "__main__":
+    web.run_app(app, host="0.0.0.0", port=5000)
@@ -1,4 +1,12 @@
-from web.endpoints import server
+from pymongo.errors import PyMongoError
+
+from common.mongo.models import job as Job
+from web.endpoints import mongo_client, server
+
+try:
+    Job.ensure_indexes(mongo_client)
+except PyMongoError as e:
+    print(f"Unable to ensure job indexes: {str(e)}", flush=True)
 
 if __name__ == "__main__":
     server.run(host="0.0.0.0", port=5000)
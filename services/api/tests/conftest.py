@@ -1,10 +1,11 @@
-from web.endpoints import server
+from web.endpoints import job_cache, server
 import pytest
 
 
 @pytest.fixture()
 def app():
     server.config.update({"TESTING": True})
+    job_cache.clear()
     yield server
 
 
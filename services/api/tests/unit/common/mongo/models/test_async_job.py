@@ -0,0 +1,109 @@
+from common.mongo.models import async_job as AsyncJob
+from common.mongo.models import histogram as Histogram
+from common.mongo.models import job as Job
+from bson.objectid import ObjectId as OID
+
+
+async def test_create(mocker):
+    async def _insert_one(_, document):
+        document["_id"] = OID(FAKE_ID)
+
+    mock_mongo = mocker.AsyncMock()
+    mock_mongo.create.side_effect = _insert_one
+
+    actual = await AsyncJob.create(mock_mongo, "https://w.ww")
+
+    assert mock_mongo.create.await_args.args[0] == Job.COLLECTION
+    assert mock_mongo.create.await_args.args[1]["url_key"] == "https://w.ww/"
+    assert actual == {"status": "IN_PROGRESS", "url": "https://w.ww", "job_id": FAKE_ID}
+
+
+async def test_fetch(mocker):
+    mock_mongo = mocker.AsyncMock()
+    mock_mongo.retrieve.return_value = {"_id": OID(FAKE_ID), "something": "else"}
+    actual = await AsyncJob.fetch(mock_mongo, FAKE_ID)
+    mock_mongo.retrieve.assert_awaited_once_with(Job.COLLECTION, FAKE_ID)
+    assert actual == {"something": "else", "job_id": FAKE_ID}
+
+
+async def test_fetch_loads_spilled_blob(mocker):
+    mock_mongo = mocker.AsyncMock()
+    file_id = OID("625f4e3229942e20c16ca337")
+    mock_mongo.retrieve.side_effect = [
+        {"_id": OID(FAKE_ID), "histogram_id": OID(FAKE_ID)},
+        {"_id": OID(FAKE_ID), "word_histogram": Histogram.spilled(file_id, 1)},
+    ]
+    mock_mongo.get_file.return_value = Histogram.encode({"a": 1})
+
+    actual = await AsyncJob.fetch(mock_mongo, FAKE_ID)
+
+    mock_mongo.get_file.assert_awaited_once_with("histograms", file_id)
+    assert actual == {"job_id": FAKE_ID, "word_count": {"a": 1}}
+
+
+async def test_fetch_loads_histogram_from_side_collection(mocker):
+    mock_mongo = mocker.AsyncMock()
+    mock_mongo.retrieve.side_effect = [
+        {"_id": OID(FAKE_ID), "status": "COMPLETE", "histogram_id": OID(FAKE_ID)},
+        {"_id": OID(FAKE_ID), "word_count": {"a": 1}},
+    ]
+
+    actual = await AsyncJob.fetch(mock_mongo, FAKE_ID)
+
+    mock_mongo.retrieve.assert_awaited_with(
+        Histogram.COLLECTION, FAKE_ID, projection={"word_ranking": False}
+    )
+    assert actual == {"status": "COMPLETE", "word_count": {"a": 1}, "job_id": FAKE_ID}
+
+
+async def test_fetch_returns_none_for_unknown_job(mocker):
+    mock_mongo = mocker.AsyncMock()
+    mock_mongo.retrieve.return_value = None
+    assert await AsyncJob.fetch(mock_mongo, FAKE_ID) is None
+
+
+async def test_fetch_ranking(mocker):
+    mock_mongo = mocker.AsyncMock()
+    mock_mongo.aggregate.return_value = [
+        {"_id": OID(FAKE_ID), "word_ranking": [["a", 2], ["b", 1]]}
+    ]
+
+    actual = await AsyncJob.fetch_ranking(mock_mongo, FAKE_ID, 1, min_count=1)
+
+    mock_mongo.aggregate.assert_awaited_once_with(
+        Job.COLLECTION, Job.ranking_pipeline(FAKE_ID, 1, 0, 1, "")
+    )
+    assert actual == {
+        "word_ranking": [["a", 2]],
+        "next_cursor": Job.encode_cursor(1),
+        "job_id": FAKE_ID,
+    }
+
+
+async def test_find_cached(mocker):
+    mock_mongo = mocker.AsyncMock()
+    mock_mongo.retrieve_latest.return_value = None
+    mocker.patch("common.mongo.models.job.metrics")
+
+    assert await AsyncJob.find_cached(mock_mongo, "http://example.com", 60) is None
+    mock_mongo.retrieve_latest.assert_awaited_once_with(
+        Job.COLLECTION,
+        {"url_key": "http://example.com/", "status": "COMPLETE"},
+        "completed_at",
+        projection={"word_count": False, "histogram_id": False},
+    )
+
+
+async def test_drain_rate(mocker):
+    mock_mongo = mocker.AsyncMock()
+    mock_mongo.count.return_value = 30
+    mocker.patch("common.mongo.models.async_job.time.time", return_value=FAKE_NOW)
+
+    assert await AsyncJob.drain_rate(mock_mongo, 60) == 0.5
+    mock_mongo.count.assert_awaited_once_with(
+        Job.COLLECTION, {"completed_at": {"$gte": FAKE_NOW - 60}}
+    )
+
+
+FAKE_ID = "625f4e3229942e20c16ca336"
+FAKE_NOW = 1650000000.0
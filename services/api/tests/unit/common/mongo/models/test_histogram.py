@@ -0,0 +1,49 @@
+from common.mongo.models import histogram as Histogram
+from common.mongo.models import job as Job
+from hypothesis import given, strategies as st
+import pytest
+
+WORD_COUNTS = st.dictionaries(
+    st.text(
+        alphabet=st.characters(blacklist_categories=["Cs"], blacklist_characters="\0"),
+        min_size=1,
+    ),
+    st.integers(min_value=1, max_value=2**63),
+)
+
+
+@given(WORD_COUNTS)
+def test_decode_round_trips(word_count):
+    assert Histogram.decode(Histogram.encode(word_count)) == word_count
+
+
+@given(WORD_COUNTS)
+def test_entries_are_ranked(word_count):
+    assert [list(e) for e in Histogram.entries(Histogram.encode(word_count))] == (
+        Job.rank(word_count)
+    )
+
+
+def test_encode_empty_histogram():
+    assert Histogram.decode(Histogram.encode({})) == {}
+
+
+@pytest.mark.parametrize(
+    "limit, offset, min_count, prefix, expected",
+    [
+        (2, 0, 0, "", [["the", 9], ["a", 4]]),
+        (2, 1, 0, "", [["a", 4], ["then", 3]]),
+        (10, 0, 3, "", [["the", 9], ["a", 4], ["then", 3]]),
+        (10, 0, 0, "th", [["the", 9], ["then", 3], ["there", 2]]),
+        (1, 1, 3, "th", [["then", 3]]),
+        (10, 9, 0, "", []),
+    ],
+)
+def test_ranking(limit, offset, min_count, prefix, expected):
+    blob = Histogram.encode({"a": 4, "then": 3, "there": 2, "the": 9, "b": 1})
+    assert Histogram.ranking(blob, limit, offset, min_count, prefix) == expected
+
+
+def test_columns_compress_repetitive_histograms():
+    word_count = {f"word{i}": i % 7 + 1 for i in range(10000)}
+    assert len(Histogram.encode(word_count)) < len(str(word_count)) / 4
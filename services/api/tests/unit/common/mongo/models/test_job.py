@@ -1,45 +1,369 @@
+from common.mongo.models import histogram as Histogram
 from common.mongo.models import job as Job
 from bson.objectid import ObjectId as OID
+import pymongo
+import pytest
 
 
 def test_create(mocker):
+    def _insert_one(_, document):
+        document["_id"] = OID(fake_id)
+
     mock_mongo = mocker.MagicMock()
-    fake_id, fake_url = "allowed_to_buy_beer", "www.w.ww"
-    expected = "something"
-    mock_mongo.create.return_value.inserted_id = fake_id
-    mock_fetch = _mock_fetch(mocker, expected)
+    fake_id, fake_url = "625f4e3229942e20c16ca336", "HTTPS://W.ww/a#b"
+    mock_mongo.create.side_effect = _insert_one
+    mock_fetch = _mock_fetch(mocker, "unused")
+
     actual = Job.create(mock_mongo, fake_url)
-    mock_mongo.create.assert_called_once_with(
-        Job.COLLECTION, {"status": "IN_PROGRESS", "url": fake_url}
-    )
-    mock_fetch.assert_called_once_with(mock_mongo, fake_id)
-    assert expected == actual
+
+    mock_mongo.create.assert_called_once()
+    assert mock_mongo.create.call_args.args[0] == Job.COLLECTION
+    assert mock_mongo.create.call_args.args[1]["url_key"] == "https://w.ww/a"
+    mock_fetch.assert_not_called()
+    assert actual == {"status": "IN_PROGRESS", "url": fake_url, "job_id": fake_id}
+
+
+def test_create_many(mocker):
+    def _insert_many(_, documents):
+        for i, document in enumerate(documents):
+            document["_id"] = OID(fake_ids[i])
+
+    mock_mongo = mocker.MagicMock()
+    fake_urls = ["https://w.ww/", "https://x.xx/"]
+    fake_ids = ["625f4e3229942e20c16ca336", "625f4e3229942e20c16ca337"]
+    mock_mongo.create_many.side_effect = _insert_many
+    mock_fetch = _mock_fetch(mocker, "unused")
+
+    actual = Job.create_many(mock_mongo, fake_urls)
+
+    mock_mongo.create_many.assert_called_once()
+    mock_fetch.assert_not_called()
+    assert actual == [
+        {"status": "IN_PROGRESS", "url": url, "job_id": oid}
+        for url, oid in zip(fake_urls, fake_ids)
+    ]
 
 
 def test_complete(mocker):
     mock_mongo = mocker.MagicMock()
-    fake_id, fake_word_count = "allowed_to_buy_beer", {"hello": 1}
-    expected = "something"
-    mock_fetch = _mock_fetch(mocker, expected)
+    fake_id, fake_word_count = "625f4e3229942e20c16ca336", {"b": 1, "c": 2, "a": 1}
+    mock_mongo.update_and_retrieve.return_value = {
+        "_id": OID(fake_id),
+        "status": "COMPLETE",
+    }
+    mocker.patch("common.mongo.models.job.time.time", return_value=FAKE_NOW)
+
     actual = Job.complete(mock_mongo, fake_id, fake_word_count)
-    mock_mongo.update.assert_called_once_with(
-        Job.COLLECTION, fake_id, {"status": "COMPLETE", "word_count": fake_word_count}
+
+    mock_mongo.replace.assert_called_once_with(
+        Histogram.COLLECTION,
+        fake_id,
+        {
+            "word_count": fake_word_count,
+            "word_ranking": [["c", 2], ["a", 1], ["b", 1]],
+        },
+    )
+    mock_mongo.update_and_retrieve.assert_called_once_with(
+        Job.COLLECTION,
+        fake_id,
+        {
+            "status": "COMPLETE",
+            "histogram_id": OID(fake_id),
+            "completed_at": FAKE_NOW,
+        },
+        projection={"word_count": False, "histogram_id": False},
+    )
+    assert actual == {"status": "COMPLETE", "job_id": fake_id}
+
+
+def test_complete_stores_blob(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id, fake_word_count = "625f4e3229942e20c16ca336", {"b": 1, "c": 2, "a": 1}
+    mock_mongo.update_and_retrieve.return_value = {"_id": OID(fake_id)}
+    mocker.patch("common.mongo.models.job.time.time", return_value=FAKE_NOW)
+
+    Job.complete(mock_mongo, fake_id, fake_word_count, storage="blob")
+
+    histogram = mock_mongo.replace.call_args.args[2]
+    assert "word_count" not in histogram and "word_ranking" not in histogram
+    stored = histogram["word_histogram"]
+    assert stored["encoding"] == "columnar-zlib" and stored["size"] == 3
+    assert Histogram.decode(stored["blob"]) == fake_word_count
+    mock_mongo.put_file.assert_not_called()
+
+
+def test_complete_spills_large_blob_to_gridfs(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id, file_id = "625f4e3229942e20c16ca336", OID("625f4e3229942e20c16ca337")
+    mock_mongo.put_file.return_value = file_id
+    mocker.patch("common.mongo.models.histogram.INLINE_MAX_BYTES", 0)
+
+    Job.complete(mock_mongo, fake_id, {"a": 1}, storage="blob")
+
+    mock_mongo.put_file.assert_called_once_with(
+        "histograms", Histogram.encode({"a": 1})
+    )
+    histogram = mock_mongo.replace.call_args.args[2]
+    assert histogram["word_histogram"] == {
+        "encoding": "columnar-zlib",
+        "size": 1,
+        "file_id": file_id,
+    }
+
+
+def test_complete_stores_validators(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id, validators = "625f4e3229942e20c16ca336", {"etag": '"abc"'}
+    mock_mongo.update_and_retrieve.return_value = {
+        "_id": OID(fake_id),
+        "status": "COMPLETE",
+        "validators": validators,
+    }
+    mocker.patch("common.mongo.models.job.time.time", return_value=FAKE_NOW)
+
+    actual = Job.complete(mock_mongo, fake_id, {"a": 1}, validators)
+
+    update = mock_mongo.update_and_retrieve.call_args.args[2]
+    assert update["validators"] == validators
+    assert actual == {"status": "COMPLETE", "job_id": fake_id}
+
+
+def test_complete_from_copies_histogram_server_side(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id, source_id = "625f4e3229942e20c16ca336", "625f4e3229942e20c16ca337"
+    validators = {"last_modified": "Wed, 21 Oct 2015 07:28:00 GMT"}
+    mock_mongo.retrieve.return_value = {"_id": OID(fake_id), "status": "COMPLETE"}
+    mocker.patch("common.mongo.models.job.time.time", return_value=FAKE_NOW)
+
+    actual = Job.complete_from(mock_mongo, fake_id, source_id, validators)
+
+    mock_mongo.aggregate.assert_called_once_with(
+        Job.COLLECTION,
+        [
+            {"$match": {"_id": OID(source_id), "status": "COMPLETE"}},
+            {
+                "$project": {
+                    "word_count": True,
+                    "histogram_id": True,
+                    "content_hash": True,
+                }
+            },
+            {
+                "$set": {
+                    "_id": OID(fake_id),
+                    "status": "COMPLETE",
+                    "completed_at": FAKE_NOW,
+                    "validators": {"$literal": validators},
+                }
+            },
+            {
+                "$merge": {
+                    "into": Job.COLLECTION,
+                    "on": "_id",
+                    "whenMatched": "merge",
+                    "whenNotMatched": "discard",
+                }
+            },
+        ],
+    )
+    mock_mongo.retrieve.assert_called_once_with(
+        Job.COLLECTION,
+        fake_id,
+        projection={"word_count": False, "histogram_id": False},
+    )
+    assert actual == {"status": "COMPLETE", "job_id": fake_id}
+
+
+def test_complete_rejects_unknown_storage(mocker):
+    mock_mongo = mocker.MagicMock()
+
+    with pytest.raises(ValueError):
+        Job.complete(mock_mongo, "625f4e3229942e20c16ca336", {}, storage="x")
+    mock_mongo.replace.assert_not_called()
+    mock_mongo.update_and_retrieve.assert_not_called()
+
+
+def test_complete_shared_references_source_histogram(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id, source_id = "625f4e3229942e20c16ca336", "625f4e3229942e20c16ca337"
+    mock_mongo.update_and_retrieve.return_value = {
+        "_id": OID(fake_id),
+        "status": "COMPLETE",
+        "content_hash": "ab12",
+    }
+    mocker.patch("common.mongo.models.job.time.time", return_value=FAKE_NOW)
+
+    actual = Job.complete_shared(mock_mongo, fake_id, source_id, "ab12")
+
+    update = mock_mongo.update_and_retrieve.call_args.args[2]
+    assert update == {
+        "status": "COMPLETE",
+        "histogram_id": OID(source_id),
+        "completed_at": FAKE_NOW,
+        "content_hash": "ab12",
+    }
+    mock_mongo.replace.assert_not_called()
+    assert actual == {"status": "COMPLETE", "job_id": fake_id}
+
+
+@pytest.mark.parametrize(
+    "latest, expected",
+    [
+        (None, None),
+        (
+            {
+                "_id": OID("625f4e3229942e20c16ca336"),
+                "histogram_id": OID("625f4e3229942e20c16ca337"),
+            },
+            "625f4e3229942e20c16ca337",
+        ),
+    ],
+)
+def test_find_shared(mocker, latest, expected):
+    mock_mongo = mocker.MagicMock()
+    mock_mongo.retrieve_latest.return_value = latest
+
+    assert Job.find_shared(mock_mongo, "ab12") == expected
+    mock_mongo.retrieve_latest.assert_called_once_with(
+        Job.COLLECTION,
+        {
+            "content_hash": "ab12",
+            "status": "COMPLETE",
+            "histogram_id": {"$exists": True},
+        },
+        "completed_at",
+        projection={"histogram_id": True},
     )
-    mock_fetch.assert_called_once_with(mock_mongo, fake_id)
-    assert expected == actual
+
+
+def test_find_validated(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id, validators = "625f4e3229942e20c16ca336", {"etag": '"abc"'}
+    mock_mongo.retrieve_latest.return_value = {
+        "_id": OID(fake_id),
+        "validators": validators,
+    }
+
+    actual = Job.find_validated(mock_mongo, "https://Example.com/")
+
+    mock_mongo.retrieve_latest.assert_called_once_with(
+        Job.COLLECTION,
+        {
+            "url_key": "https://example.com/",
+            "status": "COMPLETE",
+            "validators": {"$exists": True},
+        },
+        "completed_at",
+        projection={"validators": True},
+    )
+    assert actual == {"job_id": fake_id, "validators": validators}
+
+
+def test_find_validated_returns_none_without_previous_job(mocker):
+    mock_mongo = mocker.MagicMock()
+    mock_mongo.retrieve_latest.return_value = None
+    assert Job.find_validated(mock_mongo, "https://example.com") is None
+
+
+def test_public_view_hides_validators():
+    fake_id = "625f4e3229942e20c16ca336"
+    view = Job.public_view({"_id": OID(fake_id), "validators": {"etag": "x"}})
+    assert view == {"job_id": fake_id}
+
+
+def test_complete_returns_none_for_unknown_job(mocker):
+    mock_mongo = mocker.MagicMock()
+    mock_mongo.update_and_retrieve.return_value = None
+    assert Job.complete(mock_mongo, "625f4e3229942e20c16ca336", {}) is None
 
 
 def test_fail(mocker):
     mock_mongo = mocker.MagicMock()
-    fake_id, fake_error = "allowed_to_buy_beer", "denied"
-    expected = "something"
-    mock_fetch = _mock_fetch(mocker, expected)
+    fake_id, fake_error = "625f4e3229942e20c16ca336", "denied"
+    mock_mongo.update_and_retrieve.return_value = {
+        "_id": OID(fake_id),
+        "status": "FAIL",
+        "error": fake_error,
+    }
+    mocker.patch("common.mongo.models.job.time.time", return_value=FAKE_NOW)
+
     actual = Job.fail(mock_mongo, fake_id, fake_error)
-    mock_mongo.update.assert_called_once_with(
-        Job.COLLECTION, fake_id, {"status": "FAIL", "error": fake_error}
+
+    mock_mongo.update_and_retrieve.assert_called_once_with(
+        Job.COLLECTION,
+        fake_id,
+        {"status": "FAIL", "error": fake_error, "completed_at": FAKE_NOW},
     )
-    mock_fetch.assert_called_once_with(mock_mongo, fake_id)
-    assert expected == actual
+    assert actual == {"status": "FAIL", "error": fake_error, "job_id": fake_id}
+
+
+def test_fail_returns_none_for_unknown_job(mocker):
+    mock_mongo = mocker.MagicMock()
+    mock_mongo.update_and_retrieve.return_value = None
+    assert Job.fail(mock_mongo, "625f4e3229942e20c16ca336", "denied") is None
+
+
+def test_apply_writes_updates_in_bulk(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id = "625f4e3229942e20c16ca336"
+
+    assert Job.apply(mock_mongo, [(fake_id, {"status": "FAIL"}, None)]) == {}
+    mock_mongo.bulk_replace.assert_not_called()
+    mock_mongo.bulk_update.assert_called_once_with(
+        Job.COLLECTION, [(fake_id, {"status": "FAIL"})]
+    )
+
+
+def test_apply_stores_histograms_before_jobs(mocker):
+    mock_mongo = mocker.MagicMock()
+    results = [("a", {"status": "COMPLETE"}, {"word_count": {}}), ("b", {}, None)]
+
+    assert Job.apply(mock_mongo, results) == {}
+    assert mock_mongo.method_calls == [
+        mocker.call.bulk_replace(Histogram.COLLECTION, [("a", {"word_count": {}})]),
+        mocker.call.bulk_update(
+            Job.COLLECTION, [("a", {"status": "COMPLETE"}), ("b", {})]
+        ),
+    ]
+
+
+def test_apply_reports_failed_updates_by_index(mocker):
+    mock_mongo = mocker.MagicMock()
+    mock_mongo.bulk_update.side_effect = pymongo.errors.BulkWriteError(
+        {"writeErrors": [{"index": 1, "errmsg": "too large"}]}
+    )
+
+    actual = Job.apply(mock_mongo, [("a", {}, None), ("b", {}, None), ("c", {}, None)])
+
+    assert actual == {1: "too large"}
+
+
+def test_apply_skips_jobs_whose_histogram_failed(mocker):
+    mock_mongo = mocker.MagicMock()
+    mock_mongo.bulk_replace.side_effect = pymongo.errors.BulkWriteError(
+        {"writeErrors": [{"index": 0, "errmsg": "too large"}]}
+    )
+    mock_mongo.bulk_update.side_effect = pymongo.errors.BulkWriteError(
+        {"writeErrors": [{"index": 1, "errmsg": "gone"}]}
+    )
+
+    actual = Job.apply(mock_mongo, [("a", {}, None), ("b", {}, {}), ("c", {}, {})])
+
+    mock_mongo.bulk_replace.assert_called_once_with(
+        Histogram.COLLECTION, [("b", {}), ("c", {})]
+    )
+    mock_mongo.bulk_update.assert_called_once_with(
+        Job.COLLECTION, [("a", {}), ("c", {})]
+    )
+    assert actual == {1: "too large", 2: "gone"}
+
+
+def test_apply_raises_on_connection_errors(mocker):
+    mock_mongo = mocker.MagicMock()
+    mock_mongo.bulk_update.side_effect = pymongo.errors.AutoReconnect("gone")
+
+    with pytest.raises(pymongo.errors.PyMongoError):
+        Job.apply(mock_mongo, [("a", {}, None)])
 
 
 def test_fetch(mocker):
@@ -48,9 +372,334 @@ def test_fetch(mocker):
     expected = {"job_id": fake_id, "something": "else"}
     mock_mongo.retrieve.return_value = {"_id": OID(fake_id), "something": "else"}
     actual = Job.fetch(mock_mongo, fake_id)
-    mock_mongo.retrieve.assert_called_once_with(Job.COLLECTION, fake_id)
+    mock_mongo.retrieve.assert_called_once_with(
+        Job.COLLECTION, fake_id, projection=None
+    )
     assert expected == actual
 
 
+def test_fetch_reads_inline_word_count(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id = "625f4e3229942e20c16ca336"
+    mock_mongo.retrieve.return_value = {"_id": OID(fake_id), "word_count": {"a": 1}}
+
+    actual = Job.fetch(mock_mongo, fake_id)
+
+    mock_mongo.retrieve.assert_called_once()
+    assert actual == {"job_id": fake_id, "word_count": {"a": 1}}
+
+
+def test_fetch_decodes_inline_blob(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id = "625f4e3229942e20c16ca336"
+    mock_mongo.retrieve.side_effect = [
+        {"_id": OID(fake_id), "histogram_id": OID(fake_id)},
+        {
+            "_id": OID(fake_id),
+            "word_histogram": Histogram.inline(Histogram.encode({"a": 1, "b": 2}), 2),
+        },
+    ]
+
+    actual = Job.fetch(mock_mongo, fake_id)
+
+    mock_mongo.get_file.assert_not_called()
+    assert actual == {"job_id": fake_id, "word_count": {"a": 1, "b": 2}}
+
+
+def test_fetch_loads_spilled_blob(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id, file_id = "625f4e3229942e20c16ca336", OID("625f4e3229942e20c16ca337")
+    mock_mongo.retrieve.side_effect = [
+        {"_id": OID(fake_id), "histogram_id": OID(fake_id)},
+        {"_id": OID(fake_id), "word_histogram": Histogram.spilled(file_id, 1)},
+    ]
+    mock_mongo.get_file.return_value = Histogram.encode({"a": 1})
+
+    actual = Job.fetch(mock_mongo, fake_id)
+
+    mock_mongo.get_file.assert_called_once_with("histograms", file_id)
+    assert actual == {"job_id": fake_id, "word_count": {"a": 1}}
+
+
+def test_fetch_without_histogram(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id, histogram_id = "625f4e3229942e20c16ca336", OID("625f4e3229942e20c16ca337")
+    mock_mongo.retrieve.return_value = {
+        "_id": OID(fake_id),
+        "status": "COMPLETE",
+        "histogram_id": histogram_id,
+    }
+
+    actual = Job.fetch(mock_mongo, fake_id, histogram=False)
+
+    mock_mongo.retrieve.assert_called_once_with(
+        Job.COLLECTION,
+        fake_id,
+        projection={field: False for field in Job.HISTOGRAM_FIELDS},
+    )
+    assert actual == {"status": "COMPLETE", "job_id": fake_id}
+
+
+def test_fetch_loads_histogram_from_side_collection(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id, source_id = "625f4e3229942e20c16ca336", "625f4e3229942e20c16ca337"
+    mock_mongo.retrieve.side_effect = [
+        {"_id": OID(fake_id), "status": "COMPLETE", "histogram_id": OID(source_id)},
+        {"_id": OID(source_id), "word_count": {"a": 1}},
+    ]
+
+    actual = Job.fetch(mock_mongo, fake_id)
+
+    mock_mongo.retrieve.assert_called_with(
+        Histogram.COLLECTION, source_id, projection={"word_ranking": False}
+    )
+    assert actual == {"status": "COMPLETE", "word_count": {"a": 1}, "job_id": fake_id}
+
+
+def test_fetch_returns_none_for_unknown_job(mocker):
+    mock_mongo = mocker.MagicMock()
+    mock_mongo.retrieve.return_value = None
+    assert Job.fetch(mock_mongo, "625f4e3229942e20c16ca336") is None
+
+
+def test_fetch_ranking(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id = "625f4e3229942e20c16ca336"
+    mock_mongo.aggregate.return_value = [
+        {
+            "_id": OID(fake_id),
+            "status": "COMPLETE",
+            "word_ranking": [["the", 9], ["then", 3], ["there", 2]],
+        }
+    ]
+
+    actual = Job.fetch_ranking(mock_mongo, fake_id, 2, offset=4, prefix="th")
+
+    mock_mongo.aggregate.assert_called_once_with(
+        Job.COLLECTION, Job.ranking_pipeline(fake_id, 2, 4, 0, "th")
+    )
+    assert actual == {
+        "status": "COMPLETE",
+        "word_ranking": [["the", 9], ["then", 3]],
+        "next_cursor": Job.encode_cursor(6),
+        "job_id": fake_id,
+    }
+
+
+def test_fetch_ranking_from_blob(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id = "625f4e3229942e20c16ca336"
+    blob = Histogram.encode({"the": 9, "then": 3, "there": 2, "a": 5})
+    mock_mongo.aggregate.side_effect = [
+        [
+            {
+                "_id": OID(fake_id),
+                "status": "COMPLETE",
+                "word_ranking": [],
+                "histogram_id": OID(fake_id),
+            }
+        ],
+        [{"_id": OID(fake_id), "word_histogram": Histogram.inline(blob, 4)}],
+    ]
+
+    actual = Job.fetch_ranking(mock_mongo, fake_id, 1, offset=1, prefix="th")
+
+    assert actual == {
+        "status": "COMPLETE",
+        "word_ranking": [["then", 3]],
+        "next_cursor": Job.encode_cursor(2),
+        "job_id": fake_id,
+    }
+
+
+def test_fetch_ranking_from_side_collection(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id = "625f4e3229942e20c16ca336"
+    blob = Histogram.encode({"a": 2, "b": 1})
+    mock_mongo.aggregate.side_effect = [
+        [{"_id": OID(fake_id), "word_ranking": [], "histogram_id": OID(fake_id)}],
+        [{"_id": OID(fake_id), "word_histogram": Histogram.inline(blob, 2)}],
+    ]
+
+    actual = Job.fetch_ranking(mock_mongo, fake_id, 1)
+
+    mock_mongo.aggregate.assert_called_with(
+        Histogram.COLLECTION, Job.ranking_pipeline(fake_id, 1, 0, 0, "", ranked=True)
+    )
+    assert actual == {
+        "word_ranking": [["a", 2]],
+        "next_cursor": Job.encode_cursor(1),
+        "job_id": fake_id,
+    }
+
+
+def test_fetch_ranking_last_page(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_id = "625f4e3229942e20c16ca336"
+    mock_mongo.aggregate.return_value = [
+        {"_id": OID(fake_id), "status": "IN_PROGRESS", "word_ranking": None}
+    ]
+
+    actual = Job.fetch_ranking(mock_mongo, fake_id, 2)
+
+    assert actual == {
+        "status": "IN_PROGRESS",
+        "word_ranking": [],
+        "next_cursor": None,
+        "job_id": fake_id,
+    }
+
+
+def test_fetch_ranking_returns_none_for_unknown_job(mocker):
+    mock_mongo = mocker.MagicMock()
+    mock_mongo.aggregate.return_value = []
+    assert Job.fetch_ranking(mock_mongo, "625f4e3229942e20c16ca336", 10) is None
+
+
+def test_ranking_pipeline():
+    fake_id = "625f4e3229942e20c16ca336"
+    pipeline = Job.ranking_pipeline(fake_id, 10, 20, 3, "ab", ranked=True)
+
+    assert pipeline[0] == {"$match": {"_id": OID(fake_id)}}
+    ranking = pipeline[1]["$set"]["word_ranking"]["$slice"]
+    assert ranking[1:] == [20, 11]
+    conditions = ranking[0]["$filter"]["cond"]["$and"]
+    assert conditions == [
+        {"$gte": [{"$arrayElemAt": ["$$entry", 1]}, 3]},
+        {
+            "$eq": [
+                {"$substrCP": [{"$arrayElemAt": ["$$entry", 0]}, 0, 2]},
+                "ab",
+            ]
+        },
+    ]
+    assert ranking[0]["$filter"]["input"] == "$word_ranking"
+    assert pipeline[2] == {"$project": {"word_count": False}}
+
+
+def test_ranking_pipeline_without_filters():
+    pipeline = Job.ranking_pipeline("625f4e3229942e20c16ca336", 10, 0, 0, "")
+    ranking = pipeline[1]["$set"]["word_ranking"]["$slice"][0]
+    assert ranking["$map"]["input"]["$sortArray"]["sortBy"] == {"v": -1, "k": 1}
+
+
+@pytest.mark.parametrize(
+    "cursor,expected",
+    [
+        [Job.encode_cursor(0), 0],
+        [Job.encode_cursor(250), 250],
+        ["not a cursor", None],
+        [Job.encode_cursor(-1), None],
+        [None, None],
+    ],
+)
+def test_decode_cursor(cursor, expected):
+    assert Job.decode_cursor(cursor) == expected
+
+
+def test_fetch_statuses(mocker):
+    mock_mongo = mocker.MagicMock()
+    fake_ids = ["625f4e3229942e20c16ca336", "625f4e3229942e20c16ca337"]
+    mock_mongo.retrieve_many.return_value = [
+        {"_id": OID(fake_ids[0]), "status": "COMPLETE"}
+    ]
+
+    actual = Job.fetch_statuses(mock_mongo, fake_ids)
+
+    mock_mongo.retrieve_many.assert_called_once_with(
+        Job.COLLECTION,
+        fake_ids,
+        projection={"status": True, "url": True, "error": True, "completed_at": True},
+    )
+    assert actual == {fake_ids[0]: {"status": "COMPLETE", "job_id": fake_ids[0]}}
+
+
+@pytest.mark.parametrize(
+    "oid,expected",
+    [
+        ["625f4e3229942e20c16ca336", True],
+        ["625f4e3229942e20c16ca33", False],
+        ["not_an_id", False],
+        [None, False],
+        [1234, False],
+    ],
+)
+def test_is_valid_id(oid, expected):
+    assert Job.is_valid_id(oid) == expected
+
+
+def test_find_cached_returns_fresh_completed_job(mocker):
+    mock_mongo, mock_metrics = mocker.MagicMock(), _mock_metrics(mocker)
+    fake_id = "625f4e3229942e20c16ca336"
+    mock_mongo.retrieve_latest.return_value = {
+        "_id": OID(fake_id),
+        "completed_at": FAKE_NOW - 10,
+    }
+    mocker.patch("common.mongo.models.job.time.time", return_value=FAKE_NOW)
+
+    actual = Job.find_cached(mock_mongo, "HTTP://Example.com:80", 60)
+
+    mock_mongo.retrieve_latest.assert_called_once_with(
+        Job.COLLECTION,
+        {"url_key": "http://example.com/", "status": "COMPLETE"},
+        "completed_at",
+        projection={"word_count": False, "histogram_id": False},
+    )
+    mock_metrics.increment.assert_called_once_with("result_cache.hits")
+    assert actual == {"completed_at": FAKE_NOW - 10, "job_id": fake_id}
+
+
+def test_find_cached_counts_stale_result_as_eviction(mocker):
+    mock_mongo, mock_metrics = mocker.MagicMock(), _mock_metrics(mocker)
+    mock_mongo.retrieve_latest.return_value = {
+        "_id": OID("625f4e3229942e20c16ca336"),
+        "completed_at": FAKE_NOW - 61,
+    }
+    mocker.patch("common.mongo.models.job.time.time", return_value=FAKE_NOW)
+
+    assert Job.find_cached(mock_mongo, "http://example.com", 60) is None
+    mock_metrics.increment.assert_called_once_with("result_cache.evictions")
+
+
+def test_find_cached_counts_miss(mocker):
+    mock_mongo, mock_metrics = mocker.MagicMock(), _mock_metrics(mocker)
+    mock_mongo.retrieve_latest.return_value = None
+
+    assert Job.find_cached(mock_mongo, "http://example.com", 60) is None
+    mock_metrics.increment.assert_called_once_with("result_cache.misses")
+
+
+def test_ensure_indexes(mocker):
+    mock_mongo = mocker.MagicMock()
+    Job.ensure_indexes(mock_mongo)
+    assert mock_mongo.create_index.call_args_list == [
+        mocker.call(
+            Job.COLLECTION, [("url_key", 1), ("status", 1), ("completed_at", -1)]
+        ),
+        mocker.call(Job.COLLECTION, [("completed_at", -1)]),
+        mocker.call(
+            Job.COLLECTION, [("content_hash", 1), ("status", 1), ("completed_at", -1)]
+        ),
+    ]
+
+
+def test_drain_rate(mocker):
+    mock_mongo = mocker.MagicMock()
+    mock_mongo.count.return_value = 30
+    mocker.patch("common.mongo.models.job.time.time", return_value=FAKE_NOW)
+
+    assert Job.drain_rate(mock_mongo, 60) == 0.5
+    mock_mongo.count.assert_called_once_with(
+        Job.COLLECTION, {"completed_at": {"$gte": FAKE_NOW - 60}}
+    )
+
+
+def _mock_metrics(mocker):
+    return mocker.patch("common.mongo.models.job.metrics")
+
+
 def _mock_fetch(mocker, expected):
     return mocker.patch("common.mongo.models.job.fetch", return_value=expected)
+
+
+FAKE_NOW = 1650000000.0
@@ -0,0 +1,92 @@
+from bson.objectid import ObjectId as OID
+from common.mongo.async_client import AsyncMongoDBClient
+import pymongo
+
+
+async def test_create(mocker):
+    mock_collection = _patch_collection(mocker)
+    mock_collection.insert_one = mocker.AsyncMock(return_value="something")
+    client = AsyncMongoDBClient("host", "db")
+
+    assert await client.create("collection", {"a": 1}) == "something"
+    mock_collection.insert_one.assert_awaited_once_with({"a": 1})
+
+
+async def test_retrieve(mocker):
+    fake_id = "625f4e3229942e20c16ca336"
+    mock_collection = _patch_collection(mocker)
+    mock_collection.find_one = mocker.AsyncMock(return_value="something")
+    client = AsyncMongoDBClient("host", "db")
+
+    assert await client.retrieve("collection", fake_id) == "something"
+    mock_collection.find_one.assert_awaited_once_with(OID(fake_id), None)
+
+
+async def test_aggregate(mocker):
+    mock_collection = _patch_collection(mocker)
+    mock_collection.aggregate.return_value.to_list = mocker.AsyncMock(
+        return_value=["something"]
+    )
+    client = AsyncMongoDBClient("host", "db")
+
+    assert await client.aggregate("collection", [{"$match": {}}]) == ["something"]
+    mock_collection.aggregate.assert_called_once_with([{"$match": {}}])
+    mock_collection.aggregate.return_value.to_list.assert_awaited_once_with(length=None)
+
+
+async def test_retrieve_latest(mocker):
+    mock_collection = _patch_collection(mocker)
+    mock_collection.find_one = mocker.AsyncMock(return_value="something")
+    client = AsyncMongoDBClient("host", "db")
+
+    actual = await client.retrieve_latest("collection", {"a": 1}, "b", {"c": 0})
+
+    assert actual == "something"
+    mock_collection.find_one.assert_awaited_once_with(
+        {"a": 1}, {"c": 0}, sort=[("b", pymongo.DESCENDING)]
+    )
+
+
+async def test_count(mocker):
+    mock_collection = _patch_collection(mocker)
+    mock_collection.count_documents = mocker.AsyncMock(return_value=3)
+    client = AsyncMongoDBClient("host", "db")
+
+    assert await client.count("collection", {"a": 1}) == 3
+    mock_collection.count_documents.assert_awaited_once_with({"a": 1})
+
+
+async def test_is_healthy(mocker):
+    mock_motor = mocker.patch("common.mongo.async_client.AsyncIOMotorClient")
+    mock_motor.return_value.admin.command = mocker.AsyncMock(return_value={"ok": 1})
+    assert await AsyncMongoDBClient("host", "db").is_healthy()
+
+
+async def test_is_unhealthy(mocker):
+    mock_motor = mocker.patch("common.mongo.async_client.AsyncIOMotorClient")
+    mock_motor.return_value.admin.command = mocker.AsyncMock(
+        side_effect=pymongo.errors.ServerSelectionTimeoutError
+    )
+    assert not await AsyncMongoDBClient("host", "db").is_healthy()
+
+
+async def test_get_file(mocker):
+    _patch_collection(mocker)
+    mock_bucket = mocker.patch("common.mongo.async_client.AsyncIOMotorGridFSBucket")
+    mock_stream = mocker.MagicMock()
+    mock_stream.read = mocker.AsyncMock(return_value=b"data")
+    mock_bucket.return_value.open_download_stream = mocker.AsyncMock(
+        return_value=mock_stream
+    )
+    client = AsyncMongoDBClient("host", "db")
+
+    assert await client.get_file("bucket", "file") == b"data"
+    mock_bucket.assert_called_once_with(client.db, "bucket")
+    mock_bucket.return_value.open_download_stream.assert_awaited_once_with("file")
+
+
+def _patch_collection(mocker):
+    mock_motor = mocker.patch("common.mongo.async_client.AsyncIOMotorClient")
+    mock_db = mocker.MagicMock()
+    mock_motor.return_value.__getitem__.return_value = mock_db
+    return mock_db.__getitem__.return_value
@@ -11,7 +11,14 @@ def test_construction(mocker):
 
     client = MongoDBClient(fake_host, fake_db)
 
-    mock_mongo_client.assert_called_once_with(fake_host, 27017)
+    mock_mongo_client.assert_any_call(fake_host, 27017)
+    mock_mongo_client.assert_any_call(
+        fake_host,
+        27017,
+        serverSelectionTimeoutMS=2000,
+        connectTimeoutMS=2000,
+        socketTimeoutMS=2000,
+    )
     mock_mongo_client.return_value.__getitem__.assert_called_once_with(fake_db)
     assert client.db == fake_db_instance
 
@@ -34,6 +41,24 @@ def test_create(mocker):
     assert expected == actual
 
 
+def test_create_many(mocker):
+    mock_mongo_client = mocker.patch("common.mongo.client.MongoClient")
+    mock_db_instance = mocker.MagicMock()
+    fake_collection, fake_documents = "collection", ["doc", "another doc"]
+    mock_mongo_client.return_value.__getitem__.return_value = mock_db_instance
+    client = MongoDBClient("host", "db")
+    expected = "something"
+    mock_db_instance.__getitem__.return_value.insert_many.return_value = expected
+
+    actual = client.create_many(fake_collection, fake_documents)
+
+    mock_db_instance.__getitem__.assert_called_once_with(fake_collection)
+    mock_db_instance.__getitem__.return_value.insert_many.assert_called_once_with(
+        fake_documents
+    )
+    assert expected == actual
+
+
 def test_update(mocker):
     mock_mongo_client = mocker.patch("common.mongo.client.MongoClient")
     mock_db_instance = mocker.MagicMock()
@@ -66,11 +91,187 @@ def test_retrieve(mocker):
 
     mock_db_instance.__getitem__.assert_called_once_with(fake_collection)
     mock_db_instance.__getitem__.return_value.find_one.assert_called_once_with(
-        OID(fake_id)
+        OID(fake_id), None
+    )
+    assert expected == actual
+
+
+def test_retrieve_many(mocker):
+    mock_mongo_client = mocker.patch("common.mongo.client.MongoClient")
+    mock_db_instance = mocker.MagicMock()
+    fake_collection, fake_id, fake_projection = (
+        "collection",
+        "625f4e3229942e20c16ca336",
+        {"a": True},
+    )
+    mock_mongo_client.return_value.__getitem__.return_value = mock_db_instance
+    client = MongoDBClient("host", "db")
+    expected = ["something"]
+    mock_db_instance.__getitem__.return_value.find.return_value = iter(expected)
+
+    actual = client.retrieve_many(fake_collection, [fake_id], fake_projection)
+
+    mock_db_instance.__getitem__.assert_called_once_with(fake_collection)
+    mock_db_instance.__getitem__.return_value.find.assert_called_once_with(
+        {"_id": {"$in": [OID(fake_id)]}}, fake_projection
+    )
+    assert expected == actual
+
+
+def test_retrieve_latest(mocker):
+    mock_mongo_client = mocker.patch("common.mongo.client.MongoClient")
+    mock_db_instance = mocker.MagicMock()
+    fake_collection, fake_query, fake_projection = "collection", {"a": 1}, {"b": 0}
+    mock_mongo_client.return_value.__getitem__.return_value = mock_db_instance
+    client = MongoDBClient("host", "db")
+    expected = "something"
+    mock_db_instance.__getitem__.return_value.find_one.return_value = expected
+
+    actual = client.retrieve_latest(
+        fake_collection, fake_query, "created", projection=fake_projection
+    )
+
+    mock_db_instance.__getitem__.assert_called_once_with(fake_collection)
+    mock_db_instance.__getitem__.return_value.find_one.assert_called_once_with(
+        fake_query, fake_projection, sort=[("created", pymongo.DESCENDING)]
     )
     assert expected == actual
 
 
+def test_aggregate(mocker):
+    mock_mongo_client = mocker.patch("common.mongo.client.MongoClient")
+    mock_db_instance = mocker.MagicMock()
+    fake_collection, fake_pipeline = "collection", [{"$match": {"a": 1}}]
+    mock_mongo_client.return_value.__getitem__.return_value = mock_db_instance
+    client = MongoDBClient("host", "db")
+    expected = ["something"]
+    mock_db_instance.__getitem__.return_value.aggregate.return_value = iter(expected)
+
+    actual = client.aggregate(fake_collection, fake_pipeline)
+
+    mock_db_instance.__getitem__.assert_called_once_with(fake_collection)
+    mock_db_instance.__getitem__.return_value.aggregate.assert_called_once_with(
+        fake_pipeline
+    )
+    assert expected == actual
+
+
+def test_bulk_update(mocker):
+    mock_mongo_client = mocker.patch("common.mongo.client.MongoClient")
+    mock_db_instance = mocker.MagicMock()
+    fake_ids = ["625f4e3229942e20c16ca336", "625f4e3229942e20c16ca337"]
+    mock_mongo_client.return_value.__getitem__.return_value = mock_db_instance
+    client = MongoDBClient("host", "db")
+    mock_collection = mock_db_instance.__getitem__.return_value
+    mock_collection.bulk_write.return_value = "result"
+
+    actual = client.bulk_update(
+        "collection", [(fake_ids[0], {"a": 1}), (fake_ids[1], {"b": 2})]
+    )
+
+    mock_db_instance.__getitem__.assert_called_once_with("collection")
+    mock_collection.bulk_write.assert_called_once_with(
+        [
+            pymongo.UpdateOne({"_id": OID(fake_ids[0])}, {"$set": {"a": 1}}),
+            pymongo.UpdateOne({"_id": OID(fake_ids[1])}, {"$set": {"b": 2}}),
+        ],
+        ordered=False,
+    )
+    assert actual == "result"
+
+
+def test_replace(mocker):
+    mock_mongo_client = mocker.patch("common.mongo.client.MongoClient")
+    mock_db_instance = mocker.MagicMock()
+    fake_id = "625f4e3229942e20c16ca336"
+    mock_mongo_client.return_value.__getitem__.return_value = mock_db_instance
+    client = MongoDBClient("host", "db")
+    mock_collection = mock_db_instance.__getitem__.return_value
+    mock_collection.replace_one.return_value = "result"
+
+    actual = client.replace("collection", fake_id, {"a": 1})
+
+    mock_collection.replace_one.assert_called_once_with(
+        {"_id": OID(fake_id)}, {"a": 1}, upsert=True
+    )
+    assert actual == "result"
+
+
+def test_bulk_replace(mocker):
+    mock_mongo_client = mocker.patch("common.mongo.client.MongoClient")
+    mock_db_instance = mocker.MagicMock()
+    fake_ids = ["625f4e3229942e20c16ca336", "625f4e3229942e20c16ca337"]
+    mock_mongo_client.return_value.__getitem__.return_value = mock_db_instance
+    client = MongoDBClient("host", "db")
+    mock_collection = mock_db_instance.__getitem__.return_value
+    mock_collection.bulk_write.return_value = "result"
+
+    actual = client.bulk_replace(
+        "collection", [(fake_ids[0], {"a": 1}), (fake_ids[1], {"b": 2})]
+    )
+
+    mock_collection.bulk_write.assert_called_once_with(
+        [
+            pymongo.ReplaceOne({"_id": OID(fake_ids[0])}, {"a": 1}, upsert=True),
+            pymongo.ReplaceOne({"_id": OID(fake_ids[1])}, {"b": 2}, upsert=True),
+        ],
+        ordered=False,
+    )
+    assert actual == "result"
+
+
+def test_put_file(mocker):
+    mocker.patch("common.mongo.client.MongoClient")
+    mock_bucket = mocker.patch("common.mongo.client.GridFSBucket")
+    mock_bucket.return_value.upload_from_stream.return_value = "file"
+    client = MongoDBClient("host", "db")
+
+    assert client.put_file("bucket", b"data") == "file"
+    mock_bucket.assert_called_once_with(client.db, "bucket")
+    mock_bucket.return_value.upload_from_stream.assert_called_once_with(
+        "bucket", b"data"
+    )
+
+
+def test_get_file(mocker):
+    mocker.patch("common.mongo.client.MongoClient")
+    mock_bucket = mocker.patch("common.mongo.client.GridFSBucket")
+    mock_stream = mock_bucket.return_value.open_download_stream.return_value
+    mock_stream.read.return_value = b"data"
+    client = MongoDBClient("host", "db")
+
+    assert client.get_file("bucket", "file") == b"data"
+    mock_bucket.assert_called_once_with(client.db, "bucket")
+    mock_bucket.return_value.open_download_stream.assert_called_once_with("file")
+
+
+def test_create_index(mocker):
+    mock_mongo_client = mocker.patch("common.mongo.client.MongoClient")
+    mock_db_instance = mocker.MagicMock()
+    fake_collection, fake_keys = "collection", [("a", 1)]
+    mock_mongo_client.return_value.__getitem__.return_value = mock_db_instance
+    client = MongoDBClient("host", "db")
+
+    client.create_index(fake_collection, fake_keys)
+
+    mock_db_instance.__getitem__.return_value.create_index.assert_called_once_with(
+        fake_keys
+    )
+
+
+def test_count(mocker):
+    mock_mongo_client = mocker.patch("common.mongo.client.MongoClient")
+    mock_db_instance = mocker.MagicMock()
+    mock_mongo_client.return_value.__getitem__.return_value = mock_db_instance
+    client = MongoDBClient("host", "db")
+    mock_db_instance.__getitem__.return_value.count_documents.return_value = 3
+
+    assert client.count("collection", {"a": 1}) == 3
+    mock_db_instance.__getitem__.return_value.count_documents.assert_called_once_with(
+        {"a": 1}
+    )
+
+
 def test_exists(mocker):
     mock_mongo_client = mocker.patch("common.mongo.client.MongoClient")
     mock_db_instance = mocker.MagicMock()
@@ -93,16 +294,18 @@ def test_exists(mocker):
 
 def test_is_healthy(mocker):
     mock_mongo_client = mocker.patch("common.mongo.client.MongoClient")
-    mock_mongo_client.return_value.server_info.return_value = True
+    mock_command = mock_mongo_client.return_value.admin.command
+    mock_command.return_value = {"ok": 1.0}
     client = MongoDBClient("host", "db")
     assert client.is_healthy
+    mock_command.assert_called_once_with("ping")
 
 
 def test_is_unhealthy(mocker):
-    def _raise():
+    def _raise(_):
         raise pymongo.errors.ServerSelectionTimeoutError
 
     mock_mongo_client = mocker.patch("common.mongo.client.MongoClient")
-    mock_mongo_client.return_value.server_info.side_effect = _raise
+    mock_mongo_client.return_value.admin.command.side_effect = _raise
     client = MongoDBClient("host", "db")
     assert not client.is_healthy
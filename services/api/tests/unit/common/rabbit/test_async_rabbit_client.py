@@ -0,0 +1,113 @@
+from common.rabbit.async_client import AsyncRabbitMQClient
+import aio_pika
+import asyncio
+
+
+async def test_connect_declares_queue_and_events_exchange(mocker):
+    mock_aio_pika = _patch_aio_pika(mocker)
+    client = AsyncRabbitMQClient("host", "queue")
+
+    await client.connect()
+
+    mock_aio_pika.connect_robust.assert_awaited_once_with(host="host")
+    mock_connection = mock_aio_pika.connect_robust.return_value
+    mock_connection.channel.assert_awaited_once_with(publisher_confirms=True)
+    mock_channel = mock_connection.channel.return_value
+    assert mock_channel.declare_queue.await_args_list == [
+        mocker.call("queue.high", durable=True),
+        mocker.call("queue", durable=True),
+        mocker.call("queue.low", durable=True),
+    ]
+    mock_channel.declare_exchange.assert_awaited_once_with(
+        "queue.events", aio_pika.ExchangeType.FANOUT
+    )
+
+
+async def test_publish_connects_once_and_publishes_persistent_message(mocker):
+    mock_aio_pika = _patch_aio_pika(mocker)
+    client = AsyncRabbitMQClient("host", "queue")
+
+    await client.publish({"a": "b"})
+    await client.publish({"c": "d"})
+
+    mock_aio_pika.connect_robust.assert_awaited_once()
+    mock_channel = mock_aio_pika.connect_robust.return_value.channel.return_value
+    publish = mock_channel.default_exchange.publish
+    assert publish.await_count == 2
+    message = publish.await_args_list[0].args[0]
+    assert message.body == b'{"a": "b"}'
+    assert message.delivery_mode == aio_pika.DeliveryMode.PERSISTENT
+    assert publish.await_args_list[0].kwargs == {"routing_key": "queue"}
+
+
+async def test_publish_routes_to_lane_queue(mocker):
+    mock_aio_pika = _patch_aio_pika(mocker)
+    client = AsyncRabbitMQClient("host", "queue")
+
+    await client.publish({"a": "b"}, "high")
+
+    mock_channel = mock_aio_pika.connect_robust.return_value.channel.return_value
+    publish = mock_channel.default_exchange.publish
+    assert publish.await_args.kwargs == {"routing_key": "queue.high"}
+
+
+async def test_queue_depth_sums_every_lane(mocker):
+    mock_aio_pika = _patch_aio_pika(mocker)
+    mock_channel = mock_aio_pika.connect_robust.return_value.channel.return_value
+    mock_channel.declare_queue.return_value.declaration_result.message_count = 2
+    client = AsyncRabbitMQClient("host", "queue")
+
+    assert await client.queue_depth() == 6
+    assert mock_channel.declare_queue.await_args_list[-3:] == [
+        mocker.call("queue.high", passive=True),
+        mocker.call("queue", passive=True),
+        mocker.call("queue.low", passive=True),
+    ]
+
+
+async def test_subscribe_binds_exclusive_queue(mocker):
+    mock_aio_pika = _patch_aio_pika(mocker)
+    client = AsyncRabbitMQClient("host", "queue")
+    received = []
+
+    await client.subscribe(received.append)
+
+    mock_channel = mock_aio_pika.connect_robust.return_value.channel.return_value
+    mock_channel.declare_queue.assert_awaited_with(exclusive=True)
+    mock_queue = mock_channel.declare_queue.return_value
+    mock_queue.bind.assert_awaited_once_with(mock_channel.declare_exchange.return_value)
+    on_message = mock_queue.consume.await_args.args[0]
+    assert mock_queue.consume.await_args.kwargs == {"no_ack": True}
+    await on_message(mocker.MagicMock(body=b'{"job_id": "a"}'))
+    await on_message(mocker.MagicMock(body=b"not json"))
+    assert received == [{"job_id": "a"}]
+
+
+async def test_is_healthy(mocker):
+    mock_aio_pika = _patch_aio_pika(mocker)
+    client = AsyncRabbitMQClient("host", "queue")
+    assert await client.is_healthy()
+    mock_aio_pika.connect.return_value.close.assert_awaited_once()
+
+
+async def test_is_unhealthy_on_timeout(mocker):
+    async def _hang(**_):
+        await asyncio.sleep(1)
+
+    mock_aio_pika = _patch_aio_pika(mocker)
+    mock_aio_pika.connect.side_effect = _hang
+    client = AsyncRabbitMQClient("host", "queue", health_timeout=0.01)
+    assert not await client.is_healthy()
+
+
+async def test_is_unhealthy_on_connection_error(mocker):
+    mock_aio_pika = _patch_aio_pika(mocker)
+    mock_aio_pika.connect.side_effect = ConnectionError
+    client = AsyncRabbitMQClient("host", "queue")
+    assert not await client.is_healthy()
+
+
+def _patch_aio_pika(mocker):
+    return mocker.patch(
+        "common.rabbit.async_client.aio_pika", new_callable=mocker.AsyncMock
+    )
@@ -0,0 +1,30 @@
+from common.rabbit import lanes as Lanes
+import pytest
+
+
+def test_queue_name_keeps_default_lane_on_base_queue():
+    assert Lanes.queue_name("jobs", "normal") == "jobs"
+    assert Lanes.queue_name("jobs", "high") == "jobs.high"
+
+
+def test_delay_queue_name():
+    assert Lanes.delay_queue_name("jobs", "normal") == "jobs.delay"
+    assert Lanes.delay_queue_name("jobs", "low") == "jobs.low.delay"
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [({"priority": "low"}, "low"), ({"priority": "urgent"}, "normal"), ({}, "normal")],
+)
+def test_lane_of(message, expected):
+    assert Lanes.lane_of(message) == expected
+
+
+def test_job_message(mocker):
+    mocker.patch("common.rabbit.lanes.time.time", return_value=1.5)
+    assert Lanes.job_message("a", "https://w.ww", "high") == {
+        "job_id": "a",
+        "url": "https://w.ww",
+        "priority": "high",
+        "queued_at": 1.5,
+    }
@@ -11,7 +11,14 @@ def test_construction(mocker):
 
     client = RabbitMQClient(fake_host, fake_queue)
 
-    mock_pika.ConnectionParameters.assert_called_once_with(host=fake_host)
+    mock_pika.ConnectionParameters.assert_any_call(host=fake_host)
+    mock_pika.ConnectionParameters.assert_any_call(
+        host=fake_host,
+        connection_attempts=1,
+        socket_timeout=2.0,
+        stack_timeout=2.0,
+        blocked_connection_timeout=2.0,
+    )
     assert client._connection_parameters == fake_connection_params
     assert client._queue == fake_queue
 
@@ -27,19 +34,202 @@ def test_publish(mocker):
 
     client.publish(fake_body)
 
-    mock_pika.BasicProperties.assert_called_once_with(delivery_mode=fake_delivery_mode)
+    mock_pika.BasicProperties.assert_called_once_with(
+        delivery_mode=fake_delivery_mode, expiration=None
+    )
     mock_pika.BlockingConnection.assert_called_once_with(fake_connection_params)
     mock_connection = mock_pika.BlockingConnection.return_value
     mock_connection.channel.assert_called_once()
-    mock_connection.close.assert_called_once()
+    mock_connection.close.assert_not_called()
     mock_channel = mock_connection.channel.return_value
-    mock_channel.queue_declare.assert_called_once_with(queue=fake_queue, durable=True)
+    assert mock_channel.queue_declare.call_args_list == [
+        mocker.call(queue=f"{fake_queue}.high", durable=True),
+        mocker.call(queue=fake_queue, durable=True),
+        mocker.call(queue=f"{fake_queue}.low", durable=True),
+        *[
+            mocker.call(
+                queue=f"{queue}.delay",
+                durable=True,
+                arguments={
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": queue,
+                },
+            )
+            for queue in [f"{fake_queue}.high", fake_queue, f"{fake_queue}.low"]
+        ],
+    ]
+    mock_channel.exchange_declare.assert_called_once_with(
+        exchange=f"{fake_queue}.events", exchange_type="fanout"
+    )
+    mock_channel.tx_select.assert_called_once()
     mock_channel.basic_publish.assert_called_once_with(
         exchange="",
         routing_key=fake_queue,
         body=b'{"a": "b"}',
         properties=fake_properties,
     )
+    mock_channel.tx_commit.assert_called_once()
+
+
+def test_publish_many_routes_to_lane_queue(mocker):
+    client, _, _, mock_channel = _setup_publisher_test(mocker)
+
+    client.publish_many([{"a": "b"}], "low")
+
+    assert mock_channel.basic_publish.call_args.kwargs["routing_key"] == "queue.low"
+
+
+def test_publish_reuses_open_connection(mocker):
+    client, mock_pika, mock_connection, mock_channel = _setup_publisher_test(mocker)
+
+    client.publish({"a": "b"})
+    client.publish({"c": "d"})
+
+    mock_pika.BlockingConnection.assert_called_once()
+    assert mock_channel.queue_declare.call_count == 6
+    mock_channel.tx_select.assert_called_once()
+    assert mock_channel.basic_publish.call_count == 2
+    assert mock_channel.tx_commit.call_count == 2
+
+
+def test_publish_many_commits_once_per_batch(mocker):
+    client, mock_pika, mock_connection, mock_channel = _setup_publisher_test(mocker)
+
+    client.publish_many([{"a": "b"}, {"c": "d"}, {"e": "f"}])
+
+    mock_pika.BlockingConnection.assert_called_once()
+    assert mock_channel.basic_publish.call_count == 3
+    mock_channel.tx_commit.assert_called_once()
+
+
+def test_publish_many_skips_empty_batch(mocker):
+    client, mock_pika, _, _ = _setup_publisher_test(mocker)
+    client.publish_many([])
+    mock_pika.BlockingConnection.assert_not_called()
+
+
+def test_publish_reconnects_when_connection_is_closed(mocker):
+    client, mock_pika, mock_connection, mock_channel = _setup_publisher_test(mocker)
+
+    client.publish({"a": "b"})
+    mock_connection.is_closed = True
+    client.publish({"a": "b"})
+
+    assert mock_pika.BlockingConnection.call_count == 2
+
+
+def test_publish_retries_once_on_amqp_error(mocker):
+    client, mock_pika, mock_connection, mock_channel = _setup_publisher_test(mocker)
+    mock_channel.tx_commit.side_effect = [pika.exceptions.AMQPError, None]
+
+    client.publish({"a": "b"})
+
+    assert mock_pika.BlockingConnection.call_count == 2
+    mock_connection.close.assert_called_once()
+    assert mock_channel.basic_publish.call_count == 2
+
+
+def test_publish_raises_if_retry_fails(mocker):
+    client, mock_pika, mock_connection, mock_channel = _setup_publisher_test(mocker)
+    mock_channel.tx_commit.side_effect = pika.exceptions.AMQPError
+
+    with pytest.raises(pika.exceptions.AMQPError):
+        client.publish({"a": "b"})
+
+    assert mock_pika.BlockingConnection.call_count == 2
+
+
+def test_publish_reconnects_after_fork(mocker):
+    client, mock_pika, mock_connection, mock_channel = _setup_publisher_test(mocker)
+    mock_getpid = mocker.patch("common.rabbit.client.os.getpid", return_value=1)
+
+    client.publish({"a": "b"})
+    mock_getpid.return_value = 2
+    client.publish({"a": "b"})
+
+    assert mock_pika.BlockingConnection.call_count == 2
+    mock_connection.close.assert_not_called()
+
+
+def test_publish_delayed_expires_into_lane_queue(mocker):
+    client, mock_pika, _, mock_channel = _setup_publisher_test(mocker)
+
+    client.publish_delayed({"a": "b"}, "low", 2.5)
+
+    mock_pika.BasicProperties.assert_called_once_with(
+        delivery_mode=mock_pika.spec.PERSISTENT_DELIVERY_MODE, expiration="2500"
+    )
+    assert mock_channel.basic_publish.call_args.kwargs["routing_key"] == (
+        "queue.low.delay"
+    )
+
+
+def test_queue_depth_declares_queue_passively(mocker):
+    client, _, _, mock_channel = _setup_publisher_test(mocker)
+    mock_channel.queue_declare.return_value.method.message_count = 14
+
+    assert client.queue_depth() == 42
+    assert mock_channel.queue_declare.call_args_list[-3:] == [
+        mocker.call(queue="queue.high", passive=True),
+        mocker.call(queue="queue", passive=True),
+        mocker.call(queue="queue.low", passive=True),
+    ]
+
+
+def test_queue_depth_reconnects_on_amqp_error(mocker):
+    client, mock_pika, mock_connection, mock_channel = _setup_publisher_test(mocker)
+    client.publish({"a": "b"})
+    mock_channel.queue_declare.side_effect = [
+        pika.exceptions.AMQPError,
+        *[None] * 6,
+        *[mocker.MagicMock(**{"method.message_count": 7})] * 3,
+    ]
+
+    assert client.queue_depth() == 21
+    assert mock_pika.BlockingConnection.call_count == 2
+    mock_connection.close.assert_called_once()
+
+
+def test_notify_publishes_to_events_exchange(mocker):
+    client, mock_pika, mock_connection, mock_channel = _setup_publisher_test(mocker)
+
+    client.notify({"job_id": "a"})
+
+    mock_channel.basic_publish.assert_called_once_with(
+        exchange="queue.events",
+        routing_key="",
+        body=b'{"job_id": "a"}',
+        properties=mock_pika.BasicProperties.return_value,
+    )
+    mock_channel.tx_commit.assert_called_once()
+
+
+def test_subscribe(mocker):
+    fake_connection_params, fake_queue = "connect_to_something", "queue"
+    mock_pika = mocker.patch("common.rabbit.client.pika")
+    client = RabbitMQClient("whatever", fake_queue, events_exchange="events")
+    client._connection_parameters = fake_connection_params
+    mock_connection = mock_pika.BlockingConnection.return_value
+    mock_channel = mock_connection.channel.return_value
+    mock_channel.queue_declare.return_value.method.queue = "exclusive_queue"
+    received = []
+
+    client.subscribe(received.append)
+
+    mock_pika.BlockingConnection.assert_called_once_with(fake_connection_params)
+    mock_channel.exchange_declare.assert_called_once_with(
+        exchange="events", exchange_type="fanout"
+    )
+    mock_channel.queue_declare.assert_called_once_with(queue="", exclusive=True)
+    mock_channel.queue_bind.assert_called_once_with(
+        queue="exclusive_queue", exchange="events"
+    )
+    mock_channel.start_consuming.assert_called_once()
+    on_message = mock_channel.basic_consume.call_args.kwargs["on_message_callback"]
+    assert mock_channel.basic_consume.call_args.kwargs["auto_ack"]
+    on_message(mock_channel, None, None, b'{"job_id": "a"}')
+    on_message(mock_channel, None, None, b"not json")
+    assert received == [{"job_id": "a"}]
 
 
 def test_consume(mocker):
@@ -55,12 +245,25 @@ def test_consume(mocker):
     mock_connection = mock_pika.BlockingConnection.return_value
     mock_connection.channel.assert_called_once()
     mock_channel = mock_connection.channel.return_value
-    mock_channel.queue_declare.assert_called_once_with(queue=fake_queue, durable=True)
+    assert mock_channel.queue_declare.call_count == 3
     mock_channel.basic_qos.assert_called_once_with(prefetch_count=1)
-    mock_channel.basic_consume(queue=fake_queue, on_message_callback=fake_callback)
+    assert mock_channel.basic_consume.call_args_list == [
+        mocker.call(queue=queue, on_message_callback=fake_callback)
+        for queue in [f"{fake_queue}.high", fake_queue, f"{fake_queue}.low"]
+    ]
     mock_channel.start_consuming.assert_called_once()
 
 
+def test_consume_with_prefetch(mocker):
+    mock_pika = mocker.patch("common.rabbit.client.pika")
+    client = RabbitMQClient("whatever", "queue")
+
+    client.consume("a_function", prefetch_count=16)
+
+    mock_channel = mock_pika.BlockingConnection.return_value.channel.return_value
+    mock_channel.basic_qos.assert_called_once_with(prefetch_count=16)
+
+
 def test_is_healthy(mocker):
     (
         client,
@@ -72,6 +275,7 @@ def test_is_healthy(mocker):
 
     mock_pika.BlockingConnection.assert_called_once_with(fake_connection_params)
     mock_connection.channel.assert_called_once()
+    mock_connection.close.assert_called_once()
 
 
 def test_is_unhealthy_raise(mocker):
@@ -104,6 +308,7 @@ def test_is_unhealthy(mocker, connection_states):
 
     mock_pika.BlockingConnection.assert_called_once_with(fake_connection_params)
     mock_connection.channel.assert_called_once()
+    mock_connection.close.assert_called_once()
 
 
 def _setup_health_check_test(mocker, conn_closed=False, chan_closed=False):
@@ -111,9 +316,20 @@ def _setup_health_check_test(mocker, conn_closed=False, chan_closed=False):
     fake_queue = "queue"
     mock_pika = mocker.patch("common.rabbit.client.pika")
     client = RabbitMQClient("whatever", fake_queue)
-    client._connection_parameters = fake_connection_params
+    client._health_check_parameters = fake_connection_params
     mock_connection = mock_pika.BlockingConnection.return_value
     mock_channel = mock_connection.channel.return_value
     mock_connection.is_closed = conn_closed
     mock_channel.is_closed = chan_closed
     return client, mock_pika, mock_connection, fake_connection_params
+
+
+def _setup_publisher_test(mocker):
+    mock_pika = mocker.patch("common.rabbit.client.pika")
+    mock_pika.exceptions.AMQPError = pika.exceptions.AMQPError
+    client = RabbitMQClient("whatever", "queue")
+    mock_connection = mock_pika.BlockingConnection.return_value
+    mock_channel = mock_connection.channel.return_value
+    mock_connection.is_closed = False
+    mock_channel.is_closed = False
+    return client, mock_pika, mock_connection, mock_channel
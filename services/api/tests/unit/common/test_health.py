@@ -0,0 +1,91 @@
+from common.health import AsyncHealthMonitor, HealthMonitor
+import asyncio
+
+
+def test_report_is_unhealthy_before_first_refresh():
+    monitor = HealthMonitor({"a": lambda: True}, interval=1)
+    assert not monitor.is_healthy
+    assert monitor.report["a"]["last_success"] is None
+
+
+def test_refresh_records_probe_results():
+    monitor = HealthMonitor({"a": lambda: True, "b": lambda: False}, interval=1)
+    monitor.refresh()
+    report = monitor.report
+    assert not monitor.is_healthy
+    assert report["a"]["healthy"] and report["a"]["last_success"] is not None
+    assert not report["b"]["healthy"] and report["b"]["last_success"] is None
+    assert all(r["latency_ms"] >= 0 for r in report.values())
+
+
+def test_refresh_keeps_last_success_when_probe_fails():
+    results = [True, False]
+    monitor = HealthMonitor({"a": lambda: results.pop(0)}, interval=1)
+    monitor.refresh()
+    last_success = monitor.report["a"]["last_success"]
+    monitor.refresh()
+    assert not monitor.report["a"]["healthy"]
+    assert monitor.report["a"]["last_success"] == last_success
+
+
+def test_refresh_treats_raising_probe_as_unhealthy():
+    def _raise():
+        raise RuntimeError
+
+    monitor = HealthMonitor({"a": _raise}, interval=1)
+    monitor.refresh()
+    assert not monitor.is_healthy
+
+
+def test_start_probes_once_and_spawns_one_background_thread(mocker):
+    mock_thread = mocker.patch("common.health.threading.Thread")
+    probe = mocker.MagicMock(return_value=True)
+    monitor = HealthMonitor({"a": probe}, interval=1)
+
+    monitor.start()
+    monitor.start()
+
+    probe.assert_called_once()
+    mock_thread.assert_called_once_with(target=monitor._run, daemon=True)
+    mock_thread.return_value.start.assert_called_once()
+    assert monitor.is_healthy
+
+
+async def test_async_refresh_records_probe_results():
+    async def _healthy():
+        return True
+
+    async def _unhealthy():
+        return False
+
+    monitor = AsyncHealthMonitor({"a": _healthy, "b": _unhealthy}, 1, timeout=1)
+    await monitor.refresh()
+    assert monitor.report["a"]["healthy"]
+    assert not monitor.report["b"]["healthy"]
+    assert not monitor.is_healthy
+
+
+async def test_async_refresh_treats_slow_probe_as_unhealthy():
+    async def _slow():
+        await asyncio.sleep(1)
+        return True
+
+    monitor = AsyncHealthMonitor({"a": _slow}, 1, timeout=0.01)
+    await monitor.refresh()
+    assert not monitor.is_healthy
+    assert monitor.report["a"]["latency_ms"] < 1000
+
+
+async def test_async_start_and_stop():
+    calls = []
+
+    async def _probe():
+        calls.append(True)
+        return True
+
+    monitor = AsyncHealthMonitor({"a": _probe}, 60, timeout=1)
+    await monitor.start()
+    await monitor.start()
+    await monitor.stop()
+    assert calls == [True]
+    assert monitor.is_healthy
@@ -0,0 +1,53 @@
+from common import metrics
+
+
+def test_increment_and_snapshot():
+    metrics.reset()
+    metrics.increment("a")
+    metrics.increment("a", 2)
+    metrics.increment("b")
+    assert metrics.snapshot()["counters"] == {"a": 3, "b": 1}
+
+
+def test_set_gauge():
+    metrics.reset()
+    metrics.set_gauge("a", 1.5)
+    metrics.set_gauge("a", 2)
+    assert metrics.snapshot()["gauges"] == {"a": 2}
+
+
+def test_reset():
+    metrics.increment("a")
+    metrics.set_gauge("b", 1)
+    metrics.observe("c", 1)
+    metrics.reset()
+    assert metrics.snapshot() == {"counters": {}, "gauges": {}, "percentiles": {}}
+
+
+def test_discard_drops_every_series_under_prefix():
+    metrics.reset()
+    metrics.increment("host.a.requests")
+    metrics.set_gauge("host.a.ratio", 1)
+    metrics.observe("host.a.latency", 1)
+    metrics.increment("host.ab.requests")
+    metrics.discard("host.a.")
+    assert metrics.snapshot() == {
+        "counters": {"host.ab.requests": 1},
+        "gauges": {},
+        "percentiles": {},
+    }
+
+
+def test_observe_reports_percentiles():
+    metrics.reset()
+    for value in range(1, 101):
+        metrics.observe("a", value)
+    assert metrics.snapshot()["percentiles"] == {"a": {"p50": 50, "p90": 90, "p99": 99}}
+
+
+def test_observe_keeps_recent_samples(mocker):
+    metrics.reset()
+    mocker.patch("common.metrics.SAMPLE_WINDOW", 2)
+    for value in [100, 1, 2]:
+        metrics.observe("a", value)
+    assert metrics.snapshot()["percentiles"]["a"]["p99"] == 2
@@ -0,0 +1,136 @@
+from web.admission import AsyncBackpressure, Backpressure, TokenBuckets
+import pytest
+
+
+def test_backpressure_disabled_without_high_watermark(mocker):
+    queue_depth = mocker.MagicMock(return_value=10**6)
+    backpressure = _backpressure(queue_depth, high_watermark=0)
+
+    backpressure.start()
+
+    queue_depth.assert_not_called()
+    assert backpressure.retry_after() is None
+
+
+def test_backpressure_sheds_between_watermarks_with_hysteresis(mocker):
+    queue_depth = mocker.MagicMock()
+    backpressure = _backpressure(queue_depth)
+
+    for depth, expected_shedding in [
+        (50, False),
+        (100, True),
+        (60, True),
+        (20, False),
+        (60, False),
+    ]:
+        queue_depth.return_value = depth
+        backpressure.refresh()
+        assert (backpressure.retry_after() is not None) == expected_shedding
+
+
+@pytest.mark.parametrize(
+    "depth,drain_rate,expected",
+    [[120, 10.0, 10], [120, 1000.0, 1], [120, 0.0, 300], [10**6, 1.0, 300]],
+)
+def test_backpressure_retry_after_uses_drain_rate(mocker, depth, drain_rate, expected):
+    backpressure = _backpressure(
+        mocker.MagicMock(return_value=depth), drain_rate=drain_rate
+    )
+    backpressure.refresh()
+    assert backpressure.retry_after() == expected
+
+
+def test_backpressure_keeps_last_sample_when_probe_fails(mocker):
+    queue_depth = mocker.MagicMock(return_value=150)
+    backpressure = _backpressure(queue_depth)
+    backpressure.refresh()
+
+    queue_depth.side_effect = RuntimeError("boom")
+    backpressure.refresh()
+
+    assert backpressure.retry_after() is not None
+
+
+async def test_async_backpressure_sheds_above_high_watermark(mocker):
+    queue_depth = mocker.AsyncMock(return_value=150)
+    backpressure = _async_backpressure(queue_depth)
+
+    await backpressure.refresh()
+    assert backpressure.retry_after() == 130
+
+    queue_depth.return_value = 10
+    await backpressure.refresh()
+    assert backpressure.retry_after() is None
+
+
+async def test_async_backpressure_disabled_without_high_watermark(mocker):
+    queue_depth = mocker.AsyncMock(return_value=10**6)
+    backpressure = _async_backpressure(queue_depth, high_watermark=0)
+
+    await backpressure.start()
+
+    queue_depth.assert_not_awaited()
+    assert backpressure.retry_after() is None
+
+
+async def test_async_backpressure_keeps_last_sample_when_probe_fails(mocker):
+    queue_depth = mocker.AsyncMock(return_value=150)
+    backpressure = _async_backpressure(queue_depth)
+    await backpressure.refresh()
+
+    queue_depth.side_effect = RuntimeError("boom")
+    await backpressure.refresh()
+
+    assert backpressure.retry_after() is not None
+
+
+def test_token_buckets_disabled_without_rate():
+    assert TokenBuckets(rate=0, burst=1).acquire("a") is None
+
+
+def test_token_buckets_limit_each_client(mocker):
+    clock = mocker.patch("web.admission.time.monotonic", return_value=100.0)
+    buckets = TokenBuckets(rate=0.5, burst=2)
+
+    assert buckets.acquire("a") is None
+    assert buckets.acquire("a") is None
+    assert buckets.acquire("a") == 2
+    assert buckets.acquire("b") is None
+
+    clock.return_value = 102.0
+    assert buckets.acquire("a") is None
+    assert buckets.acquire("a") == 2
+
+
+def test_token_buckets_forget_least_recent_clients(mocker):
+    mocker.patch("web.admission.time.monotonic", return_value=100.0)
+    buckets = TokenBuckets(rate=1, burst=1, max_clients=1)
+
+    assert buckets.acquire("a") is None
+    assert buckets.acquire("b") is None
+    assert buckets.acquire("a") is None
+
+
+def _backpressure(queue_depth, high_watermark=100, drain_rate=1.0):
+    return Backpressure(
+        queue_depth,
+        lambda: drain_rate,
+        high_watermark=high_watermark,
+        low_watermark=20,
+        interval=1,
+        max_retry_after=300,
+    )
+
+
+def _async_backpressure(queue_depth, high_watermark=100, drain_rate=1.0):
+    async def _drain_rate():
+        return drain_rate
+
+    return AsyncBackpressure(
+        queue_depth,
+        _drain_rate,
+        high_watermark=high_watermark,
+        low_watermark=20,
+        interval=1,
+        max_retry_after=300,
+    )
@@ -0,0 +1,313 @@
+from tests.assertions import assert_response
+from common.health import HealthStatus
+from common.mongo.models.job import JobStatus
+from web import async_endpoints
+import aio_pika
+import asyncio
+import bson
+import pymongo
+import pytest
+
+
+@pytest.fixture()
+async def client(aiohttp_client, mocker):
+    mocker.patch(f"{ROOT_PATCH_PATH}.health_monitor", new=mocker.AsyncMock())
+    mocker.patch(f"{ROOT_PATCH_PATH}.completion_waiters", new=mocker.AsyncMock())
+    mocker.patch(f"{ROOT_PATCH_PATH}.rabbit_client", new=mocker.AsyncMock())
+    mock_backpressure = mocker.patch(f"{ROOT_PATCH_PATH}.backpressure")
+    mock_backpressure.start, mock_backpressure.stop = (
+        mocker.AsyncMock(),
+        mocker.AsyncMock(),
+    )
+    mock_backpressure.retry_after.return_value = None
+    return await aiohttp_client(async_endpoints.create_app())
+
+
+async def test_word_count_get(client, mocker):
+    expected_job = {"job_id": FAKE_JOB_ID}
+    mock_job = _mock_job(mocker)
+    mock_job.fetch.return_value = expected_job
+
+    response = await _get(client, {"job_id": FAKE_JOB_ID})
+
+    mock_job.fetch.assert_awaited_once_with(async_endpoints.mongo_client, FAKE_JOB_ID)
+
+    def check_data(actual):
+        assert actual.json["data"] == expected_job
+
+    assert_response(response, 200, True, "Fetched Job", check_data)
+
+
+async def test_word_count_get_compresses_large_payloads(client, mocker):
+    expected_job = {
+        "job_id": FAKE_JOB_ID,
+        "word_count": {f"w{i}": i for i in range(500)},
+    }
+    mock_job = _mock_job(mocker)
+    mock_job.fetch.return_value = expected_job
+
+    response = await client.get(
+        "/word-count",
+        json={"job_id": FAKE_JOB_ID},
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert (await response.json())["data"] == expected_job
+
+
+async def test_word_count_get_returns_bad_request_for_non_json_mime_type(client):
+    response = await client.get("/word-count", data="some=thing")
+    response.json = await response.json()
+    response.status_code = response.status
+    assert_response(response, 400, False, "application/json")
+
+
+@pytest.mark.parametrize("content", [{}, {"job_id": "wrong"}])
+async def test_word_count_get_returns_bad_request_for_invalid_job_id(
+    client, mocker, content
+):
+    mock_job = _mock_job(mocker)
+    response = await _get(client, content)
+    assert_response(response, 400, False, "job_id")
+    mock_job.fetch.assert_not_awaited()
+
+
+async def test_word_count_get_returns_bad_request_for_unknown_job_id(client, mocker):
+    mock_job = _mock_job(mocker)
+    mock_job.fetch.return_value = None
+    response = await _get(client, {"job_id": FAKE_JOB_ID})
+    assert_response(response, 400, False, "job_id")
+
+
+async def test_word_count_get_top_k(client, mocker):
+    expected_job = {"job_id": FAKE_JOB_ID, "word_ranking": [["the", 3]]}
+    mock_job = _mock_job(mocker)
+    mock_job.fetch_ranking.return_value = expected_job
+
+    response = await _get(client, {"job_id": FAKE_JOB_ID, "top_k": 1})
+
+    mock_job.fetch.assert_not_awaited()
+    mock_job.fetch_ranking.assert_awaited_once_with(
+        async_endpoints.mongo_client,
+        FAKE_JOB_ID,
+        limit=1,
+        offset=0,
+        min_count=0,
+        prefix="",
+    )
+
+    def check_data(actual):
+        assert actual.json["data"] == expected_job
+
+    assert_response(response, 200, True, "Fetched Job", check_data)
+
+
+async def test_word_count_get_returns_bad_request_for_invalid_ranking_options(
+    client, mocker
+):
+    mock_job = _mock_job(mocker)
+    response = await _get(client, {"job_id": FAKE_JOB_ID, "cursor": "nope"})
+    assert_response(response, 400, False, "top_k")
+    mock_job.fetch_ranking.assert_not_awaited()
+
+
+@pytest.mark.parametrize("error", [pymongo.errors.PyMongoError, bson.errors.BSONError])
+async def test_word_count_get_returns_500_if_job_model_raises(client, mocker, error):
+    mock_job = _mock_job(mocker)
+    mock_job.fetch.side_effect = error
+    response = await _get(client, {"job_id": FAKE_JOB_ID})
+    assert_response(response, 500, False, "Oh dear")
+
+
+async def test_word_count_get_wait_refetches_when_job_finishes(client, mocker):
+    in_progress = {"job_id": FAKE_JOB_ID, "status": JobStatus.IN_PROGRESS.name}
+    complete = {"job_id": FAKE_JOB_ID, "status": JobStatus.COMPLETE.name}
+    mock_job = _mock_job(mocker)
+    finished = asyncio.Event()
+    finished.set()
+    mock_waiters = async_endpoints.completion_waiters
+    mock_waiters.waiting_for = mocker.MagicMock()
+    mock_waiters.waiting_for.return_value.__enter__.return_value = finished
+    mock_job.fetch.side_effect = [in_progress, complete]
+
+    response = await _get(client, {"job_id": FAKE_JOB_ID, "wait": 10})
+
+    mock_waiters.waiting_for.assert_called_once_with(FAKE_JOB_ID)
+
+    def check_data(actual):
+        assert actual.json["data"] == complete
+
+    assert_response(response, 200, True, "Fetched Job", check_data)
+
+
+async def test_word_count_get_wait_times_out_with_in_progress_job(client, mocker):
+    in_progress = {"job_id": FAKE_JOB_ID, "status": JobStatus.IN_PROGRESS.name}
+    mock_job = _mock_job(mocker)
+    mock_waiters = async_endpoints.completion_waiters
+    mock_waiters.waiting_for = mocker.MagicMock()
+    mock_waiters.waiting_for.return_value.__enter__.return_value = asyncio.Event()
+    mocker.patch(f"{ROOT_PATCH_PATH}.LONG_POLL_MAX_WAIT", 0.01)
+    mock_job.fetch.return_value = in_progress
+
+    response = await _get(client, {"job_id": FAKE_JOB_ID, "wait": 10})
+
+    mock_job.fetch.assert_awaited_once()
+    assert_response(response, 200, True, "Fetched Job")
+
+
+async def test_word_count_post(client, mocker):
+    fake_url = "https://a.fake.url"
+    expected_job = {"job_id": FAKE_JOB_ID, "status": "IN_PROGRESS", "url": fake_url}
+    mock_job = _mock_job(mocker)
+    mock_job.create.return_value = expected_job
+    mocker.patch("common.rabbit.lanes.time.time", return_value=FAKE_NOW)
+
+    response = await _post(client, {"url": fake_url})
+
+    mock_job.create.assert_awaited_once_with(async_endpoints.mongo_client, fake_url)
+    async_endpoints.rabbit_client.publish.assert_awaited_once_with(
+        {
+            "job_id": FAKE_JOB_ID,
+            "url": fake_url,
+            "priority": "normal",
+            "queued_at": FAKE_NOW,
+        },
+        "normal",
+    )
+    mock_job.find_cached.assert_not_awaited()
+
+    def check_data(actual):
+        assert actual.json["data"] == expected_job
+
+    assert_response(response, 202, True, "Scheduled Job", check_data)
+
+
+async def test_word_count_post_reuses_cached_result(client, mocker):
+    fake_url, cached_job = "https://a.fake.url", {"job_id": "cached_job_id"}
+    mock_job = _mock_job(mocker)
+    mock_job.find_cached.return_value = cached_job
+
+    response = await _post(client, {"url": fake_url, "max_age": 60})
+
+    mock_job.find_cached.assert_awaited_once_with(
+        async_endpoints.mongo_client, fake_url, 60
+    )
+    mock_job.create.assert_not_awaited()
+    assert_response(response, 200, True, "Cached Job: cached_job_id")
+
+
+async def test_word_count_post_sheds_new_jobs_when_overloaded(client, mocker):
+    mock_job = _mock_job(mocker)
+    async_endpoints.backpressure.retry_after.return_value = 30
+
+    response = await _post(client, {"url": "https://a.fake.url"})
+
+    mock_job.create.assert_not_awaited()
+    async_endpoints.rabbit_client.publish.assert_not_awaited()
+    assert response.headers["Retry-After"] == "30"
+    assert_response(response, 429, False, "overloaded")
+
+
+async def test_word_count_post_reuses_cached_result_when_overloaded(client, mocker):
+    mock_job = _mock_job(mocker)
+    mock_job.find_cached.return_value = {"job_id": "cached_job_id"}
+    async_endpoints.backpressure.retry_after.return_value = 30
+
+    response = await _post(client, {"url": "https://a.fake.url", "max_age": 60})
+
+    assert_response(response, 200, True, "Cached Job")
+
+
+async def test_word_count_post_rate_limits_each_client(client, mocker):
+    mock_job = _mock_job(mocker)
+    mock_buckets = mocker.patch(f"{ROOT_PATCH_PATH}.client_buckets")
+    mock_buckets.acquire.return_value = 3
+
+    response = await _json_response(
+        await client.post(
+            "/word-count",
+            json={"url": "https://a.fake.url"},
+            headers={"X-Forwarded-For": "10.0.0.1, 10.0.0.2"},
+        )
+    )
+
+    mock_buckets.acquire.assert_called_once_with("10.0.0.2")
+    mock_job.create.assert_not_awaited()
+    assert response.headers["Retry-After"] == "3"
+    assert_response(response, 429, False, "Too many requests")
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        {},
+        {"url": "example.com"},
+        {"url": "https://a.fake.url", "max_age": -1},
+        {"url": "https://a.fake.url", "priority": "urgent"},
+    ],
+)
+async def test_word_count_post_returns_bad_request_for_invalid_input(
+    client, mocker, content
+):
+    mock_job = _mock_job(mocker)
+    response = await _post(client, content)
+    assert_response(response, 400, False, "")
+    mock_job.create.assert_not_awaited()
+
+
+async def test_word_count_post_returns_500_if_rabbit_raises(client, mocker):
+    mock_job = _mock_job(mocker)
+    mock_job.create.return_value = {"job_id": FAKE_JOB_ID}
+    async_endpoints.rabbit_client.publish.side_effect = (
+        aio_pika.exceptions.AMQPException
+    )
+    response = await _post(client, {"url": "https://a.fake.url"})
+    assert_response(response, 500, False, "Oh dear")
+
+
+@pytest.mark.parametrize("is_healthy", [True, False])
+async def test_health(client, mocker, is_healthy):
+    mock_monitor = async_endpoints.health_monitor
+    mock_monitor.is_healthy = is_healthy
+    mock_monitor.report = {"mongodb": {"healthy": is_healthy}}
+
+    response = await client.get("/health")
+    response.json = await response.json()
+    response.status_code = response.status
+
+    def check_data(actual):
+        status = HealthStatus.PASS if is_healthy else HealthStatus.FAIL
+        assert actual.json["data"]["status"] == status.name
+        assert actual.json["data"]["dependencies"] == mock_monitor.report
+
+    assert_response(
+        response,
+        200 if is_healthy else 500,
+        is_healthy,
+        "Completed Health Check",
+        check_data,
+    )
+
+
+async def _get(client, content):
+    return await _json_response(await client.get("/word-count", json=content))
+
+
+async def _post(client, content):
+    return await _json_response(await client.post("/word-count", json=content))
+
+
+async def _json_response(response):
+    response.json = await response.json()
+    response.status_code = response.status
+    return response
+
+
+def _mock_job(mocker):
+    return mocker.patch(f"{ROOT_PATCH_PATH}.AsyncJob", new_callable=mocker.AsyncMock)
+
+
+FAKE_JOB_ID = "625f4e3229942e20c16ca336"
+FAKE_NOW = 1650000000.0
+ROOT_PATCH_PATH = "web.async_endpoints"
@@ -0,0 +1,117 @@
+from web.completion import AsyncCompletionWaiters, CompletionWaiters
+import asyncio
+import pika
+
+
+def test_notify_wakes_waiters_for_matching_job():
+    waiters = CompletionWaiters(lambda _: None)
+    with waiters.waiting_for("a") as a, waiters.waiting_for("b") as b:
+        waiters.notify({"job_id": "a", "status": "COMPLETE"})
+        assert a.is_set()
+        assert not b.is_set()
+
+
+def test_notify_wakes_every_waiter_for_a_job():
+    waiters = CompletionWaiters(lambda _: None)
+    with waiters.waiting_for("a") as first, waiters.waiting_for("a") as second:
+        waiters.notify({"job_id": "a"})
+        assert first.is_set() and second.is_set()
+
+
+def test_waiting_for_unregisters_on_exit():
+    waiters = CompletionWaiters(lambda _: None)
+    with waiters.waiting_for("a"):
+        pass
+    assert waiters._waiters == {}
+
+
+def test_notify_ignores_events_without_waiters():
+    waiters = CompletionWaiters(lambda _: None)
+    waiters.notify({"job_id": "a"})
+    waiters.notify({})
+    assert waiters._waiters == {}
+
+
+def test_start_spawns_one_listener(mocker):
+    mock_thread = mocker.patch("web.completion.threading.Thread")
+    waiters = CompletionWaiters(lambda _: None)
+
+    waiters.start()
+    waiters.start()
+
+    mock_thread.assert_called_once_with(target=waiters._listen, daemon=True)
+    mock_thread.return_value.start.assert_called_once()
+
+
+def test_listen_resubscribes_after_amqp_error(mocker):
+    class Stop(Exception):
+        pass
+
+    def _subscribe(callback):
+        calls.append(callback)
+        raise pika.exceptions.AMQPError
+
+    calls = []
+    mock_sleep = mocker.patch("web.completion.time.sleep", side_effect=[None, Stop])
+    waiters = CompletionWaiters(_subscribe, reconnect_delay=3)
+
+    try:
+        waiters._listen()
+    except Stop:
+        pass
+
+    assert calls == [waiters.notify, waiters.notify]
+    mock_sleep.assert_called_with(3)
+
+
+async def test_async_notify_wakes_waiters_for_matching_job():
+    waiters = AsyncCompletionWaiters(_async_noop)
+    with waiters.waiting_for("a") as a, waiters.waiting_for("b") as b:
+        waiters.notify({"job_id": "a"})
+        assert a.is_set()
+        assert not b.is_set()
+    assert waiters._waiters == {}
+
+
+async def test_async_start_subscribes_notify():
+    subscribed = []
+
+    async def _subscribe(callback):
+        subscribed.append(callback)
+
+    waiters = AsyncCompletionWaiters(_subscribe)
+    await waiters.start()
+    await waiters._task
+    assert subscribed == [waiters.notify]
+
+
+async def test_async_listen_resubscribes_after_connection_error(mocker):
+    async def _subscribe(callback):
+        calls.append(callback)
+        if len(calls) == 1:
+            raise ConnectionError("refused")
+
+    calls = []
+    mock_sleep = mocker.patch("web.completion.asyncio.sleep")
+    waiters = AsyncCompletionWaiters(_subscribe, reconnect_delay=3)
+
+    await waiters._listen()
+
+    assert calls == [waiters.notify, waiters.notify]
+    mock_sleep.assert_awaited_once_with(3)
+
+
+async def test_async_stop_cancels_pending_subscription():
+    async def _subscribe(_):
+        raise ConnectionError("refused")
+
+    waiters = AsyncCompletionWaiters(_subscribe, reconnect_delay=60)
+    await waiters.start()
+    task = waiters._task
+    await waiters.stop()
+    await asyncio.sleep(0)
+    assert task.cancelled() and waiters._task is None
+
+
+async def _async_noop(_):
+    return None
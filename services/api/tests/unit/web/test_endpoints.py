@@ -1,21 +1,24 @@
 from tests.assertions import assert_response
 from web.endpoints import HealthStatus
+from common.mongo.models import job as Job
 from common.mongo.models.job import JobStatus
 import bson
+import gzip
+import json
 import pika
 import pymongo
 import pytest
 
 
 def test_word_count_get(client, mocker):
-    fake_job_id = "a_fake_job_id"
-    expected_job = {"job_id": fake_job_id}
+    expected_job = {"job_id": FAKE_JOB_ID}
     _, mock_mongo, mock_job = _make_mocks(mocker)
     mock_job.fetch.return_value = expected_job
 
-    response = client.get("word-count", json={"job_id": fake_job_id})
+    response = client.get("word-count", json={"job_id": FAKE_JOB_ID})
 
-    mock_job.fetch.assert_called_once_with(mock_mongo, fake_job_id)
+    mock_job.fetch.assert_called_once_with(mock_mongo, FAKE_JOB_ID)
+    mock_mongo.exists.assert_not_called()
 
     def check_data(actual):
         assert actual.json["data"] == expected_job
@@ -23,6 +26,116 @@ def test_word_count_get(client, mocker):
     assert_response(response, 200, True, "Fetched Job", check_data)
 
 
+def test_word_count_get_compresses_large_payloads(client, mocker):
+    expected_job = {
+        "job_id": FAKE_JOB_ID,
+        "word_count": {f"w{i}": i for i in range(500)},
+    }
+    _, _, mock_job = _make_mocks(mocker)
+    mock_job.fetch.return_value = expected_job
+    mocker.patch(f"{ROOT_PATCH_PATH}.RESPONSE_CHUNK_BYTES", 1024)
+
+    response = client.get(
+        "word-count",
+        json={"job_id": FAKE_JOB_ID},
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(response.data))["data"] == expected_job
+
+
+def test_word_count_get_does_not_compress_small_payloads(client, mocker):
+    _, _, mock_job = _make_mocks(mocker)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID}
+
+    response = client.get(
+        "word-count",
+        json={"job_id": FAKE_JOB_ID},
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert "Content-Encoding" not in response.headers
+    assert_response(response, 200, True, "Fetched Job")
+
+
+def test_word_count_get_serves_finished_jobs_from_cache(client, mocker):
+    complete = {"job_id": FAKE_JOB_ID, "status": JobStatus.COMPLETE.name}
+    _, _, mock_job = _make_mocks(mocker)
+    mock_job.fetch.return_value = complete
+
+    first = client.get("word-count", json={"job_id": FAKE_JOB_ID})
+    second = client.get("word-count", json={"job_id": FAKE_JOB_ID})
+
+    mock_job.fetch.assert_called_once()
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert first.data == second.data
+    assert_response(second, 200, True, "Fetched Job")
+
+
+def test_word_count_get_caches_rankings_per_options(client, mocker):
+    complete = {"job_id": FAKE_JOB_ID, "status": JobStatus.COMPLETE.name}
+    _, _, mock_job = _make_mocks(mocker)
+    mock_job.fetch.return_value = complete
+    mock_job.fetch_ranking.return_value = complete
+
+    for content in [{}, {"top_k": 1}, {"top_k": 2}, {"top_k": 1}]:
+        client.get("word-count", json={"job_id": FAKE_JOB_ID, **content})
+
+    mock_job.fetch.assert_called_once()
+    assert mock_job.fetch_ranking.call_count == 2
+
+
+def test_word_count_get_does_not_cache_in_progress_jobs(client, mocker):
+    in_progress = {"job_id": FAKE_JOB_ID, "status": JobStatus.IN_PROGRESS.name}
+    _, _, mock_job = _make_mocks(mocker)
+    mock_job.fetch.return_value = in_progress
+
+    for _ in range(2):
+        response = client.get("word-count", json={"job_id": FAKE_JOB_ID})
+        assert "ETag" not in response.headers
+
+    assert mock_job.fetch.call_count == 2
+
+
+def test_word_count_get_returns_not_modified_for_matching_etag(client, mocker):
+    failed = {"job_id": FAKE_JOB_ID, "status": JobStatus.FAIL.name}
+    _, _, mock_job = _make_mocks(mocker)
+    mock_job.fetch.return_value = failed
+
+    etag = client.get("word-count", json={"job_id": FAKE_JOB_ID}).headers["ETag"]
+    response = client.get(
+        "word-count", json={"job_id": FAKE_JOB_ID}, headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_word_count_get_etag_varies_with_content_encoding(client, mocker):
+    complete = {
+        "job_id": FAKE_JOB_ID,
+        "status": JobStatus.COMPLETE.name,
+        "word_count": {f"w{i}": i for i in range(500)},
+    }
+    _, _, mock_job = _make_mocks(mocker)
+    mock_job.fetch.return_value = complete
+
+    identity = client.get("word-count", json={"job_id": FAKE_JOB_ID})
+    compressed = client.get(
+        "word-count",
+        json={"job_id": FAKE_JOB_ID},
+        headers={"Accept-Encoding": "gzip", "If-None-Match": identity.headers["ETag"]},
+    )
+
+    assert compressed.status_code == 200
+    assert compressed.headers["ETag"] == identity.headers["ETag"][:-1] + '-gzip"'
+    assert json.loads(gzip.decompress(compressed.data))["data"] == complete
+
+
 def test_word_count_get_returns_bad_request_for_non_json_mime_type(client, mocker):
     _make_mocks(mocker)
     response = client.get("word-count", data={"some": "thing"})
@@ -30,44 +143,153 @@ def test_word_count_get_returns_bad_request_for_non_json_mime_type(client, mocke
 
 
 def test_word_count_get_returns_bad_request_for_missing_job_id(client, mocker):
-    _make_mocks(mocker)
+    _, _, mock_job = _make_mocks(mocker)
     response = client.get("word-count", json={})
     assert_response(response, 400, False, "job_id")
+    mock_job.fetch.assert_not_called()
 
 
-def test_word_count_get_returns_bad_request_for_unknown_job_id(client, mocker):
-    _, mock_mongo, _ = _make_mocks(mocker)
-    mock_mongo.exists.return_value = False
+def test_word_count_get_returns_bad_request_for_malformed_job_id(client, mocker):
+    _, _, mock_job = _make_mocks(mocker)
     response = client.get("word-count", json={"job_id": "wrong"})
     assert_response(response, 400, False, "job_id")
+    mock_job.fetch.assert_not_called()
 
 
-def test_word_count_get_returns_500_if_mongo_client_raises_pymongo_err(client, mocker):
+def test_word_count_get_returns_bad_request_for_unknown_job_id(client, mocker):
+    _, _, mock_job = _make_mocks(mocker)
+    mock_job.fetch.return_value = None
+    response = client.get("word-count", json={"job_id": FAKE_JOB_ID})
+    assert_response(response, 400, False, "job_id")
 
-    _, mongo_client, _ = _make_mocks(mocker)
-    mongo_client.exists.side_effect = _raise_mongo_error
-    response = client.get("word-count", json={"job_id": "fake_job_id"})
-    assert_response(response, 500, False, "Oh dear")
 
+def test_word_count_get_wait_returns_immediately_for_finished_job(client, mocker):
+    expected_job = {"job_id": FAKE_JOB_ID, "status": JobStatus.COMPLETE.name}
+    _, mock_mongo, mock_job = _make_mocks(mocker)
+    mock_waiters = _mock_completion_waiters(mocker, finished=True)
+    mock_job.fetch.return_value = expected_job
+
+    response = client.get("word-count", json={"job_id": FAKE_JOB_ID, "wait": 10})
+
+    mock_waiters.start.assert_called_once()
+    mock_waiters.waiting_for.assert_called_once_with(FAKE_JOB_ID)
+    mock_job.fetch.assert_called_once_with(mock_mongo, FAKE_JOB_ID)
+    mock_waiters.finished.wait.assert_not_called()
+    assert_response(response, 200, True, "Fetched Job")
+
+
+def test_word_count_get_wait_refetches_when_job_finishes(client, mocker):
+    in_progress = {"job_id": FAKE_JOB_ID, "status": JobStatus.IN_PROGRESS.name}
+    complete = {"job_id": FAKE_JOB_ID, "status": JobStatus.COMPLETE.name}
+    _, _, mock_job = _make_mocks(mocker)
+    mock_waiters = _mock_completion_waiters(mocker, finished=True)
+    mock_job.fetch.side_effect = [in_progress, complete]
+
+    response = client.get("word-count", json={"job_id": FAKE_JOB_ID, "wait": 10})
+
+    mock_waiters.finished.wait.assert_called_once_with(10)
+    assert mock_job.fetch.call_count == 2
+
+    def check_data(actual):
+        assert actual.json["data"] == complete
+
+    assert_response(response, 200, True, "Fetched Job", check_data)
+
+
+def test_word_count_get_wait_times_out_with_in_progress_job(client, mocker):
+    in_progress = {"job_id": FAKE_JOB_ID, "status": JobStatus.IN_PROGRESS.name}
+    _, _, mock_job = _make_mocks(mocker)
+    mock_waiters = _mock_completion_waiters(mocker, finished=False)
+    mocker.patch(f"{ROOT_PATCH_PATH}.LONG_POLL_MAX_WAIT", 5)
+    mock_job.fetch.return_value = in_progress
+
+    response = client.get("word-count", json={"job_id": FAKE_JOB_ID, "wait": 10})
+
+    mock_waiters.finished.wait.assert_called_once_with(5)
+    mock_job.fetch.assert_called_once()
+
+    def check_data(actual):
+        assert actual.json["data"] == in_progress
+
+    assert_response(response, 200, True, "Fetched Job", check_data)
+
+
+@pytest.mark.parametrize("wait", [-1, "10", True, None])
+def test_word_count_get_returns_bad_request_for_invalid_wait(client, mocker, wait):
+    _, _, mock_job = _make_mocks(mocker)
+    response = client.get("word-count", json={"job_id": FAKE_JOB_ID, "wait": wait})
+    assert_response(response, 400, False, "wait")
+    mock_job.fetch.assert_not_called()
 
-def test_word_count_get_returns_500_if_mongo_client_raises_bson_err(client, mocker):
-    _, mongo_client, _ = _make_mocks(mocker)
-    mongo_client.exists.side_effect = _raise_bson_error
-    response = client.get("word-count", json={"job_id": "fake_job_id"})
-    assert_response(response, 500, False, "Oh dear")
+
+def test_word_count_get_top_k(client, mocker):
+    expected_job = {"job_id": FAKE_JOB_ID, "word_ranking": [["the", 3]]}
+    _, mock_mongo, mock_job = _make_mocks(mocker)
+    mock_job.fetch_ranking.return_value = expected_job
+
+    response = client.get(
+        "word-count",
+        json={"job_id": FAKE_JOB_ID, "top_k": 1, "min_count": 2, "prefix": "Th"},
+    )
+
+    mock_job.fetch.assert_not_called()
+    mock_job.fetch_ranking.assert_called_once_with(
+        mock_mongo, FAKE_JOB_ID, limit=1, offset=0, min_count=2, prefix="th"
+    )
+
+    def check_data(actual):
+        assert actual.json["data"] == expected_job
+
+    assert_response(response, 200, True, "Fetched Job", check_data)
+
+
+def test_word_count_get_follows_ranking_cursor(client, mocker):
+    _, mock_mongo, mock_job = _make_mocks(mocker)
+    mocker.patch(f"{ROOT_PATCH_PATH}.RANKING_PAGE_SIZE", 50)
+    mock_job.fetch_ranking.return_value = {"job_id": FAKE_JOB_ID}
+
+    response = client.get(
+        "word-count", json={"job_id": FAKE_JOB_ID, "cursor": Job.encode_cursor(50)}
+    )
+
+    mock_job.fetch_ranking.assert_called_once_with(
+        mock_mongo, FAKE_JOB_ID, limit=50, offset=50, min_count=0, prefix=""
+    )
+    assert_response(response, 200, True, "Fetched Job")
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"top_k": 0},
+        {"top_k": 10001},
+        {"top_k": "10"},
+        {"min_count": -1},
+        {"min_count": 1.5},
+        {"prefix": 1},
+        {"cursor": "not a cursor"},
+    ],
+)
+def test_word_count_get_returns_bad_request_for_invalid_ranking_options(
+    client, mocker, options
+):
+    _, _, mock_job = _make_mocks(mocker)
+    response = client.get("word-count", json={"job_id": FAKE_JOB_ID, **options})
+    assert_response(response, 400, False, "top_k")
+    mock_job.fetch_ranking.assert_not_called()
 
 
 def test_word_count_get_returns_500_if_job_model_raises_pymongo_err(client, mocker):
     _, _, mock_job = _make_mocks(mocker)
     mock_job.fetch.side_effect = _raise_mongo_error
-    response = client.get("word-count", json={"job_id": "fake_job_id"})
+    response = client.get("word-count", json={"job_id": FAKE_JOB_ID})
     assert_response(response, 500, False, "Oh dear")
 
 
 def test_word_count_get_returns_500_if_job_model_raises_bson_err(client, mocker):
     _, _, mock_job = _make_mocks(mocker)
     mock_job.fetch.side_effect = _raise_bson_error
-    response = client.get("word-count", json={"job_id": "fake_job_id"})
+    response = client.get("word-count", json={"job_id": FAKE_JOB_ID})
     assert_response(response, 500, False, "Oh dear")
 
 
@@ -80,11 +302,20 @@ def test_word_count_post(client, mocker):
     }
     mock_rabbit, mock_mongo, mock_job = _make_mocks(mocker)
     mock_job.create.return_value = expected_job
+    mocker.patch("common.rabbit.lanes.time.time", return_value=FAKE_NOW)
 
     response = client.post("word-count", json={"url": fake_url})
 
     mock_job.create.assert_called_once_with(mock_mongo, fake_url)
-    mock_rabbit.publish.assert_called_once_with({"job_id": fake_job_id})
+    mock_rabbit.publish.assert_called_once_with(
+        {
+            "job_id": fake_job_id,
+            "url": fake_url,
+            "priority": "normal",
+            "queued_at": FAKE_NOW,
+        },
+        "normal",
+    )
 
     def check_data(actual):
         assert actual.json["data"] == expected_job
@@ -92,6 +323,141 @@ def test_word_count_post(client, mocker):
     assert_response(response, 202, True, "Scheduled Job", check_data)
 
 
+def test_word_count_post_skips_result_cache_by_default(client, mocker):
+    _, _, mock_job = _make_mocks(mocker)
+    mock_job.create.return_value = {"job_id": "a_fake_job_id"}
+    response = client.post("word-count", json={"url": "https://a.fake.url"})
+    mock_job.find_cached.assert_not_called()
+    assert_response(response, 202, True, "Scheduled Job")
+
+
+def test_word_count_post_reuses_cached_result(client, mocker):
+    fake_url, cached_job = "https://a.fake.url", {"job_id": "cached_job_id"}
+    mock_rabbit, mock_mongo, mock_job = _make_mocks(mocker)
+    mock_job.find_cached.return_value = cached_job
+
+    response = client.post("word-count", json={"url": fake_url, "max_age": 60})
+
+    mock_job.find_cached.assert_called_once_with(mock_mongo, fake_url, 60)
+    mock_job.create.assert_not_called()
+    mock_rabbit.publish.assert_not_called()
+
+    def check_data(actual):
+        assert actual.json["data"] == cached_job
+
+    assert_response(response, 200, True, "Cached Job: cached_job_id", check_data)
+
+
+def test_word_count_post_uses_configured_result_cache_ttl(client, mocker):
+    fake_url = "https://a.fake.url"
+    mock_rabbit, mock_mongo, mock_job = _make_mocks(mocker)
+    mocker.patch(f"{ROOT_PATCH_PATH}.RESULT_CACHE_TTL", 30)
+    mock_job.find_cached.return_value = None
+    mock_job.create.return_value = {"job_id": "a_fake_job_id"}
+
+    response = client.post("word-count", json={"url": fake_url})
+
+    mock_job.find_cached.assert_called_once_with(mock_mongo, fake_url, 30)
+    mock_rabbit.publish.assert_called_once()
+    assert_response(response, 202, True, "Scheduled Job")
+
+
+@pytest.mark.parametrize("priority", ["high", "low"])
+def test_word_count_post_routes_to_priority_lane(client, mocker, priority):
+    mock_rabbit, _, mock_job = _make_mocks(mocker)
+    mock_job.create.return_value = {"job_id": "a_fake_job_id"}
+
+    response = client.post(
+        "word-count", json={"url": "https://a.fake.url", "priority": priority}
+    )
+
+    body, lane = mock_rabbit.publish.call_args.args
+    assert body["priority"] == lane == priority
+    assert_response(response, 202, True, "Scheduled Job")
+
+
+@pytest.mark.parametrize("priority", ["urgent", 1, None, ["high"]])
+def test_word_count_post_returns_bad_request_if_priority_unknown(
+    client, mocker, priority
+):
+    _, _, mock_job = _make_mocks(mocker)
+    response = client.post(
+        "word-count", json={"url": "https://a.fake.url", "priority": priority}
+    )
+    assert_response(response, 400, False, "priority")
+    mock_job.create.assert_not_called()
+
+
+def test_word_count_post_force_refresh_bypasses_result_cache(client, mocker):
+    _, _, mock_job = _make_mocks(mocker)
+    mocker.patch(f"{ROOT_PATCH_PATH}.RESULT_CACHE_TTL", 30)
+    mock_job.create.return_value = {"job_id": "a_fake_job_id"}
+
+    response = client.post(
+        "word-count", json={"url": "https://a.fake.url", "force_refresh": True}
+    )
+
+    mock_job.find_cached.assert_not_called()
+    assert_response(response, 202, True, "Scheduled Job")
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{"max_age": -1}, {"max_age": "60"}, {"max_age": True}, {"force_refresh": 1}],
+)
+def test_word_count_post_returns_bad_request_for_invalid_cache_options(
+    client, mocker, options
+):
+    _, _, mock_job = _make_mocks(mocker)
+    response = client.post("word-count", json={"url": "https://a.fake.url", **options})
+    assert_response(response, 400, False, "max_age")
+    mock_job.create.assert_not_called()
+
+
+def test_word_count_post_sheds_load_when_queue_is_overloaded(client, mocker):
+    mock_rabbit, _, mock_job = _make_mocks(mocker)
+    mock_backpressure = mocker.patch(f"{ROOT_PATCH_PATH}.backpressure")
+    mock_backpressure.retry_after.return_value = 30
+
+    response = client.post("word-count", json={"url": "https://w.ww"})
+
+    mock_backpressure.start.assert_called_once()
+    mock_job.create.assert_not_called()
+    mock_rabbit.publish.assert_not_called()
+    assert response.headers["Retry-After"] == "30"
+    assert_response(response, 429, False, "overloaded")
+
+
+def test_word_count_post_reuses_cached_result_when_overloaded(client, mocker):
+    cached = {"job_id": FAKE_JOB_ID, "status": "COMPLETE"}
+    _, _, mock_job = _make_mocks(mocker)
+    mock_job.find_cached.return_value = cached
+    mock_backpressure = mocker.patch(f"{ROOT_PATCH_PATH}.backpressure")
+    mock_backpressure.retry_after.return_value = 30
+
+    response = client.post("word-count", json={"url": "https://w.ww", "max_age": 60})
+
+    mock_backpressure.start.assert_not_called()
+    assert_response(response, 200, True, "Cached Job")
+
+
+def test_word_count_post_rate_limits_each_client(client, mocker):
+    _, _, mock_job = _make_mocks(mocker)
+    mock_buckets = mocker.patch(f"{ROOT_PATCH_PATH}.client_buckets")
+    mock_buckets.acquire.return_value = 3
+
+    response = client.post(
+        "word-count",
+        json={"url": "https://w.ww"},
+        headers={"X-Forwarded-For": "10.0.0.1, 10.0.0.2"},
+    )
+
+    mock_buckets.acquire.assert_called_once_with("10.0.0.2")
+    mock_job.create.assert_not_called()
+    assert response.headers["Retry-After"] == "3"
+    assert_response(response, 429, False, "Too many requests")
+
+
 def test_word_count_post_returns_bad_request_for_non_json_mime_type(client, mocker):
     _make_mocks(mocker)
     response = client.post("word-count", data={"some": "thing"})
@@ -136,9 +502,198 @@ def test_word_count_post_returns_500_if_bson_raises(client, mocker):
     assert_response(response, 500, False, "Oh dear")
 
 
+def test_word_count_batch_post(client, mocker):
+    fake_urls = ["https://a.fake.url", "http://another.fake.url/path"]
+    fake_job_ids = ["a_fake_job_id", "another_fake_job_id"]
+    mock_rabbit, mock_mongo, mock_job = _make_mocks(mocker)
+    mock_job.create_many.return_value = [
+        {"job_id": i, "url": url} for i, url in zip(fake_job_ids, fake_urls)
+    ]
+    mocker.patch("common.rabbit.lanes.time.time", return_value=FAKE_NOW)
+
+    response = client.post("word-count/batch", json={"urls": fake_urls})
+
+    mock_job.create_many.assert_called_once_with(mock_mongo, fake_urls)
+    mock_rabbit.publish_many.assert_called_once_with(
+        [
+            {"job_id": i, "url": url, "priority": "low", "queued_at": FAKE_NOW}
+            for i, url in zip(fake_job_ids, fake_urls)
+        ],
+        "low",
+    )
+    mock_rabbit.publish.assert_not_called()
+
+    def check_data(actual):
+        assert actual.json["data"] == {"job_ids": fake_job_ids}
+
+    assert_response(response, 202, True, "Scheduled 2 Jobs", check_data)
+
+
+def test_word_count_batch_post_accepts_priority(client, mocker):
+    mock_rabbit, _, mock_job = _make_mocks(mocker)
+    mock_job.create_many.return_value = [{"job_id": "a", "url": "https://w.ww"}]
+
+    response = client.post(
+        "word-count/batch", json={"urls": ["https://w.ww"], "priority": "high"}
+    )
+
+    assert mock_rabbit.publish_many.call_args.args[1] == "high"
+    assert_response(response, 202, True, "Scheduled 1 Jobs")
+
+
+def test_word_count_batch_post_returns_bad_request_if_priority_unknown(client, mocker):
+    _, _, mock_job = _make_mocks(mocker)
+    response = client.post(
+        "word-count/batch", json={"urls": ["https://w.ww"], "priority": "urgent"}
+    )
+    assert_response(response, 400, False, "priority")
+    mock_job.create_many.assert_not_called()
+
+
+def test_word_count_batch_post_returns_bad_request_for_non_json_mime_type(
+    client, mocker
+):
+    _make_mocks(mocker)
+    response = client.post("word-count/batch", data={"some": "thing"})
+    assert_response(response, 400, False, "application/json")
+
+
+@pytest.mark.parametrize("urls", [None, [], "https://a.fake.url", {}])
+def test_word_count_batch_post_returns_bad_request_if_urls_not_a_list(
+    client, mocker, urls
+):
+    _, _, mock_job = _make_mocks(mocker)
+    response = client.post("word-count/batch", json={"urls": urls})
+    assert_response(response, 400, False, "urls")
+    mock_job.create_many.assert_not_called()
+
+
+def test_word_count_batch_post_returns_bad_request_if_batch_too_large(client, mocker):
+    _, _, mock_job = _make_mocks(mocker)
+    mocker.patch(f"{ROOT_PATCH_PATH}.MAX_BATCH_SIZE", 2)
+    urls = ["https://a.fake.url"] * 3
+    response = client.post("word-count/batch", json={"urls": urls})
+    assert_response(response, 400, False, "at most 2")
+    mock_job.create_many.assert_not_called()
+
+
+def test_word_count_batch_post_reports_every_malformed_url(client, mocker):
+    _, _, mock_job = _make_mocks(mocker)
+    urls = ["https://a.fake.url", "example.com", "https://b.fake.url", 1234]
+    response = client.post("word-count/batch", json={"urls": urls})
+
+    def check_data(actual):
+        assert actual.json["data"] == {"invalid_urls": [1, 3]}
+
+    assert_response(response, 400, False, "urls", check_data)
+    mock_job.create_many.assert_not_called()
+
+
+def test_word_count_batch_post_sheds_load_when_queue_is_overloaded(client, mocker):
+    mock_rabbit, _, mock_job = _make_mocks(mocker)
+    mock_backpressure = mocker.patch(f"{ROOT_PATCH_PATH}.backpressure")
+    mock_backpressure.retry_after.return_value = 12
+
+    response = client.post("word-count/batch", json={"urls": ["https://w.ww"]})
+
+    mock_backpressure.start.assert_called_once()
+    mock_job.create_many.assert_not_called()
+    mock_rabbit.publish_many.assert_not_called()
+    assert response.headers["Retry-After"] == "12"
+    assert_response(response, 429, False, "overloaded")
+
+
+def test_word_count_batch_post_returns_500_if_rabbit_raises(client, mocker):
+    mock_rabbit, _, _ = _make_mocks(mocker)
+    mock_rabbit.publish_many.side_effect = _raise_amqp_error
+    response = client.post("word-count/batch", json={"urls": ["https://a.fake.url"]})
+    assert_response(response, 500, False, "Oh dear")
+
+
+def test_word_count_batch_post_returns_500_if_mongo_raises(client, mocker):
+    _, _, mock_job = _make_mocks(mocker)
+    mock_job.create_many.side_effect = _raise_mongo_error
+    response = client.post("word-count/batch", json={"urls": ["https://a.fake.url"]})
+    assert_response(response, 500, False, "Oh dear")
+
+
+def test_word_count_status(client, mocker):
+    known_id, unknown_id = "625f4e3229942e20c16ca336", "625f4e3229942e20c16ca337"
+    known_job = {"job_id": known_id, "status": JobStatus.COMPLETE.name}
+    _, mock_mongo, mock_job = _make_mocks(mocker)
+    mock_job.fetch_statuses.return_value = {known_id: known_job}
+    job_ids = [known_id, "malformed", unknown_id, 1234]
+
+    response = client.get("word-count/status", json={"job_ids": job_ids})
+
+    mock_job.fetch_statuses.assert_called_once()
+    assert mock_job.fetch_statuses.call_args.args[0] == mock_mongo
+    assert sorted(mock_job.fetch_statuses.call_args.args[1]) == [known_id, unknown_id]
+
+    def check_data(actual):
+        assert actual.json["data"]["jobs"] == [
+            known_job,
+            {"job_id": "malformed", "error": "malformed job_id"},
+            {"job_id": unknown_id, "error": "unknown job_id"},
+            {"job_id": 1234, "error": "malformed job_id"},
+        ]
+
+    assert_response(response, 200, True, "Fetched 4 Job Statuses", check_data)
+
+
+def test_word_count_status_skips_query_when_no_valid_ids(client, mocker):
+    _, _, mock_job = _make_mocks(mocker)
+    response = client.get("word-count/status", json={"job_ids": ["malformed"]})
+    mock_job.fetch_statuses.assert_not_called()
+    assert_response(response, 200, True, "Fetched 1 Job Statuses")
+
+
+@pytest.mark.parametrize("job_ids", [None, [], "625f4e3229942e20c16ca336", {}])
+def test_word_count_status_returns_bad_request_if_job_ids_not_a_list(
+    client, mocker, job_ids
+):
+    _make_mocks(mocker)
+    response = client.get("word-count/status", json={"job_ids": job_ids})
+    assert_response(response, 400, False, "job_ids")
+
+
+def test_word_count_status_returns_bad_request_if_too_many_job_ids(client, mocker):
+    _make_mocks(mocker)
+    mocker.patch(f"{ROOT_PATCH_PATH}.MAX_STATUS_BATCH_SIZE", 1)
+    job_ids = ["625f4e3229942e20c16ca336"] * 2
+    response = client.get("word-count/status", json={"job_ids": job_ids})
+    assert_response(response, 400, False, "at most 1")
+
+
+def test_word_count_status_returns_bad_request_for_non_json_mime_type(client, mocker):
+    _make_mocks(mocker)
+    response = client.get("word-count/status", data={"some": "thing"})
+    assert_response(response, 400, False, "application/json")
+
+
+def test_word_count_status_returns_500_if_mongo_raises(client, mocker):
+    _, _, mock_job = _make_mocks(mocker)
+    mock_job.fetch_statuses.side_effect = _raise_mongo_error
+    job_ids = ["625f4e3229942e20c16ca336"]
+    response = client.get("word-count/status", json={"job_ids": job_ids})
+    assert_response(response, 500, False, "Oh dear")
+
+
+def test_metrics(client, mocker):
+    mock_metrics = mocker.patch(f"{ROOT_PATCH_PATH}.metrics")
+    mock_metrics.snapshot.return_value = {"counters": {"a": 1}}
+    response = client.get("metrics")
+
+    def check_data(actual):
+        assert actual.json["data"] == {"counters": {"a": 1}}
+
+    assert_response(response, 200, True, "Fetched Metrics", check_data)
+
+
 def test_health_pass(client, mocker):
     _ = _mock_property(mocker, "RabbitMQClient", "is_healthy", True)
     _ = _mock_property(mocker, "MongoDBClient", "is_healthy", True)
+    _refresh_health_monitor(mocker)
     response = client.get("health")
     assert_response(
         response,
@@ -155,6 +710,7 @@ def test_health_pass(client, mocker):
 def test_health_fail(client, mocker, rabbit_health, mongo_health):
     _ = _mock_property(mocker, "RabbitMQClient", "is_healthy", rabbit_health)
     _ = _mock_property(mocker, "MongoDBClient", "is_healthy", mongo_health)
+    _refresh_health_monitor(mocker)
     response = client.get("health")
     assert_response(
         response,
@@ -165,6 +721,22 @@ def test_health_fail(client, mocker, rabbit_health, mongo_health):
     )
 
 
+def test_health_reports_cached_dependency_state(client, mocker):
+    mock_rabbit_health = _mock_property(mocker, "RabbitMQClient", "is_healthy", True)
+    _ = _mock_property(mocker, "MongoDBClient", "is_healthy", False)
+    _refresh_health_monitor(mocker)
+    mock_rabbit_health.reset_mock()
+
+    response = client.get("health")
+
+    mock_rabbit_health.assert_not_called()
+    dependencies = response.json["data"]["dependencies"]
+    assert dependencies["rabbitmq"]["healthy"]
+    assert dependencies["rabbitmq"]["last_success"] is not None
+    assert not dependencies["mongodb"]["healthy"]
+    assert dependencies["mongodb"]["latency_ms"] >= 0
+
+
 def _build_health_reponse_data_asserter(status, info_content):
     def check_data(actual):
         assert actual.json["data"]["status"] == status
@@ -173,9 +745,29 @@ def _build_health_reponse_data_asserter(status, info_content):
     return check_data
 
 
+def _refresh_health_monitor(mocker):
+    from web.endpoints import health_monitor
+
+    mocker.patch.object(health_monitor, "start")
+    health_monitor.refresh()
+
+
 def _make_mocks(mocker):
     targets = ["rabbit_client", "mongo_client", "Job"]
-    return [mocker.patch(f"{ROOT_PATCH_PATH}.{t}") for t in targets]
+    mock_rabbit, mock_mongo, mock_job = [
+        mocker.patch(f"{ROOT_PATCH_PATH}.{t}") for t in targets
+    ]
+    mock_job.is_valid_id.side_effect = Job.is_valid_id
+    mock_job.JobStatus = JobStatus
+    return mock_rabbit, mock_mongo, mock_job
+
+
+def _mock_completion_waiters(mocker, finished):
+    mock_waiters = mocker.patch(f"{ROOT_PATCH_PATH}.completion_waiters")
+    mock_waiters.finished = mocker.MagicMock()
+    mock_waiters.finished.wait.return_value = finished
+    mock_waiters.waiting_for.return_value.__enter__.return_value = mock_waiters.finished
+    return mock_waiters
 
 
 def _mock_property(mocker, target, prop, value):
@@ -194,8 +786,10 @@ def _raise_bson_error(_, __):
     raise bson.errors.BSONError
 
 
-def _raise_amqp_error(_):
+def _raise_amqp_error(*_):
     raise pika.exceptions.AMQPError
 
 
+FAKE_JOB_ID = "625f4e3229942e20c16ca336"
+FAKE_NOW = 1650000000.0
 ROOT_PATCH_PATH = "web.endpoints"
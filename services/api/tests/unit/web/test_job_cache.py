@@ -0,0 +1,63 @@
+from common import metrics
+from web.job_cache import JobCache, etag_of
+
+
+def test_get_returns_cached_body_and_etag():
+    metrics.reset()
+    cache = JobCache(max_bytes=100, max_entry_bytes=100)
+
+    stored = cache.put("a", b"body")
+
+    assert cache.get("a") == stored
+    assert stored.etag == etag_of(b"body")
+    assert cache.get("b") is None
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"] == {"job_cache.hits": 1, "job_cache.misses": 1}
+    assert snapshot["gauges"] == {
+        "job_cache.bytes": 4,
+        "job_cache.entries": 1,
+        "job_cache.hit_ratio": 0.5,
+    }
+
+
+def test_put_evicts_least_recently_used_entries_by_size():
+    metrics.reset()
+    cache = JobCache(max_bytes=10, max_entry_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    cache.get("a")
+
+    cache.put("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert metrics.snapshot()["counters"]["job_cache.evictions"] == 1
+    assert metrics.snapshot()["gauges"]["job_cache.bytes"] == 8
+
+
+def test_put_replaces_existing_entry():
+    cache = JobCache(max_bytes=10, max_entry_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("a", b"aa")
+    cache.put("b", b"bbbbbbbb")
+    assert cache.get("a").body == b"aa"
+
+
+def test_put_skips_entries_over_the_entry_limit():
+    metrics.reset()
+    cache = JobCache(max_bytes=100, max_entry_bytes=3)
+
+    stored = cache.put("a", b"aaaa")
+
+    assert stored.etag == etag_of(b"aaaa")
+    assert cache.get("a") is None
+
+
+def test_clear():
+    metrics.reset()
+    cache = JobCache(max_bytes=100, max_entry_bytes=100)
+    cache.put("a", b"aaaa")
+    cache.clear()
+    assert cache.get("a") is None
+    assert metrics.snapshot()["gauges"]["job_cache.bytes"] == 0
@@ -0,0 +1,59 @@
+from web import serialization
+import gzip
+import json
+import pytest
+import zstandard
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        {},
+        [],
+        {"a": 1, "b": [1, 2], "c": {"d": None}},
+        {f"w{i}": i for i in range(25)},
+        list(range(25)),
+        {"data": {"word_count": {f"w{i}": i for i in range(25)}, "status": "x"}},
+        {"data": {"jobs": [{"job_id": str(i)} for i in range(25)], "empty": {}}},
+    ],
+)
+def test_iter_encode_matches_json(obj):
+    chunks = list(serialization.iter_encode(obj, min_items=10, chunk_items=4))
+    assert json.loads(b"".join(chunks)) == obj
+
+
+def test_iter_encode_streams_large_containers():
+    word_count = {f"w{i}": i for i in range(25)}
+    chunks = list(
+        serialization.iter_encode({"data": word_count}, min_items=10, chunk_items=4)
+    )
+    assert len(chunks) > 3
+    assert max(map(len, chunks)) < len(serialization.encode(word_count))
+
+
+def test_iter_encode_small_payload_is_single_chunk():
+    assert list(serialization.iter_encode({"a": {"b": 1}})) == [b'{"a":{"b":1}}']
+
+
+def test_buffered():
+    chunks = [b"ab", b"c", b"defg", b"h", b"i"]
+    assert list(serialization.buffered(chunks, 3)) == [b"abc", b"defg", b"hi"]
+
+
+@pytest.mark.parametrize(
+    "encoding,decompress",
+    [
+        ["gzip", gzip.decompress],
+        ["zstd", lambda b: zstandard.ZstdDecompressor().decompressobj().decompress(b)],
+        [None, lambda b: b],
+    ],
+)
+def test_compress_round_trips(encoding, decompress):
+    chunks = [b'{"a":', b"1" * 5000, b"}"]
+    compressed = b"".join(serialization.compress(chunks, encoding))
+    assert decompress(compressed) == b"".join(chunks)
+
+
+def test_compress_rejects_unknown_encoding():
+    with pytest.raises(ValueError):
+        list(serialization.compress([b"{}"], "br"))
@@ -0,0 +1,22 @@
+from worker import analysis, word_histogram
+import pytest
+
+
+def test_analyse_counts_words_in_html():
+    content = b"<html><title>Hi</title><p>hi there</p><script>x</script></html>"
+    assert analysis.analyse(content) == (
+        {"hi": 2, "there": 1},
+        word_histogram.fingerprint("Hi hi there"),
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 4096])
+def test_analyse_stream_matches_analyse(chunk_size):
+    html = (
+        "<html><head><title>Word Count</title><style>p {}</style></head><body>"
+        "<h1>Don't count</h1><p>count&nbsp;these wo<b>rds</b>, words &amp; "
+        "WORDS</p><script>var hidden = 1;</script><template>nope</template>"
+        "<!-- nor this --><![CDATA[but this]]></body></html>"
+    )
+    chunks = [html[i : i + chunk_size] for i in range(0, len(html), chunk_size)]
+    assert analysis.analyse_stream(chunks) == analysis.analyse(html.encode())
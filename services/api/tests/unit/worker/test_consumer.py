@@ -1,16 +1,24 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from common import metrics
+from common.mongo.models.job import JobStatus
 from worker import consumer
+from worker.host_scheduler import HostScheduler
+from worker.scraper import Page, Stream
 import bson
+import json
 import pytest
 import pika
 import pymongo
+import threading
 
 
 def test_consume_complete(mocker):
     mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
-    mock_scraper.scrape_text.return_value = FAKE_HTML
+    mock_scraper.fetch_page.return_value = Page(FAKE_CONTENT, {})
+    mock_scraper.extract_text.return_value = FAKE_HTML
     mock_whist.build.return_value = FAKE_WORD_COUNT
     mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
-    mock_job.complete.return_value = {}
+    mock_job.complete.return_value = {"status": "COMPLETE"}
     mock_channel = mocker.MagicMock()
     mock_method = mocker.MagicMock()
     mock_method.delivery_tag = FAKE_DELIVERY_TAG
@@ -21,19 +29,318 @@ def test_consume_complete(mocker):
     callback = mock_rabbit.consume.call_args.args[0]
     callback(mock_channel, mock_method, None, FAKE_BODY)
 
-    mock_job.fetch.assert_called_once_with(mock_mongo, FAKE_JOB_ID)
-    mock_scraper.scrape_text.assert_called_once_with(FAKE_URL)
+    mock_job.fetch.assert_called_once_with(mock_mongo, FAKE_JOB_ID, histogram=False)
+    mock_scraper.fetch_page.assert_called_once_with(FAKE_URL, None)
+    mock_scraper.extract_text.assert_called_once_with(FAKE_CONTENT)
     mock_whist.build.assert_called_once_with(FAKE_HTML)
-    mock_job.complete.assert_called_once_with(mock_mongo, FAKE_JOB_ID, FAKE_WORD_COUNT)
+    mock_job.complete.assert_called_once_with(
+        mock_mongo,
+        FAKE_JOB_ID,
+        FAKE_WORD_COUNT,
+        {},
+        storage="document",
+        content_hash=FAKE_CONTENT_HASH,
+    )
+    mock_rabbit.notify.assert_called_once_with(
+        {"job_id": FAKE_JOB_ID, "status": "COMPLETE"}
+    )
     mock_channel.basic_ack.assert_called_once_with(delivery_tag=FAKE_DELIVERY_TAG)
     mock_job.fail.assert_not_called()
     mock_job.create.assert_not_called()
 
 
-def test_consume_rabbit_error_raises(mocker):
+def test_consume_splits_large_histograms_across_processes(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
+    mock_scraper.extract_text.return_value = FAKE_HTML
+    mock_whist.build_parallel.return_value = FAKE_WORD_COUNT
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete.return_value = {"status": "COMPLETE"}
+    mock_executor = _patch(mocker, "ProcessPoolExecutor")
+    mocker.patch("worker.consumer.HISTOGRAM_PROCESSES", 2)
+    mocker.patch("worker.consumer.HISTOGRAM_PARALLEL_MIN_CHARS", len(FAKE_HTML))
+    mocker.patch("worker.consumer.HISTOGRAM_CHUNK_CHARS", 4)
+    mock_method = mocker.MagicMock()
+    mock_method.delivery_tag = FAKE_DELIVERY_TAG
+
+    consumer.consume()
+
+    callback = mock_rabbit.consume.call_args.args[0]
+    callback(mocker.MagicMock(), mock_method, None, FAKE_BODY)
+
+    pool = mock_executor.return_value.__enter__.return_value
+    mock_whist.build_parallel.assert_called_once_with(FAKE_HTML, pool, 4)
+    mock_whist.build.assert_not_called()
+    mock_job.complete.assert_called_once_with(
+        mock_mongo,
+        FAKE_JOB_ID,
+        FAKE_WORD_COUNT,
+        {},
+        storage="document",
+        content_hash=FAKE_CONTENT_HASH,
+    )
+
+
+def test_consume_streaming_complete(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
+    mock_analysis = _patch(mocker, "analysis")
+    mocker.patch("worker.consumer.WORKER_MODE", "streaming")
+    mock_scraper.stream.return_value = Stream(iter([FAKE_HTML]), {})
+    mock_analysis.analyse_stream.return_value = (FAKE_WORD_COUNT, FAKE_CONTENT_HASH)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete.return_value = {"status": "COMPLETE"}
+    mock_channel = mocker.MagicMock()
+    mock_method = mocker.MagicMock()
+    mock_method.delivery_tag = FAKE_DELIVERY_TAG
+
+    consumer.consume()
+
+    callback = mock_rabbit.consume.call_args.args[0]
+    callback(mock_channel, mock_method, None, FAKE_BODY)
+
+    mock_scraper.stream.assert_called_once_with(FAKE_URL, None)
+    mock_analysis.analyse_stream.assert_called_once_with(
+        mock_scraper.stream.return_value.chunks
+    )
+    mock_scraper.fetch_page.assert_not_called()
+    mock_whist.build.assert_not_called()
+    mock_job.complete.assert_called_once_with(
+        mock_mongo,
+        FAKE_JOB_ID,
+        FAKE_WORD_COUNT,
+        {},
+        storage="document",
+        content_hash=FAKE_CONTENT_HASH,
+    )
+    mock_channel.basic_ack.assert_called_once_with(delivery_tag=FAKE_DELIVERY_TAG)
+
+
+def test_consume_streaming_fails_job_on_oversized_body(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, _ = _make_mocks(mocker)
+    mock_analysis = _patch(mocker, "analysis")
+    mocker.patch("worker.consumer.WORKER_MODE", "streaming")
+    mock_analysis.analyse_stream.side_effect = RuntimeError("too big")
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.fail.return_value = {"status": "FAIL"}
+    mock_channel = mocker.MagicMock()
+
+    consumer.consume()
+
+    callback = mock_rabbit.consume.call_args.args[0]
+    callback(mock_channel, mocker.MagicMock(), None, FAKE_BODY)
+
+    mock_job.complete.assert_not_called()
+    mock_job.fail.assert_called_once_with(mock_mongo, FAKE_JOB_ID, "too big")
+
+
+def test_consume_stores_validators(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
+    mock_scraper.fetch_page.return_value = Page(FAKE_CONTENT, FAKE_VALIDATORS)
+    mock_whist.build.return_value = FAKE_WORD_COUNT
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete.return_value = {"status": "COMPLETE"}
+
+    consumer.consume()
+
+    callback = mock_rabbit.consume.call_args.args[0]
+    callback(mocker.MagicMock(), mocker.MagicMock(), None, FAKE_BODY)
+
+    mock_job.find_validated.assert_called_once_with(mock_mongo, FAKE_URL)
+    mock_job.complete.assert_called_once_with(
+        mock_mongo,
+        FAKE_JOB_ID,
+        FAKE_WORD_COUNT,
+        FAKE_VALIDATORS,
+        storage="document",
+        content_hash=FAKE_CONTENT_HASH,
+    )
+
+
+def test_consume_rejects_unknown_histogram_storage(mocker):
+    mock_rabbit, _, _, _, _ = _make_mocks(mocker)
+    mocker.patch("worker.consumer.HISTOGRAM_STORAGE", "csv")
+
+    with pytest.raises(ValueError, match="csv"):
+        consumer.consume()
+
+    mock_rabbit.consume.assert_not_called()
+
+
+def test_consume_reuses_previous_histogram_when_not_modified(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
+    mock_job.find_validated.return_value = {
+        "job_id": FAKE_PREVIOUS_JOB_ID,
+        "validators": FAKE_VALIDATORS,
+    }
+    mock_scraper.fetch_page.return_value = Page(None, FAKE_VALIDATORS)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete_from.return_value = {"status": "COMPLETE"}
+    mock_channel = mocker.MagicMock()
+
+    consumer.consume()
+
+    callback = mock_rabbit.consume.call_args.args[0]
+    callback(mock_channel, mocker.MagicMock(), None, FAKE_BODY)
+
+    mock_scraper.fetch_page.assert_called_once_with(FAKE_URL, FAKE_VALIDATORS)
+    mock_scraper.extract_text.assert_not_called()
+    mock_whist.build.assert_not_called()
+    mock_job.complete.assert_not_called()
+    mock_job.complete_from.assert_called_once_with(
+        mock_mongo, FAKE_JOB_ID, FAKE_PREVIOUS_JOB_ID, FAKE_VALIDATORS
+    )
+    mock_rabbit.notify.assert_called_once_with(
+        {"job_id": FAKE_JOB_ID, "status": "COMPLETE"}
+    )
+    mock_channel.basic_ack.assert_called_once()
+
+
+def test_consume_fails_job_when_previous_result_is_gone(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, _ = _make_mocks(mocker)
+    mock_job.find_validated.return_value = {
+        "job_id": FAKE_PREVIOUS_JOB_ID,
+        "validators": FAKE_VALIDATORS,
+    }
+    mock_scraper.fetch_page.return_value = Page(None, FAKE_VALIDATORS)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete_from.return_value = {"status": "IN_PROGRESS"}
+    mock_job.fail.return_value = {"status": "FAIL"}
+    mock_channel = mocker.MagicMock()
+
+    consumer.consume()
+
+    callback = mock_rabbit.consume.call_args.args[0]
+    callback(mock_channel, mocker.MagicMock(), None, FAKE_BODY)
+
+    mock_job.fail.assert_called_once_with(
+        mock_mongo,
+        FAKE_JOB_ID,
+        f"Previous result job_id({FAKE_PREVIOUS_JOB_ID}) is unavailable",
+    )
+    mock_rabbit.notify.assert_called_once_with(
+        {"job_id": FAKE_JOB_ID, "status": "FAIL"}
+    )
+    mock_channel.basic_ack.assert_called_once()
+
+
+def test_consume_streaming_reuses_previous_histogram_when_not_modified(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, _ = _make_mocks(mocker)
+    mock_analysis = _patch(mocker, "analysis")
+    mocker.patch("worker.consumer.WORKER_MODE", "streaming")
+    mock_job.find_validated.return_value = {
+        "job_id": FAKE_PREVIOUS_JOB_ID,
+        "validators": FAKE_VALIDATORS,
+    }
+    mock_scraper.stream.return_value = Stream(None, FAKE_VALIDATORS)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete_from.return_value = {"status": "COMPLETE"}
+
+    consumer.consume()
+
+    callback = mock_rabbit.consume.call_args.args[0]
+    callback(mocker.MagicMock(), mocker.MagicMock(), None, FAKE_BODY)
+
+    mock_scraper.stream.assert_called_once_with(FAKE_URL, FAKE_VALIDATORS)
+    mock_analysis.analyse_stream.assert_not_called()
+    mock_job.complete_from.assert_called_once_with(
+        mock_mongo, FAKE_JOB_ID, FAKE_PREVIOUS_JOB_ID, FAKE_VALIDATORS
+    )
+
+
+def test_consume_shares_histogram_of_identical_content(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
+    mock_scraper.extract_text.return_value = FAKE_HTML
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.find_shared.return_value = FAKE_PREVIOUS_JOB_ID
+    mock_job.complete_shared.return_value = {"status": "COMPLETE"}
+    mock_method = mocker.MagicMock()
+    mock_method.delivery_tag = FAKE_DELIVERY_TAG
+
+    consumer.consume()
+
+    callback = mock_rabbit.consume.call_args.args[0]
+    callback(mocker.MagicMock(), mock_method, None, FAKE_BODY)
+
+    mock_whist.fingerprint.assert_called_once_with(FAKE_HTML)
+    mock_job.find_shared.assert_called_once_with(mock_mongo, FAKE_CONTENT_HASH)
+    mock_job.complete_shared.assert_called_once_with(
+        mock_mongo, FAKE_JOB_ID, FAKE_PREVIOUS_JOB_ID, FAKE_CONTENT_HASH, {}
+    )
+    mock_whist.build.assert_not_called()
+    mock_job.complete.assert_not_called()
+    mock_rabbit.notify.assert_called_once_with(
+        {"job_id": FAKE_JOB_ID, "status": "COMPLETE"}
+    )
+
+
+def test_consume_counts_words_when_shared_lookup_fails(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
+    mock_whist.build.return_value = FAKE_WORD_COUNT
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.find_shared.side_effect = _make_mongo_raiser("oh no")
+    mock_job.complete.return_value = {"status": "COMPLETE"}
+
+    consumer.consume()
+
+    callback = mock_rabbit.consume.call_args.args[0]
+    callback(mocker.MagicMock(), mocker.MagicMock(), None, FAKE_BODY)
+
+    mock_job.complete_shared.assert_not_called()
+    mock_job.complete.assert_called_once_with(
+        mock_mongo,
+        FAKE_JOB_ID,
+        FAKE_WORD_COUNT,
+        {},
+        storage="document",
+        content_hash=FAKE_CONTENT_HASH,
+    )
+
+
+def test_consume_ignores_previous_job_lookup_errors(mocker):
+    mock_rabbit, mock_mongo, mock_job, _, mock_whist = _make_mocks(mocker)
+    mock_job.find_validated.side_effect = _make_mongo_raiser("oh no")
+    mock_whist.build.return_value = FAKE_WORD_COUNT
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete.return_value = {"status": "COMPLETE"}
+
+    consumer.consume()
+
+    callback = mock_rabbit.consume.call_args.args[0]
+    callback(mocker.MagicMock(), mocker.MagicMock(), None, FAKE_BODY)
+
+    mock_job.complete.assert_called_once_with(
+        mock_mongo,
+        FAKE_JOB_ID,
+        FAKE_WORD_COUNT,
+        {},
+        storage="document",
+        content_hash=FAKE_CONTENT_HASH,
+    )
+
+
+def test_consume_complete_tolerates_notify_error(mocker):
     def _raise(_):
         raise pika.exceptions.AMQPError
 
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete.return_value = {"status": "COMPLETE"}
+    mock_rabbit.notify.side_effect = _raise
+    mock_channel = mocker.MagicMock()
+    mock_method = mocker.MagicMock()
+    mock_method.delivery_tag = FAKE_DELIVERY_TAG
+
+    consumer.consume()
+    callback = mock_rabbit.consume.call_args.args[0]
+    callback(mock_channel, mock_method, None, FAKE_BODY)
+
+    mock_job.fail.assert_not_called()
+    mock_channel.basic_ack.assert_called_once_with(delivery_tag=FAKE_DELIVERY_TAG)
+
+
+def test_consume_rabbit_error_raises(mocker):
+    def _raise(_, prefetch_count):
+        raise pika.exceptions.AMQPError
+
     mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
     mock_rabbit.consume.side_effect = _raise
 
@@ -41,6 +348,530 @@ def test_consume_rabbit_error_raises(mocker):
         consumer.consume()
 
 
+def test_consume_starts_metrics_reporter_once_per_process(mocker):
+    _make_mocks(mocker)
+    mocker.patch("worker.consumer.metrics_reporter_started", threading.Event())
+    mock_thread = mocker.patch("worker.consumer.threading.Thread")
+
+    consumer.consume()
+    consumer.consume()
+
+    mock_thread.assert_called_once()
+
+
+def test_consume_serves_metrics_when_port_is_set(mocker):
+    _make_mocks(mocker)
+    mocker.patch("worker.consumer.metrics_reporter_started", threading.Event())
+    mocker.patch("worker.consumer.threading.Thread")
+    mocker.patch("worker.consumer.WORKER_METRICS_PORT", 9100)
+    mock_server = mocker.patch("worker.consumer.metrics_server")
+
+    consumer.consume()
+    consumer.consume()
+
+    mock_server.serve.assert_called_once_with(9100)
+
+
+def test_consume_uses_configured_prefetch(mocker):
+    mock_rabbit, _, _, _, _ = _make_mocks(mocker)
+    mocker.patch("worker.consumer.WORKER_PREFETCH", 8)
+
+    consumer.consume()
+
+    assert mock_rabbit.consume.call_args.kwargs == {"prefetch_count": 8}
+
+
+def test_consume_concurrently_acks_on_connection_thread(mocker):
+    def _deliver(callback, prefetch_count):
+        for tag in range(4):
+            mock_method = mocker.MagicMock()
+            mock_method.delivery_tag = tag
+            callback(mock_channel, mock_method, None, FAKE_BODY)
+
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
+    mocker.patch("worker.consumer.WORKER_CONCURRENCY", 2)
+    mocker.patch("worker.consumer.WORKER_PREFETCH", 4)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete.return_value = {"status": "COMPLETE"}
+    mock_channel = mocker.MagicMock()
+    mock_rabbit.consume.side_effect = _deliver
+
+    consumer.consume()
+
+    assert mock_rabbit.consume.call_args.kwargs == {"prefetch_count": 4}
+    assert mock_job.complete.call_count == 4
+    mock_channel.basic_ack.assert_not_called()
+    scheduled = mock_channel.connection.add_callback_threadsafe.call_args_list
+    for ack in scheduled:
+        ack.args[0]()
+    assert sorted(
+        c.kwargs["delivery_tag"] for c in mock_channel.basic_ack.call_args_list
+    ) == [
+        0,
+        1,
+        2,
+        3,
+    ]
+
+
+def test_consume_concurrently_serves_heavier_lanes_first(mocker):
+    def _deliver(callback, prefetch_count):
+        for tag, (job_id, priority) in enumerate(jobs):
+            mock_method = mocker.MagicMock()
+            mock_method.delivery_tag = tag
+            body = {"job_id": job_id, "priority": priority, "queued_at": 100.0}
+            callback(mock_channel, mock_method, None, json.dumps(body))
+
+    jobs = [("a", "low"), ("b", "low"), ("c", "high"), ("d", "bogus")]
+    mock_rabbit, mock_mongo, mock_job, _, _ = _make_mocks(mocker)
+    mocker.patch("worker.consumer.WORKER_CONCURRENCY", 2)
+    mocker.patch("worker.consumer.ThreadPoolExecutor", _DeferredExecutor)
+    mocker.patch("worker.consumer.time.time", return_value=105.0)
+    mock_job.fetch.return_value = None
+    mock_channel = mocker.MagicMock()
+    mock_rabbit.consume.side_effect = _deliver
+    metrics.reset()
+
+    consumer.consume()
+
+    assert [c.args[1] for c in mock_job.fetch.call_args_list] == ["c", "d", "a", "b"]
+    assert mock_channel.connection.add_callback_threadsafe.call_count == 4
+    waits = metrics.snapshot()["percentiles"]
+    assert waits["lanes.high.wait_seconds"] == {"p50": 5.0, "p90": 5.0, "p99": 5.0}
+    assert set(waits) == {
+        "lanes.high.wait_seconds",
+        "lanes.normal.wait_seconds",
+        "lanes.low.wait_seconds",
+    }
+
+
+def test_consume_concurrently_survives_closed_connection(mocker):
+    def _deliver(callback, prefetch_count):
+        mock_method = mocker.MagicMock()
+        mock_method.delivery_tag = FAKE_DELIVERY_TAG
+        callback(mock_channel, mock_method, None, FAKE_BODY)
+
+    mock_rabbit, _, mock_job, _, _ = _make_mocks(mocker)
+    mocker.patch("worker.consumer.WORKER_CONCURRENCY", 2)
+    mock_job.fetch.side_effect = RuntimeError("unexpected")
+    mock_channel = mocker.MagicMock()
+    mock_channel.connection.add_callback_threadsafe.side_effect = (
+        pika.exceptions.ConnectionWrongStateError
+    )
+    mock_rabbit.consume.side_effect = _deliver
+
+    consumer.consume()
+
+    mock_channel.connection.add_callback_threadsafe.assert_called_once()
+    mock_channel.basic_ack.assert_not_called()
+
+
+def test_consume_pipeline_complete(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, _ = _make_mocks(mocker)
+    mock_analysis, mock_channel = _setup_pipeline_test(mocker, mock_rabbit)
+    mock_scraper.fetch_page.return_value = Page(b"<p>hello</p>", {})
+    mock_analysis.analyse.return_value = (FAKE_WORD_COUNT, FAKE_CONTENT_HASH)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete.return_value = {"status": "COMPLETE"}
+
+    consumer.consume()
+
+    mock_scraper.fetch_page.assert_called_once_with(FAKE_URL, None)
+    mock_analysis.analyse.assert_called_once_with(b"<p>hello</p>")
+    mock_job.complete.assert_called_once_with(
+        mock_mongo,
+        FAKE_JOB_ID,
+        FAKE_WORD_COUNT,
+        {},
+        storage="document",
+        content_hash=FAKE_CONTENT_HASH,
+    )
+    mock_rabbit.notify.assert_called_once_with(
+        {"job_id": FAKE_JOB_ID, "status": "COMPLETE"}
+    )
+    mock_job.fail.assert_not_called()
+    _assert_acked_threadsafe(mock_channel)
+
+
+def test_consume_pipeline_batches_results_and_acks_after_write(mocker):
+    mock_rabbit, mock_mongo, mock_job, _, _ = _make_mocks(mocker)
+    mock_analysis, mock_channel = _setup_pipeline_test(mocker, mock_rabbit)
+    mocker.patch("worker.consumer.RESULT_BATCH_SIZE", 10)
+    mocker.patch("worker.consumer.RESULT_BATCH_DELAY", 0)
+    mock_analysis.analyse.return_value = (FAKE_WORD_COUNT, FAKE_CONTENT_HASH)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.histogram.return_value = {"word_count": FAKE_WORD_COUNT}
+    mock_job.completion.return_value = {"status": "COMPLETE", "completed_at": 1.0}
+    mock_job.apply.side_effect = lambda *_: (
+        mock_channel.connection.add_callback_threadsafe.assert_not_called() or {}
+    )
+
+    consumer.consume()
+
+    mock_job.histogram.assert_called_once_with(
+        mock_mongo, FAKE_WORD_COUNT, storage="document"
+    )
+    mock_job.completion.assert_called_once_with(FAKE_JOB_ID, {}, FAKE_CONTENT_HASH)
+    mock_job.apply.assert_called_once_with(
+        mock_mongo,
+        [
+            (
+                FAKE_JOB_ID,
+                {"status": "COMPLETE", "completed_at": 1.0},
+                {"word_count": FAKE_WORD_COUNT},
+            )
+        ],
+    )
+    mock_job.complete.assert_not_called()
+    mock_rabbit.notify.assert_called_once_with(
+        {"job_id": FAKE_JOB_ID, "status": "COMPLETE"}
+    )
+    _assert_acked_threadsafe(mock_channel)
+
+
+def test_store_results_fails_jobs_whose_writes_failed(mocker):
+    mock_rabbit, mock_mongo, mock_job, _, _ = _make_mocks(mocker)
+    mock_job.apply.return_value = {1: "too large"}
+    mock_job.fail.return_value = {"status": "FAIL"}
+    acks, requeues = _settlers(mocker), _settlers(mocker)
+
+    consumer.store_results(
+        [
+            consumer.Result("a", {"status": "COMPLETE"}, acks[0], requeue=requeues[0]),
+            consumer.Result("b", {"status": "COMPLETE"}, acks[1], requeue=requeues[1]),
+        ]
+    )
+
+    mock_job.fail.assert_called_once_with(mock_mongo, "b", "too large")
+    assert mock_rabbit.notify.call_args_list == [
+        mocker.call({"job_id": "a", "status": "COMPLETE"}),
+        mocker.call({"job_id": "b", "status": "FAIL"}),
+    ]
+    for ack, requeue in zip(acks, requeues):
+        ack.assert_called_once_with()
+        requeue.assert_not_called()
+
+
+def test_store_results_fails_whole_batch_on_mongo_error(mocker):
+    _, mock_mongo, mock_job, _, _ = _make_mocks(mocker)
+    mock_job.apply.side_effect = _make_mongo_raiser("oh no")
+    mock_job.fail.return_value = {"status": "FAIL"}
+    acks, requeues = _settlers(mocker), _settlers(mocker)
+
+    consumer.store_results(
+        [
+            consumer.Result("a", {"status": "COMPLETE"}, acks[0], requeue=requeues[0]),
+            consumer.Result("b", {"status": "FAIL"}, acks[1], requeue=requeues[1]),
+        ]
+    )
+
+    assert mock_job.fail.call_args_list == [
+        mocker.call(mock_mongo, "a", "oh no"),
+        mocker.call(mock_mongo, "b", "oh no"),
+    ]
+    for ack, requeue in zip(acks, requeues):
+        ack.assert_called_once_with()
+        requeue.assert_not_called()
+
+
+def test_store_results_requeues_jobs_whose_failure_was_not_written(mocker):
+    mock_rabbit, _, mock_job, _, _ = _make_mocks(mocker)
+    mock_job.apply.return_value = {1: "too large"}
+    mock_job.fail.side_effect = _make_mongo_raiser("still down")
+    acks, requeues = _settlers(mocker), _settlers(mocker)
+
+    consumer.store_results(
+        [
+            consumer.Result("a", {"status": "COMPLETE"}, acks[0], requeue=requeues[0]),
+            consumer.Result("b", {"status": "COMPLETE"}, acks[1], requeue=requeues[1]),
+        ]
+    )
+
+    acks[0].assert_called_once_with()
+    requeues[0].assert_not_called()
+    acks[1].assert_not_called()
+    requeues[1].assert_called_once_with()
+    mock_rabbit.notify.assert_called_once_with({"job_id": "a", "status": "COMPLETE"})
+
+
+def test_store_results_requeues_unwritten_jobs_on_unexpected_error(mocker):
+    _, _, mock_job, _, _ = _make_mocks(mocker)
+    mock_job.apply.side_effect = RuntimeError("boom")
+    acks, requeues = _settlers(mocker), _settlers(mocker)
+
+    with pytest.raises(RuntimeError):
+        consumer.store_results(
+            [
+                consumer.Result("a", {}, acks[0], requeue=requeues[0]),
+                consumer.Result("b", {}, acks[1], requeue=requeues[1]),
+            ]
+        )
+
+    for ack, requeue in zip(acks, requeues):
+        ack.assert_not_called()
+        requeue.assert_called_once_with()
+
+
+def test_consume_pipeline_requeues_batch_when_nothing_was_written(mocker):
+    mock_rabbit, _, mock_job, _, _ = _make_mocks(mocker)
+    mock_analysis, mock_channel = _setup_pipeline_test(mocker, mock_rabbit)
+    mocker.patch("worker.consumer.RESULT_BATCH_SIZE", 10)
+    mocker.patch("worker.consumer.RESULT_BATCH_DELAY", 0)
+    mock_analysis.analyse.return_value = (FAKE_WORD_COUNT, FAKE_CONTENT_HASH)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.apply.side_effect = _make_mongo_raiser("oh no")
+    mock_job.fail.side_effect = _make_mongo_raiser("oh no")
+
+    consumer.consume()
+
+    mock_channel.connection.add_callback_threadsafe.assert_called_once()
+    mock_channel.connection.add_callback_threadsafe.call_args.args[0]()
+    mock_channel.basic_nack.assert_called_once_with(
+        delivery_tag=FAKE_DELIVERY_TAG, requeue=True
+    )
+    mock_channel.basic_ack.assert_not_called()
+
+
+def test_consume_pipeline_shares_histogram_of_identical_content(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, _ = _make_mocks(mocker)
+    mock_analysis, mock_channel = _setup_pipeline_test(mocker, mock_rabbit)
+    mock_analysis.analyse.return_value = (FAKE_WORD_COUNT, FAKE_CONTENT_HASH)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.find_shared.return_value = FAKE_PREVIOUS_JOB_ID
+    mock_job.complete_shared.return_value = {"status": "COMPLETE"}
+
+    consumer.consume()
+
+    mock_job.complete_shared.assert_called_once_with(
+        mock_mongo, FAKE_JOB_ID, FAKE_PREVIOUS_JOB_ID, FAKE_CONTENT_HASH, {}
+    )
+    mock_job.complete.assert_not_called()
+    _assert_acked_threadsafe(mock_channel)
+
+
+def test_consume_pipeline_reuses_previous_histogram_when_not_modified(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, _ = _make_mocks(mocker)
+    mock_analysis, mock_channel = _setup_pipeline_test(mocker, mock_rabbit)
+    mock_job.find_validated.return_value = {
+        "job_id": FAKE_PREVIOUS_JOB_ID,
+        "validators": FAKE_VALIDATORS,
+    }
+    mock_scraper.fetch_page.return_value = Page(None, FAKE_VALIDATORS)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete_from.return_value = {"status": "COMPLETE"}
+
+    consumer.consume()
+
+    mock_scraper.fetch_page.assert_called_once_with(FAKE_URL, FAKE_VALIDATORS)
+    mock_analysis.analyse.assert_not_called()
+    mock_job.complete.assert_not_called()
+    mock_job.complete_from.assert_called_once_with(
+        mock_mongo, FAKE_JOB_ID, FAKE_PREVIOUS_JOB_ID, FAKE_VALIDATORS
+    )
+    _assert_acked_threadsafe(mock_channel)
+
+
+def test_consume_pipeline_fails_job_when_previous_result_is_gone(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, _ = _make_mocks(mocker)
+    _, mock_channel = _setup_pipeline_test(mocker, mock_rabbit)
+    mock_job.find_validated.return_value = {
+        "job_id": FAKE_PREVIOUS_JOB_ID,
+        "validators": FAKE_VALIDATORS,
+    }
+    mock_scraper.fetch_page.return_value = Page(None, FAKE_VALIDATORS)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete_from.return_value = None
+    mock_job.fail.return_value = {"status": "FAIL"}
+
+    consumer.consume()
+
+    mock_job.fail.assert_called_once()
+    _assert_acked_threadsafe(mock_channel)
+
+
+def test_consume_pipeline_schedules_jobs_by_host(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, _ = _make_mocks(mocker)
+    mock_analysis, mock_channel = _setup_pipeline_test(
+        mocker, mock_rabbit, body=FAKE_BODY_WITH_URL
+    )
+    release = mocker.spy(HostScheduler, "release")
+    mock_analysis.analyse.return_value = (FAKE_WORD_COUNT, FAKE_CONTENT_HASH)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete.return_value = {"status": "COMPLETE"}
+
+    consumer.consume()
+
+    release.assert_called_once()
+    assert release.call_args.args[1] == "example.com"
+    mock_job.complete.assert_called_once_with(
+        mock_mongo,
+        FAKE_JOB_ID,
+        FAKE_WORD_COUNT,
+        {},
+        storage="document",
+        content_hash=FAKE_CONTENT_HASH,
+    )
+    _assert_acked_threadsafe(mock_channel)
+
+
+def test_consume_pipeline_defers_jobs_for_backlogged_hosts(mocker):
+    mock_rabbit, _, mock_job, _, _ = _make_mocks(mocker)
+    _, mock_channel = _setup_pipeline_test(mocker, mock_rabbit, body=FAKE_BODY_WITH_URL)
+    mocker.patch.object(HostScheduler, "is_backlogged", return_value=True)
+
+    consumer.consume()
+
+    mock_rabbit.publish_delayed.assert_called_once_with(
+        {"job_id": FAKE_JOB_ID, "url": FAKE_URL}, "normal", consumer.HOST_DEFER_DELAY
+    )
+    mock_channel.basic_ack.assert_called_once_with(delivery_tag=FAKE_DELIVERY_TAG)
+    mock_channel.connection.add_callback_threadsafe.assert_not_called()
+    mock_job.fetch.assert_not_called()
+
+
+def test_consume_pipeline_defers_jobs_to_their_lane(mocker):
+    mock_rabbit, _, _, _, _ = _make_mocks(mocker)
+    body = {"job_id": FAKE_JOB_ID, "url": FAKE_URL, "priority": "low"}
+    _setup_pipeline_test(mocker, mock_rabbit, body=json.dumps(body))
+    mocker.patch.object(HostScheduler, "is_backlogged", return_value=True)
+
+    consumer.consume()
+
+    mock_rabbit.publish_delayed.assert_called_once_with(
+        body, "low", consumer.HOST_DEFER_DELAY
+    )
+
+
+def test_consume_pipeline_runs_job_when_deferral_fails(mocker):
+    mock_rabbit, _, mock_job, _, _ = _make_mocks(mocker)
+    mock_analysis, mock_channel = _setup_pipeline_test(
+        mocker, mock_rabbit, body=FAKE_BODY_WITH_URL
+    )
+    mocker.patch.object(HostScheduler, "is_backlogged", return_value=True)
+    mock_rabbit.publish_delayed.side_effect = pika.exceptions.AMQPError
+    mock_analysis.analyse.return_value = (FAKE_WORD_COUNT, FAKE_CONTENT_HASH)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete.return_value = {"status": "COMPLETE"}
+
+    consumer.consume()
+
+    mock_job.complete.assert_called_once()
+    _assert_acked_threadsafe(mock_channel)
+
+
+def test_consume_pipeline_fails_job_on_fetch_error(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, _ = _make_mocks(mocker)
+    mock_analysis, mock_channel = _setup_pipeline_test(mocker, mock_rabbit)
+    mock_scraper.fetch_page.side_effect = RuntimeError("oh no")
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.fail.return_value = {"status": "FAIL"}
+
+    consumer.consume()
+
+    mock_analysis.analyse.assert_not_called()
+    mock_job.complete.assert_not_called()
+    mock_job.fail.assert_called_once_with(mock_mongo, FAKE_JOB_ID, "oh no")
+    mock_rabbit.notify.assert_called_once_with(
+        {"job_id": FAKE_JOB_ID, "status": "FAIL"}
+    )
+    _assert_acked_threadsafe(mock_channel)
+
+
+def test_consume_pipeline_fails_job_on_parse_error(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, _ = _make_mocks(mocker)
+    mock_analysis, mock_channel = _setup_pipeline_test(mocker, mock_rabbit)
+    mock_analysis.analyse.side_effect = ValueError("unparseable")
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.fail.return_value = {"status": "FAIL"}
+
+    consumer.consume()
+
+    mock_job.complete.assert_not_called()
+    mock_job.fail.assert_called_once_with(mock_mongo, FAKE_JOB_ID, "unparseable")
+    _assert_acked_threadsafe(mock_channel)
+
+
+def test_consume_pipeline_fails_job_without_content_or_previous(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, _ = _make_mocks(mocker)
+    mock_analysis, mock_channel = _setup_pipeline_test(mocker, mock_rabbit)
+    mock_scraper.fetch_page.return_value = Page(None, FAKE_VALIDATORS)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.fail.return_value = {"status": "FAIL"}
+
+    consumer.consume()
+
+    mock_analysis.analyse.assert_not_called()
+    mock_job.fail.assert_called_once_with(
+        mock_mongo, FAKE_JOB_ID, "Page returned no content"
+    )
+    _assert_acked_threadsafe(mock_channel)
+
+
+def test_consume_pipeline_fails_job_on_mongo_error_on_complete(mocker):
+    mock_rabbit, mock_mongo, mock_job, _, _ = _make_mocks(mocker)
+    mock_analysis, mock_channel = _setup_pipeline_test(mocker, mock_rabbit)
+    mock_analysis.analyse.return_value = (FAKE_WORD_COUNT, FAKE_CONTENT_HASH)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete.side_effect = _make_mongo_raiser("oh no")
+    mock_job.fail.return_value = {"status": "FAIL"}
+
+    consumer.consume()
+
+    mock_job.fail.assert_called_once_with(mock_mongo, FAKE_JOB_ID, "oh no")
+    _assert_acked_threadsafe(mock_channel)
+
+
+def test_consume_pipeline_fails_job_on_unexpected_fetch_error(mocker):
+    mock_rabbit, mock_mongo, mock_job, mock_scraper, _ = _make_mocks(mocker)
+    mock_analysis, mock_channel = _setup_pipeline_test(mocker, mock_rabbit)
+    mock_scraper.fetch_page.side_effect = ValueError("bad url")
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.fail.return_value = {"status": "FAIL"}
+
+    consumer.consume()
+
+    mock_analysis.analyse.assert_not_called()
+    mock_job.fail.assert_called_once_with(mock_mongo, FAKE_JOB_ID, "bad url")
+    _assert_acked_threadsafe(mock_channel)
+
+
+def test_consume_pipeline_fails_job_on_unexpected_error_on_complete(mocker):
+    mock_rabbit, mock_mongo, mock_job, _, _ = _make_mocks(mocker)
+    mock_analysis, mock_channel = _setup_pipeline_test(mocker, mock_rabbit)
+    mock_analysis.analyse.return_value = (FAKE_WORD_COUNT, FAKE_CONTENT_HASH)
+    mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
+    mock_job.complete.side_effect = ValueError("too big")
+    mock_job.fail.return_value = {"status": "FAIL"}
+
+    consumer.consume()
+
+    mock_job.fail.assert_called_once_with(mock_mongo, FAKE_JOB_ID, "too big")
+    _assert_acked_threadsafe(mock_channel)
+
+
+def test_consume_pipeline_acks_unknown_jobs(mocker):
+    mock_rabbit, _, mock_job, mock_scraper, _ = _make_mocks(mocker)
+    _, mock_channel = _setup_pipeline_test(mocker, mock_rabbit)
+    mock_job.fetch.return_value = None
+
+    consumer.consume()
+
+    mock_scraper.fetch_page.assert_not_called()
+    mock_job.fail.assert_not_called()
+    _assert_acked_threadsafe(mock_channel)
+
+
+def test_consume_pipeline_acks_malformed_bodies_immediately(mocker):
+    mock_rabbit, _, mock_job, _, _ = _make_mocks(mocker)
+    _, mock_channel = _setup_pipeline_test(mocker, mock_rabbit, body="not json")
+
+    consumer.consume()
+
+    mock_job.fetch.assert_not_called()
+    mock_channel.connection.add_callback_threadsafe.assert_not_called()
+    mock_channel.basic_ack.assert_called_once_with(delivery_tag=FAKE_DELIVERY_TAG)
+
+
 def test_consume_malformed_json_fails_silently(mocker):
     fake_body = "not valid json"
     mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
@@ -55,7 +886,7 @@ def test_consume_malformed_json_fails_silently(mocker):
     callback(mock_channel, mock_method, None, fake_body)
 
     mock_job.fetch.assert_not_called()
-    mock_scraper.scrape_text.assert_not_called()
+    mock_scraper.fetch_page.assert_not_called()
     mock_job.fail.assert_not_called()
     mock_whist.build.assert_not_called()
     mock_job.complete.assert_not_called()
@@ -77,7 +908,7 @@ def test_consume_missing_job_id_fails_silently(mocker):
     callback(mock_channel, mock_method, None, fake_body)
 
     mock_job.fetch.assert_not_called()
-    mock_scraper.scrape_text.assert_not_called()
+    mock_scraper.fetch_page.assert_not_called()
     mock_job.fail.assert_not_called()
     mock_channel.basic_ack.assert_called_once_with(delivery_tag=FAKE_DELIVERY_TAG)
     mock_whist.build.assert_not_called()
@@ -87,8 +918,7 @@ def test_consume_missing_job_id_fails_silently(mocker):
 
 def test_consume_unknown_job_id_fails_silently(mocker):
     mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
-    mock_job.COLLECTION = "something"
-    mock_mongo.exists.return_value = False
+    mock_job.fetch.return_value = None
     mock_channel = mocker.MagicMock()
     mock_method = mocker.MagicMock()
     mock_method.delivery_tag = FAKE_DELIVERY_TAG
@@ -99,9 +929,9 @@ def test_consume_unknown_job_id_fails_silently(mocker):
     callback = mock_rabbit.consume.call_args.args[0]
     callback(mock_channel, mock_method, None, FAKE_BODY)
 
-    mock_mongo.exists.assert_called_once_with(mock_job.COLLECTION, FAKE_JOB_ID)
-    mock_job.fetch.assert_not_called()
-    mock_scraper.scrape_text.assert_not_called()
+    mock_job.fetch.assert_called_once_with(mock_mongo, FAKE_JOB_ID, histogram=False)
+    mock_mongo.exists.assert_not_called()
+    mock_scraper.fetch_page.assert_not_called()
     mock_job.fail.assert_not_called()
     mock_channel.basic_ack.assert_called_once_with(delivery_tag=FAKE_DELIVERY_TAG)
     mock_whist.build.assert_not_called()
@@ -110,12 +940,11 @@ def test_consume_unknown_job_id_fails_silently(mocker):
 
 
 def test_consume_malformed_job_id_fails_silently(mocker):
-    def _raise(_, __):
+    def _raise(_, __, histogram):
         raise bson.errors.BSONError
 
     mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
-    mock_mongo.exists.side_effect = _raise
-    mock_job.COLLECTION = "something"
+    mock_job.fetch.side_effect = _raise
     mock_channel = mocker.MagicMock()
     mock_method = mocker.MagicMock()
     mock_method.delivery_tag = FAKE_DELIVERY_TAG
@@ -126,9 +955,8 @@ def test_consume_malformed_job_id_fails_silently(mocker):
     callback = mock_rabbit.consume.call_args.args[0]
     callback(mock_channel, mock_method, None, FAKE_BODY)
 
-    mock_mongo.exists.assert_called_once_with(mock_job.COLLECTION, FAKE_JOB_ID)
-    mock_job.fetch.assert_not_called()
-    mock_scraper.scrape_text.assert_not_called()
+    mock_job.fetch.assert_called_once_with(mock_mongo, FAKE_JOB_ID, histogram=False)
+    mock_scraper.fetch_page.assert_not_called()
     mock_job.fail.assert_not_called()
     mock_channel.basic_ack.assert_called_once_with(delivery_tag=FAKE_DELIVERY_TAG)
     mock_whist.build.assert_not_called()
@@ -139,7 +967,8 @@ def test_consume_malformed_job_id_fails_silently(mocker):
 def test_consume_fail_mongo_error_on_complete(mocker):
     err_message = "oh no"
     mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
-    mock_scraper.scrape_text.return_value = FAKE_HTML
+    mock_scraper.fetch_page.return_value = Page(FAKE_CONTENT, {})
+    mock_scraper.extract_text.return_value = FAKE_HTML
     mock_whist.build.return_value = FAKE_WORD_COUNT
     mock_job.complete.side_effect = _make_mongo_raiser(err_message)
     mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
@@ -154,10 +983,18 @@ def test_consume_fail_mongo_error_on_complete(mocker):
     callback = mock_rabbit.consume.call_args.args[0]
     callback(mock_channel, mock_method, None, FAKE_BODY)
 
-    mock_job.fetch.assert_called_once_with(mock_mongo, FAKE_JOB_ID)
-    mock_scraper.scrape_text.assert_called_once_with(FAKE_URL)
+    mock_job.fetch.assert_called_once_with(mock_mongo, FAKE_JOB_ID, histogram=False)
+    mock_scraper.fetch_page.assert_called_once_with(FAKE_URL, None)
+    mock_scraper.extract_text.assert_called_once_with(FAKE_CONTENT)
     mock_whist.build.assert_called_once_with(FAKE_HTML)
-    mock_job.complete.assert_called_once_with(mock_mongo, FAKE_JOB_ID, FAKE_WORD_COUNT)
+    mock_job.complete.assert_called_once_with(
+        mock_mongo,
+        FAKE_JOB_ID,
+        FAKE_WORD_COUNT,
+        {},
+        storage="document",
+        content_hash=FAKE_CONTENT_HASH,
+    )
     mock_job.fail.assert_called_once_with(mock_mongo, FAKE_JOB_ID, err_message)
     mock_channel.basic_ack.assert_called_once_with(delivery_tag=FAKE_DELIVERY_TAG)
     mock_job.create.assert_not_called()
@@ -166,7 +1003,7 @@ def test_consume_fail_mongo_error_on_complete(mocker):
 def test_consume_fail_mongo_error_on_fetch(mocker):
     err_message = "oh no"
 
-    def _raise(_, __):
+    def _raise(_, __, histogram):
         raise pymongo.errors.PyMongoError(err_message)
 
     mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
@@ -182,19 +1019,19 @@ def test_consume_fail_mongo_error_on_fetch(mocker):
     callback = mock_rabbit.consume.call_args.args[0]
     callback(mock_channel, mock_method, None, FAKE_BODY)
 
-    mock_job.fetch.assert_called_once_with(mock_mongo, FAKE_JOB_ID)
+    mock_job.fetch.assert_called_once_with(mock_mongo, FAKE_JOB_ID, histogram=False)
     mock_job.fail.assert_called_once_with(mock_mongo, FAKE_JOB_ID, err_message)
     mock_channel.basic_ack.assert_called_once_with(delivery_tag=FAKE_DELIVERY_TAG)
     mock_job.complete.assert_not_called()
     mock_whist.build.assert_not_called()
-    mock_scraper.scrape_text.assert_not_called()
+    mock_scraper.fetch_page.assert_not_called()
     mock_job.create.assert_not_called()
 
 
 def test_consume_fail_mongo_error_on_fail(mocker):
     err_message = "oh no"
 
-    def _raise(_, __):
+    def _raise(_, __, histogram):
         raise pymongo.errors.PyMongoError(err_message)
 
     mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
@@ -210,12 +1047,12 @@ def test_consume_fail_mongo_error_on_fail(mocker):
     callback = mock_rabbit.consume.call_args.args[0]
     callback(mock_channel, mock_method, None, FAKE_BODY)
 
-    mock_job.fetch.assert_called_once_with(mock_mongo, FAKE_JOB_ID)
+    mock_job.fetch.assert_called_once_with(mock_mongo, FAKE_JOB_ID, histogram=False)
     mock_job.fail.assert_called_once_with(mock_mongo, FAKE_JOB_ID, err_message)
     mock_channel.basic_ack.assert_called_once_with(delivery_tag=FAKE_DELIVERY_TAG)
     mock_job.complete.assert_not_called()
     mock_whist.build.assert_not_called()
-    mock_scraper.scrape_text.assert_not_called()
+    mock_scraper.fetch_page.assert_not_called()
     mock_job.create.assert_not_called()
 
 
@@ -223,13 +1060,13 @@ def test_consume_fail_scraper_error(mocker):
 
     err_message = "oh no"
 
-    def _raise(_):
+    def _raise(_, __):
         raise RuntimeError(err_message)
 
     mock_rabbit, mock_mongo, mock_job, mock_scraper, mock_whist = _make_mocks(mocker)
-    mock_scraper.scrape_text.side_effect = _raise
+    mock_scraper.fetch_page.side_effect = _raise
     mock_job.fetch.return_value = {"job_id": FAKE_JOB_ID, "url": FAKE_URL}
-    mock_job.fail.return_value = {}
+    mock_job.fail.return_value = {"status": "FAIL"}
     mock_channel = mocker.MagicMock()
     mock_method = mocker.MagicMock()
     mock_method.delivery_tag = FAKE_DELIVERY_TAG
@@ -240,9 +1077,12 @@ def test_consume_fail_scraper_error(mocker):
     callback = mock_rabbit.consume.call_args.args[0]
     callback(mock_channel, mock_method, None, FAKE_BODY)
 
-    mock_job.fetch.assert_called_once_with(mock_mongo, FAKE_JOB_ID)
-    mock_scraper.scrape_text.assert_called_once_with(FAKE_URL)
+    mock_job.fetch.assert_called_once_with(mock_mongo, FAKE_JOB_ID, histogram=False)
+    mock_scraper.fetch_page.assert_called_once_with(FAKE_URL, None)
     mock_job.fail.assert_called_once_with(mock_mongo, FAKE_JOB_ID, err_message)
+    mock_rabbit.notify.assert_called_once_with(
+        {"job_id": FAKE_JOB_ID, "status": "FAIL"}
+    )
     mock_channel.basic_ack.assert_called_once_with(delivery_tag=FAKE_DELIVERY_TAG)
     mock_whist.build.assert_not_called()
     mock_job.complete.assert_not_called()
@@ -254,22 +1094,80 @@ def _patch(mocker, key):
 
 
 def _make_mongo_raiser(error_message):
-    def _raise(_, __, ___):
+    def _raise(*_, **__):
         raise pymongo.errors.PyMongoError(error_message)
 
     return _raise
 
 
+def _setup_pipeline_test(mocker, mock_rabbit, body=None):
+    def _deliver(callback, prefetch_count):
+        mock_method = mocker.MagicMock()
+        mock_method.delivery_tag = FAKE_DELIVERY_TAG
+        callback(mock_channel, mock_method, None, body or FAKE_BODY)
+
+    mocker.patch("worker.consumer.WORKER_MODE", "pipeline")
+    mocker.patch("worker.consumer.WORKER_METRICS_INTERVAL", 0)
+    mocker.patch(
+        "worker.consumer.ProcessPoolExecutor",
+        lambda n, mp_context: ThreadPoolExecutor(n),
+    )
+    mock_channel = mocker.MagicMock()
+    mock_rabbit.consume.side_effect = _deliver
+    return _patch(mocker, "analysis"), mock_channel
+
+
+class _DeferredExecutor:
+    def __init__(self, *_, **__):
+        self._submitted = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        for fn, future in self._submitted:
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                future.set_exception(e)
+
+    def submit(self, fn):
+        future = Future()
+        self._submitted.append((fn, future))
+        return future
+
+
+def _settlers(mocker):
+    return [mocker.MagicMock(), mocker.MagicMock()]
+
+
+def _assert_acked_threadsafe(mock_channel):
+    mock_channel.connection.add_callback_threadsafe.assert_called_once()
+    mock_channel.connection.add_callback_threadsafe.call_args.args[0]()
+    mock_channel.basic_ack.assert_called_once_with(delivery_tag=FAKE_DELIVERY_TAG)
+
+
 def _make_mocks(mocker):
-    return [
+    mocks = [
         _patch(mocker, k)
         for k in ["rabbit_client", "mongo_client", "Job", "scraper", "word_histogram"]
     ]
+    mocks[2].find_validated.return_value = None
+    mocks[2].find_shared.return_value = None
+    mocks[2].JobStatus = JobStatus
+    mocks[3].fetch_page.return_value = Page(FAKE_CONTENT, {})
+    mocks[4].fingerprint.return_value = FAKE_CONTENT_HASH
+    return mocks
 
 
 FAKE_HTML = "<tag></tag>"
+FAKE_CONTENT = b"<tag></tag>"
+FAKE_VALIDATORS = {"etag": '"v1"', "last_modified": "Wed, 21 Oct 2015 07:28:00 GMT"}
+FAKE_PREVIOUS_JOB_ID = "previous"
 FAKE_WORD_COUNT = {"hello": 1}
+FAKE_CONTENT_HASH = "ab12"
 FAKE_JOB_ID = "something"
 FAKE_URL = "https://example.com"
 FAKE_DELIVERY_TAG = "something"
 FAKE_BODY = '{"job_id": "' + FAKE_JOB_ID + '"}'
+FAKE_BODY_WITH_URL = '{"job_id": "' + FAKE_JOB_ID + '", "url": "' + FAKE_URL + '"}'
@@ -0,0 +1,165 @@
+from common import metrics
+from worker.host_scheduler import HostScheduler
+import threading
+
+
+def test_get_round_robins_across_hosts():
+    scheduler = _scheduler(concurrency=10)
+    for item in [("a", 1), ("a", 2), ("b", 1), ("a", 3), ("b", 2)]:
+        scheduler.put(item)
+
+    assert [scheduler.get() for _ in range(5)] == [
+        ("a", 1),
+        ("b", 1),
+        ("a", 2),
+        ("b", 2),
+        ("a", 3),
+    ]
+
+
+def test_get_skips_hosts_at_their_concurrency_limit():
+    scheduler = _scheduler(concurrency=1)
+    for item in [("a", 1), ("a", 2), ("b", 1)]:
+        scheduler.put(item)
+
+    assert scheduler.get() == ("a", 1)
+    assert scheduler.get() == ("b", 1)
+    assert scheduler.qsize() == 1
+
+    scheduler.release("a", 0.1)
+    assert scheduler.get() == ("a", 2)
+
+
+def test_get_blocks_until_a_slot_is_released():
+    scheduler = _scheduler(concurrency=1)
+    scheduler.put(("a", 1))
+    scheduler.put(("a", 2))
+    scheduler.get()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(scheduler.get()))
+    waiter.start()
+
+    waiter.join(0.05)
+    assert got == []
+    scheduler.release("a", 0.1)
+    waiter.join(1)
+    assert got == [("a", 2)]
+
+
+def test_slow_hosts_are_throttled_until_they_recover():
+    metrics.reset()
+    scheduler = _scheduler(concurrency=2, slow_concurrency=1, slow_latency=1)
+    for i in range(4):
+        scheduler.put(("slow", i))
+    scheduler.get()
+    scheduler.release("slow", 10)
+
+    assert scheduler.is_slow("slow")
+    assert metrics.snapshot()["gauges"]["hosts.slow"] == 1
+    assert scheduler.get() == ("slow", 1)
+    assert scheduler._next() is None
+
+    for _ in range(30):
+        scheduler.release("slow", 0.01)
+        scheduler._in_flight["slow"] = 1
+    assert not scheduler.is_slow("slow")
+    assert scheduler.get() == ("slow", 2)
+
+
+def test_fast_hosts_keep_flowing_past_a_slow_host():
+    scheduler = _scheduler(concurrency=2, slow_concurrency=1, slow_latency=1)
+    scheduler.put(("slow", 0))
+    scheduler.get()
+    scheduler.release("slow", 30)
+    scheduler.put(("slow", 1))
+    scheduler.put(("slow", 2))
+    for i in range(3):
+        scheduler.put(("fast", i))
+
+    order = [scheduler.get() for _ in range(3)]
+
+    assert order == [("slow", 1), ("fast", 0), ("fast", 1)]
+    assert scheduler._next() is None
+
+
+def test_unkeyed_items_wait_for_eligible_host_items():
+    scheduler = _scheduler(concurrency=1)
+    scheduler.put("stop")
+    scheduler.put(("a", 1))
+    scheduler.put(("a", 2))
+    scheduler.put("stop")
+
+    assert [scheduler.get() for _ in range(3)] == [("a", 1), "stop", "stop"]
+    scheduler.release("a")
+    assert scheduler.get() == ("a", 2)
+
+
+def test_release_without_latency_keeps_history_unchanged():
+    scheduler = _scheduler(concurrency=1, slow_latency=1)
+    scheduler.put(("a", 1))
+    scheduler.get()
+    scheduler.release("a")
+    assert scheduler._latency == {}
+
+
+def test_is_backlogged():
+    scheduler = _scheduler(concurrency=1, max_queued=2)
+    scheduler.put(("a", 1))
+    assert not scheduler.is_backlogged("a")
+    scheduler.put(("a", 2))
+    assert scheduler.is_backlogged("a")
+    assert not scheduler.is_backlogged("b")
+    assert not _scheduler(concurrency=1, max_queued=0).is_backlogged("a")
+
+
+def test_latency_history_is_bounded():
+    scheduler = _scheduler(concurrency=1, slow_latency=1, max_hosts=2)
+    for host in ["a", "b", "c"]:
+        scheduler.put((host, 0))
+        scheduler.get()
+        scheduler.release(host, 10)
+
+    assert not scheduler.is_slow("a")
+    assert scheduler.is_slow("b") and scheduler.is_slow("c")
+
+
+def test_get_weights_lanes_and_keeps_host_limits_across_lanes():
+    scheduler = HostScheduler(
+        lambda item: item[0],
+        concurrency=1,
+        slow_concurrency=1,
+        slow_latency=0,
+        max_queued=2,
+        lane=lambda item: item[1],
+        weights={"high": 2, "low": 1},
+    )
+    for i in range(3):
+        scheduler.put((f"l{i}", "low", i))
+        scheduler.put((f"h{i}", "high", i))
+    scheduler.put(("h0", "low", 3))
+
+    assert [scheduler.get()[1] for _ in range(6)] == [
+        "high",
+        "low",
+        "high",
+        "high",
+        "low",
+        "low",
+    ]
+    assert scheduler.is_backlogged("h0") is False
+    assert scheduler._next() is None
+    scheduler.release("h0")
+    assert scheduler.get() == ("h0", "low", 3)
+
+
+def _scheduler(
+    concurrency, slow_concurrency=1, slow_latency=0, max_queued=0, max_hosts=10000
+):
+    return HostScheduler(
+        lambda item: item[0] if isinstance(item, tuple) else None,
+        concurrency=concurrency,
+        slow_concurrency=slow_concurrency,
+        slow_latency=slow_latency,
+        max_queued=max_queued,
+        max_hosts=max_hosts,
+    )
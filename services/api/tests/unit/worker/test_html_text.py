@@ -0,0 +1,115 @@
+from bs4 import BeautifulSoup
+from worker.html_text import (
+    ENGINES,
+    TextExtractor,
+    extractor,
+    sniff_encoding,
+    stripped_strings,
+)
+import codecs
+import pytest
+
+CORPUS = [
+    "<p>plain text</p>",
+    "<html><head><title>t</title><style>p { x: y }</style></head><body>b</body>",
+    "<script>var a = '<p>no</p>';</script>after",
+    "<template><p>hidden <b>deeply</b></p></template>shown",
+    "<ruby>kan<rt>ji</rt><rp>(</rp></ruby>",
+    "a<!-- comment -->b<?pi instruction?>c<!DOCTYPE html>d",
+    "<![CDATA[raw <data>]]>tail",
+    "caf&eacute; &amp; cr&#232;me&nbsp;br&#xFB;l&eacute;e",
+    "<p>split<b>across</b>tags</p><br/>void<img src=x>img",
+    "<div>unclosed <span>tags",
+    "</p>stray end tags</div>",
+    "  \n  <p>  padded   words  </p>  \n",
+    "<!DOCTYPE html><html><body><p>x</p></body></html>",
+    "<p>a<script>b</script >c</p><style>d</style>e<style>f",
+    "<svg><style>x</style><text>y</text></svg><noscript>n</noscript>",
+    "<p>1 < 2 > 0</p><title>x &lt;y&gt;</title>",
+    "<textarea>a<b>c</textarea><p>x</P>y<br>z",
+    "<table><tr><td>cell</td><td>other</td></tr></table>",
+    "<p>\u00e9\u4e2d \U0001f600 \u0130stanbul</p>",
+    '<?xml version="1.0" encoding="UTF-8"?><html><body><p>hello</p></body></html>',
+    "<p>one two</p>\x00<p>three</p>",
+]
+DIVERGENCES = {
+    ("lxml", "<p>one two</p>\x00<p>three</p>"),
+    ("lxml", "<![CDATA[raw <data>]]>tail"),
+    ("lxml", "a<!-- comment -->b<?pi instruction?>c<!DOCTYPE html>d"),
+}
+
+
+@pytest.mark.parametrize("html", CORPUS)
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+def test_engines_match_beautifulsoup_strings(html, engine, chunk_size):
+    if (engine, html) in DIVERGENCES:
+        pytest.skip(f"{engine} intentionally diverges on this input")
+    expected = list(BeautifulSoup(html, "html.parser").stripped_strings)
+    assert _extract(html, engine, chunk_size) == expected
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_stripped_strings_decodes_bytes(engine):
+    content = '<meta charset="cp1252"><p>\u201ccaf\u00e9\u201d</p>'.encode("cp1252")
+    assert stripped_strings(content, engine) == ["\u201ccaf\u00e9\u201d"]
+
+
+def test_lxml_treats_cdata_as_text():
+    assert stripped_strings(b"<p><![CDATA[x]]></p>", "lxml") == ["<![CDATA[x]]>"]
+
+
+def test_lxml_replaces_nul_instead_of_truncating():
+    content = b"<p>one two</p>\x00<p>three</p>"
+    assert stripped_strings(content, "lxml") == ["one two", "\ufffd", "three"]
+
+
+def test_extractor_rejects_unknown_engine():
+    with pytest.raises(ValueError):
+        extractor("regex", print, print)
+
+
+def test_extractor_reports_breaks_between_tags():
+    texts, breaks = [], []
+    extractor = TextExtractor(texts.append, lambda: breaks.append(len(texts)))
+    extractor.feed("a<b>b</b>c")
+    extractor.close()
+    assert texts == ["a", "b", "c"]
+    assert breaks == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "head,declared,expected",
+    [
+        (codecs.BOM_UTF8 + b"<p>", "latin-1", "utf-8-sig"),
+        (codecs.BOM_UTF16_LE + b"<\x00", None, "utf-16"),
+        (b"<p>", "ISO-8859-1", "iso8859-1"),
+        (b'<meta charset="windows-1252">', None, "cp1252"),
+        (
+            b'<meta http-equiv="Content-Type" content="text/html; charset=koi8-r">',
+            None,
+            "koi8-r",
+        ),
+        (b'<meta charset="not-a-codec">', None, "utf-8"),
+        (b"<p>", "not-a-codec", "utf-8"),
+        (b"<p>", None, "utf-8"),
+    ],
+)
+def test_sniff_encoding(head, declared, expected):
+    assert sniff_encoding(head, declared) == expected
+
+
+def _extract(html, engine, chunk_size):
+    strings, current = [], []
+
+    def on_break():
+        if text := "".join(current).strip():
+            strings.append(text)
+        current.clear()
+
+    parser = extractor(engine, current.append, on_break)
+    for i in range(0, len(html), chunk_size):
+        parser.feed(html[i : i + chunk_size])
+    parser.close()
+    on_break()
+    return strings
@@ -0,0 +1,55 @@
+from worker.lane_scheduler import LaneScheduler, WeightedRoundRobin
+import threading
+
+
+def test_weighted_round_robin_interleaves_by_weight():
+    rotation = WeightedRoundRobin({"a": 3, "b": 1})
+    picks = []
+    for _ in range(8):
+        lane = rotation.ranked(["a", "b"])[0]
+        rotation.charge(lane, ["a", "b"])
+        picks.append(lane)
+
+    assert picks == ["a", "a", "b", "a", "a", "a", "b", "a"]
+
+
+def test_weighted_round_robin_defaults_unknown_lanes_to_weight_one():
+    rotation = WeightedRoundRobin({"a": 0})
+    assert rotation.weight("a") == 1 and rotation.weight("x") == 1
+
+
+def test_get_favours_heavier_lanes_without_starving_lighter_ones():
+    scheduler = LaneScheduler(lambda item: item[0], {"high": 2, "low": 1})
+    for i in range(4):
+        scheduler.put(("low", i))
+    for i in range(2):
+        scheduler.put(("high", i))
+
+    assert [scheduler.get() for _ in range(6)] == [
+        ("high", 0),
+        ("low", 0),
+        ("high", 1),
+        ("low", 1),
+        ("low", 2),
+        ("low", 3),
+    ]
+    assert scheduler.qsize() == 0
+
+
+def test_get_accepts_unknown_lanes():
+    scheduler = LaneScheduler(lambda item: item[0], {"high": 2})
+    scheduler.put(("other", 1))
+    assert scheduler.get() == ("other", 1)
+
+
+def test_get_blocks_until_an_item_arrives():
+    scheduler = LaneScheduler(lambda item: item[0], {"high": 1})
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(scheduler.get()))
+    waiter.start()
+
+    waiter.join(0.05)
+    assert got == []
+    scheduler.put(("high", 1))
+    waiter.join(1)
+    assert got == [("high", 1)]
@@ -0,0 +1,38 @@
+from common import metrics
+from urllib.error import HTTPError
+from urllib.request import urlopen
+from worker import metrics_server
+import json
+import pytest
+
+
+def test_serves_metrics_snapshot():
+    metrics.reset()
+    metrics.observe("lanes.high.wait_seconds", 2.0)
+    server = metrics_server.serve(0, "127.0.0.1")
+    try:
+        with urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as r:
+            body = json.loads(r.read())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert body["success"] is True
+    assert body["message"] == "Fetched Metrics"
+    assert body["data"]["percentiles"]["lanes.high.wait_seconds"] == {
+        "p50": 2.0,
+        "p90": 2.0,
+        "p99": 2.0,
+    }
+
+
+def test_rejects_other_paths():
+    server = metrics_server.serve(0, "127.0.0.1")
+    try:
+        with pytest.raises(HTTPError) as error:
+            urlopen(f"http://127.0.0.1:{server.server_address[1]}/health")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert error.value.code == 404
@@ -0,0 +1,124 @@
+from common import metrics
+from worker.pipeline import Pipeline, Stage
+import threading
+
+
+def test_pipeline_runs_items_through_every_stage():
+    results = []
+    pipeline = Pipeline(
+        [
+            Stage("double", lambda x: x * 2, 3),
+            Stage("increment", lambda x: x + 1, 2),
+            Stage("collect", results.append, 1),
+        ],
+        queue_size=1,
+        report_interval=0,
+    )
+
+    pipeline.start()
+    for i in range(20):
+        pipeline.submit(i)
+    pipeline.stop()
+
+    assert sorted(results) == [i * 2 + 1 for i in range(20)]
+
+
+def test_pipeline_drops_items_when_a_stage_returns_none():
+    results = []
+    pipeline = Pipeline(
+        [
+            Stage("filter", lambda x: x if x % 2 else None, 1),
+            Stage("collect", results.append, 1),
+        ],
+        queue_size=2,
+        report_interval=0,
+    )
+
+    pipeline.start()
+    for i in range(6):
+        pipeline.submit(i)
+    pipeline.stop()
+
+    assert sorted(results) == [1, 3, 5]
+
+
+def test_pipeline_survives_handler_errors():
+    def _explode(x):
+        if x == 1:
+            raise ValueError("boom")
+        return x
+
+    results = []
+    pipeline = Pipeline(
+        [Stage("explode", _explode, 1), Stage("collect", results.append, 1)],
+        queue_size=2,
+        report_interval=0,
+    )
+
+    pipeline.start()
+    for i in range(3):
+        pipeline.submit(i)
+    pipeline.stop()
+
+    assert sorted(results) == [0, 2]
+
+
+def test_pipeline_hands_failed_items_to_error_hook():
+    def _explode(x):
+        if x == 1:
+            raise ValueError("boom")
+        return x
+
+    failed = []
+    pipeline = Pipeline(
+        [Stage("explode", _explode, 1), Stage("collect", lambda x: x, 1)],
+        queue_size=2,
+        report_interval=0,
+        on_error=lambda item, e: failed.append((item, str(e))),
+    )
+
+    pipeline.start()
+    for i in range(3):
+        pipeline.submit(i)
+    pipeline.stop()
+
+    assert failed == [(1, "boom")]
+
+
+def test_pipeline_bounds_queues_between_stages():
+    release, results = threading.Event(), []
+    pipeline = Pipeline(
+        [
+            Stage("produce", lambda x: x, 1),
+            Stage("consume", lambda x: release.wait() and results.append(x), 1),
+        ],
+        queue_size=1,
+        report_interval=0,
+    )
+
+    pipeline.start()
+    for i in range(4):
+        pipeline.submit(i)
+    while pipeline._queues[0].qsize() > 1:
+        pass
+    pipeline.report()
+    depths = metrics.snapshot()["gauges"]
+    release.set()
+    pipeline.stop()
+
+    assert depths["pipeline.consume.queue_depth"] <= 1
+    assert sorted(results) == [0, 1, 2, 3]
+
+
+def test_pipeline_reports_utilization(mocker):
+    metrics.reset()
+    clock = mocker.patch("worker.pipeline.time.perf_counter", return_value=0.0)
+    pipeline = Pipeline([Stage("work", lambda x: x, 2)], 1, report_interval=0)
+    pipeline._busy = [1.0]
+    clock.return_value = 2.0
+
+    pipeline.report()
+
+    gauges = metrics.snapshot()["gauges"]
+    assert gauges["pipeline.work.utilization"] == 0.25
+    assert gauges["pipeline.work.queue_depth"] == 0
@@ -0,0 +1,89 @@
+from common import metrics
+from worker.result_sink import ResultSink
+import threading
+
+
+def test_sink_flushes_full_batches():
+    batches = []
+    flushed = threading.Event()
+
+    def _flush(batch):
+        batches.append(batch)
+        flushed.set()
+
+    sink = ResultSink(_flush, max_batch=3, max_delay=60)
+    sink.start()
+    for i in range(3):
+        sink.add(i)
+
+    assert flushed.wait(5)
+    sink.stop()
+    assert batches == [[0, 1, 2]]
+
+
+def test_sink_flushes_partial_batches_after_delay():
+    flushed = threading.Event()
+    batches = []
+
+    def _flush(batch):
+        batches.append(batch)
+        flushed.set()
+
+    sink = ResultSink(_flush, max_batch=100, max_delay=0.01)
+    sink.start()
+    sink.add("a")
+
+    assert flushed.wait(5)
+    sink.stop()
+    assert batches == [["a"]]
+
+
+def test_sink_splits_backlog_into_batches_and_drains_on_stop():
+    batches = []
+    release = threading.Event()
+
+    def _flush(batch):
+        release.wait(5)
+        batches.append(batch)
+
+    sink = ResultSink(_flush, max_batch=2, max_delay=60)
+    sink.start()
+    for i in range(5):
+        sink.add(i)
+    release.set()
+    sink.stop()
+
+    assert [item for batch in batches for item in batch] == [0, 1, 2, 3, 4]
+    assert all(len(batch) <= 2 for batch in batches)
+
+
+def test_sink_restarts_delay_for_items_left_after_a_full_batch(mocker):
+    mock_clock = mocker.patch("worker.result_sink.time.monotonic", return_value=100)
+    sink = ResultSink(lambda _: None, max_batch=2, max_delay=1)
+    for i in range(3):
+        sink.add(i)
+    mock_clock.return_value = 200
+
+    assert sink._next_batch() == [0, 1]
+    assert sink._oldest == 200
+    assert sink._wait_time() == 1
+
+
+def test_sink_survives_flush_errors():
+    metrics.reset()
+    batches = []
+
+    def _flush(batch):
+        batches.append(batch)
+        if len(batches) == 1:
+            raise RuntimeError("boom")
+
+    sink = ResultSink(_flush, max_batch=1, max_delay=60)
+    sink.start()
+    sink.add("a")
+    sink.add("b")
+    sink.stop()
+
+    assert batches == [["a"], ["b"]]
+    assert metrics.snapshot()["counters"]["results.batches"] == 2
+    assert metrics.snapshot()["counters"]["results.written"] == 2
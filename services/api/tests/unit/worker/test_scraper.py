@@ -1,16 +1,18 @@
-from worker.scraper import scrape_text
+from worker.scraper import extract_text, fetch_page, stream
 import pytest
 
 
-def test_scrape_text_raises_for_non_200_status(mocker):
+def test_fetch_page_raises_for_non_200_status(mocker):
     mock_requests = _patch_requests(mocker, 505, "")
     with pytest.raises(RuntimeError):
         url = "https://im-gonna-raise.com"
-        scrape_text(url)
-        mock_requests.get.assert_called_once_with(url, allow_redirects=True)
+        fetch_page(url)
+        mock_requests.get.assert_called_once_with(
+            url, allow_redirects=True, stream=True, timeout=FAKE_TIMEOUT
+        )
 
 
-def test_scrape_text_returns_joined_text(mocker):
+def test_fetch_page_content_extracts_to_joined_text(mocker):
     def _make_fake_html(title, h1, p, a, should_be_ignored):
         return f"""
             <html>
@@ -27,14 +29,133 @@ def test_scrape_text_returns_joined_text(mocker):
     mock_requests = _patch_requests(
         mocker, 200, _make_fake_html(title, h1, p, a, "should be ignored")
     )
-    actual = scrape_text(url)
-    mock_requests.get.assert_called_once_with(url, allow_redirects=True)
+    actual = extract_text(fetch_page(url).content)
+    mock_requests.get.assert_called_once_with(
+        url, allow_redirects=True, stream=True, timeout=FAKE_TIMEOUT
+    )
     assert expected == actual
 
 
-def _patch_requests(mocker, status_code, content):
-    mock_requests = mocker.patch("worker.scraper.requests")
-    mock_requests.get.return_value = mocker.MagicMock(
-        status_code=status_code, content=content
+def test_extract_text():
+    assert extract_text(b"<p>a <b>b</b></p><style>c</style>") == "a b"
+
+
+def test_fetch_page_raises_when_body_exceeds_limit(mocker):
+    mocker.patch("worker.scraper.SCRAPER_MAX_BODY_BYTES", 4)
+    _patch_requests(mocker, 200, b"<p>hello</p>", chunk_size=2)
+    with pytest.raises(RuntimeError, match="exceeds 4 bytes"):
+        fetch_page("https://a.b")
+
+
+def test_fetch_page_rejects_oversized_content_length_without_reading(mocker):
+    mocker.patch("worker.scraper.SCRAPER_MAX_BODY_BYTES", 4)
+    mock_requests = _patch_requests(mocker, 200, b"", headers={"content-length": "5"})
+    with pytest.raises(RuntimeError):
+        fetch_page("https://a.b")
+    mock_requests.get.return_value.iter_content.assert_not_called()
+
+
+def test_stream_decodes_chunks_incrementally(mocker):
+    content = "<p>caf\u00e9 na\u00efve</p>".encode("utf-8")
+    _patch_requests(mocker, 200, content, chunk_size=1)
+    assert "".join(stream("https://a.b").chunks) == "<p>caf\u00e9 na\u00efve</p>"
+
+
+def test_stream_uses_declared_charset(mocker):
+    content = "<p>caf\u00e9</p>".encode("latin-1")
+    headers = {"content-type": "text/html; charset=ISO-8859-1"}
+    _patch_requests(mocker, 200, content, headers=headers)
+    assert "".join(stream("https://a.b").chunks) == "<p>caf\u00e9</p>"
+
+
+def test_stream_sniffs_meta_charset(mocker):
+    content = '<meta charset="windows-1252"><p>\u201cq\u201d</p>'.encode("cp1252")
+    _patch_requests(mocker, 200, content, chunk_size=3)
+    assert "".join(stream("https://a.b").chunks).endswith("<p>\u201cq\u201d</p>")
+
+
+def test_stream_enforces_body_limit(mocker):
+    mocker.patch("worker.scraper.SCRAPER_MAX_BODY_BYTES", 4)
+    _patch_requests(mocker, 200, b"<p>hello</p>", chunk_size=2)
+    with pytest.raises(RuntimeError):
+        list(stream("https://a.b").chunks)
+
+
+def test_stream_raises_for_non_200_status(mocker):
+    mock_requests = _patch_requests(mocker, 404, b"")
+    with pytest.raises(RuntimeError):
+        stream("https://a.b")
+    mock_requests.get.return_value.close.assert_called_once()
+
+
+def test_fetch_page_returns_content_and_validators(mocker):
+    headers = {"ETag": '"v2"', "Last-Modified": FAKE_LAST_MODIFIED}
+    mock_requests = _patch_requests(mocker, 200, b"<p>hi</p>", headers=headers)
+
+    page = fetch_page("https://a.b")
+
+    assert page.content == b"<p>hi</p>"
+    assert page.validators == {"etag": '"v2"', "last_modified": FAKE_LAST_MODIFIED}
+    assert "headers" not in mock_requests.get.call_args.kwargs
+
+
+def test_fetch_page_sends_conditional_headers(mocker):
+    validators = {"etag": '"v1"', "last_modified": FAKE_LAST_MODIFIED}
+    mock_requests = _patch_requests(mocker, 304, b"", headers={"ETag": '"v1"'})
+
+    page = fetch_page("https://a.b", validators)
+
+    mock_requests.get.assert_called_once_with(
+        "https://a.b",
+        allow_redirects=True,
+        stream=True,
+        timeout=FAKE_TIMEOUT,
+        headers={"If-None-Match": '"v1"', "If-Modified-Since": FAKE_LAST_MODIFIED},
     )
+    assert page.content is None
+    assert page.validators == validators
+    mock_requests.get.return_value.iter_content.assert_not_called()
+
+
+def test_fetch_page_rejects_unsolicited_not_modified(mocker):
+    _patch_requests(mocker, 304, b"")
+    with pytest.raises(RuntimeError):
+        fetch_page("https://a.b")
+
+
+def test_stream_returns_no_chunks_when_not_modified(mocker):
+    validators = {"etag": '"v1"'}
+    mock_requests = _patch_requests(mocker, 304, b"", headers={"ETag": '"v2"'})
+
+    result = stream("https://a.b", validators)
+
+    assert result.chunks is None
+    assert result.validators == {"etag": '"v2"'}
+    mock_requests.get.return_value.close.assert_called_once()
+
+
+def test_fetch_page_gives_up_after_total_timeout(mocker):
+    mocker.patch("worker.scraper.SCRAPER_TOTAL_TIMEOUT", 10)
+    mocker.patch("worker.scraper.time.monotonic", side_effect=[0, 5, 11])
+    _patch_requests(mocker, 200, b"<p>hello</p>", chunk_size=4)
+    with pytest.raises(RuntimeError, match="longer than 10s"):
+        fetch_page("https://a.b")
+
+
+def _patch_requests(mocker, status_code, content, chunk_size=None, headers=None):
+    def _iter_content(size):
+        step = chunk_size or max(len(content), 1)
+        return iter([content[i : i + step] for i in range(0, len(content), step)])
+
+    if isinstance(content, str):
+        content = content.encode()
+    mock_requests = mocker.patch("worker.scraper.session")
+    mock_response = mocker.MagicMock(status_code=status_code, headers=headers or {})
+    mock_response.__enter__.return_value = mock_response
+    mock_response.iter_content.side_effect = _iter_content
+    mock_requests.get.return_value = mock_response
     return mock_requests
+
+
+FAKE_TIMEOUT = (5.0, 30.0)
+FAKE_LAST_MODIFIED = "Wed, 21 Oct 2015 07:28:00 GMT"
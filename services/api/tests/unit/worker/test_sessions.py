@@ -0,0 +1,79 @@
+from common import metrics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from worker import sessions
+import pytest
+import threading
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"<p>hello</p>"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "session=secret; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_reuses_connections_per_host(server):
+    metrics.reset()
+    session = sessions.create_session(pool_hosts=2, pool_size=2)
+
+    for path in ["/a", "/b", "/c"]:
+        assert session.get(server + path, timeout=5).content == b"<p>hello</p>"
+
+    counters = metrics.snapshot()["counters"]
+    gauges = metrics.snapshot()["gauges"]
+    assert counters["scraper.127.0.0.1.requests"] == 3
+    assert counters["scraper.127.0.0.1.connections"] == 1
+    assert gauges["scraper.127.0.0.1.reuse_ratio"] == pytest.approx(2 / 3)
+
+
+def test_session_drops_metrics_of_evicted_hosts(server):
+    metrics.reset()
+    session = sessions.create_session(pool_hosts=1, pool_size=1)
+
+    session.get(server + "/a", timeout=5)
+    session.get(server.replace("127.0.0.1", "localhost") + "/b", timeout=5)
+
+    counters = metrics.snapshot()["counters"]
+    assert "scraper.127.0.0.1.requests" not in counters
+    assert counters["scraper.localhost.requests"] == 1
+
+
+def test_session_keeps_no_cookies_between_fetches(server):
+    session = sessions.create_session(pool_hosts=1, pool_size=1)
+
+    first = session.get(server + "/a", timeout=5)
+    second = session.get(server + "/b", timeout=5)
+
+    assert first.headers["Set-Cookie"] == "session=secret; Path=/"
+    assert len(session.cookies) == 0
+    assert "Cookie" not in second.request.headers
+
+
+def test_session_advertises_transparent_decoding():
+    session = sessions.create_session(pool_hosts=1, pool_size=1)
+    assert "gzip" in session.headers["Accept-Encoding"]
+    assert "br" in session.headers["Accept-Encoding"]
+
+
+def test_session_bounds_pools():
+    session = sessions.create_session(pool_hosts=3, pool_size=4)
+    adapter = session.get_adapter("https://example.com")
+    assert adapter.poolmanager.pools._maxsize == 3
+    assert adapter.poolmanager.connection_pool_kw["maxsize"] == 4
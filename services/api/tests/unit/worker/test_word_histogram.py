@@ -1,4 +1,17 @@
-from worker.word_histogram import build
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from hypothesis import given, settings, strategies as st
+from worker.word_histogram import (
+    WORDS,
+    WordCounter,
+    build,
+    build_parallel,
+    fingerprint,
+    split,
+)
+import pytest
+
+TEXT = st.text(alphabet=st.sampled_from("aZ9_' \t\n.,-éΣσςΑß\u0130\u00a0"))
 
 
 def test_build_with_empty_string():
@@ -15,3 +28,76 @@ def test_build_with_alphanumerical_string():
 
 def test_build_with_punctuation():
     assert build("hello, backend!") == {"hello": 1, "backend": 1}
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "hello backend backend",
+        "don't stop, it's   the users' n4t3 café",
+        "a'b'c'' ''d e_f __ '",
+        "",
+    ],
+)
+def test_word_counter_matches_build_across_every_split(text):
+    for i in range(len(text) + 1):
+        for j in range(i, len(text) + 1):
+            counter = WordCounter()
+            for piece in (text[:i], text[i:j], text[j:]):
+                counter.feed(piece)
+            assert counter.histogram() == build(text)
+
+
+def test_word_counter_flush_ends_words():
+    counter = WordCounter()
+    counter.feed("hel")
+    counter.flush()
+    counter.feed("lo hel")
+    counter.feed("lo")
+    assert counter.histogram() == {"hel": 1, "lo": 1, "hello": 1}
+
+
+def test_word_counter_keeps_final_sigma_context_across_feeds():
+    counter = WordCounter()
+    counter.feed("ΑΣ.")
+    counter.feed("Β")
+    assert counter.histogram() == build("ΑΣ.Β")
+
+
+@given(TEXT)
+def test_build_matches_word_pattern(text):
+    assert build(text) == dict(Counter(WORDS.findall(text.lower())))
+
+
+@given(st.text())
+def test_build_matches_word_pattern_for_any_text(text):
+    assert build(text) == dict(Counter(WORDS.findall(text.lower())))
+
+
+@given(TEXT, st.integers(min_value=1, max_value=8))
+def test_split_cuts_only_after_whitespace(text, chunk_chars):
+    chunks = split(text, chunk_chars)
+    assert "".join(chunks) == text
+    assert all(chunk[-1].isspace() for chunk in chunks[:-1])
+
+
+@settings(deadline=None)
+@given(TEXT, st.integers(min_value=1, max_value=8))
+def test_build_parallel_matches_build(text, chunk_chars):
+    with ThreadPoolExecutor(2) as executor:
+        assert build_parallel(text, executor, chunk_chars) == build(text)
+
+
+def test_fingerprint_ignores_whitespace_layout():
+    assert fingerprint("hello  backend\n") == fingerprint(" hello backend")
+    assert fingerprint("hello backend") != fingerprint("hellobackend")
+    assert fingerprint("") == fingerprint(" \t ")
+
+
+@given(TEXT, st.integers(min_value=0, max_value=20))
+def test_word_counter_fingerprint_matches_joined_pieces(text, cut):
+    counter = WordCounter()
+    counter.feed(text[:cut])
+    counter.flush()
+    counter.feed(text[cut:])
+    assert counter.fingerprint() == fingerprint(text[:cut] + " " + text[cut:])
@@ -0,0 +1,157 @@
+import asyncio
+import math
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from common import metrics
+
+
+class _BackpressureState:
+    def __init__(
+        self,
+        high_watermark: int,
+        low_watermark: int,
+        interval: float,
+        max_retry_after: float,
+    ):
+        self._high_watermark = high_watermark
+        self._low_watermark = min(low_watermark, high_watermark)
+        self._interval = interval
+        self._max_retry_after = max_retry_after
+        self._depth = 0
+        self._rate = 0.0
+        self._shedding = False
+
+    @property
+    def enabled(self) -> bool:
+        return self._high_watermark > 0
+
+    def retry_after(self) -> Optional[int]:
+        if not self.enabled or not self._shedding:
+            return None
+        backlog = max(self._depth - self._low_watermark, 1)
+        seconds = backlog / self._rate if self._rate > 0 else self._max_retry_after
+        return math.ceil(min(max(seconds, 1), self._max_retry_after))
+
+    def _record(self, depth: int, rate: float) -> None:
+        if depth >= self._high_watermark:
+            shedding = True
+        elif depth <= self._low_watermark:
+            shedding = False
+        else:
+            shedding = self._shedding
+        self._depth, self._rate, self._shedding = depth, rate, shedding
+        metrics.set_gauge("admission.queue_depth", depth)
+        metrics.set_gauge("admission.drain_rate", rate)
+        metrics.set_gauge("admission.shedding", int(shedding))
+
+
+class Backpressure(_BackpressureState):
+    def __init__(
+        self,
+        queue_depth: Callable[[], int],
+        drain_rate: Callable[[], float],
+        high_watermark: int,
+        low_watermark: int,
+        interval: float,
+        max_retry_after: float,
+    ):
+        super().__init__(high_watermark, low_watermark, interval, max_retry_after)
+        self._queue_depth = queue_depth
+        self._drain_rate = drain_rate
+        self._lock = threading.Lock()
+        self._started_pid: Optional[int] = None
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+        self.refresh()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def refresh(self) -> None:
+        try:
+            depth, rate = self._queue_depth(), self._drain_rate()
+        except Exception as e:
+            print(f"Unable to sample job backlog: {str(e)}", flush=True)
+            return
+        self._record(depth, rate)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self._interval)
+            self.refresh()
+
+
+class AsyncBackpressure(_BackpressureState):
+    def __init__(
+        self,
+        queue_depth: Callable[[], Awaitable[int]],
+        drain_rate: Callable[[], Awaitable[float]],
+        high_watermark: int,
+        low_watermark: int,
+        interval: float,
+        max_retry_after: float,
+    ):
+        super().__init__(high_watermark, low_watermark, interval, max_retry_after)
+        self._queue_depth = queue_depth
+        self._drain_rate = drain_rate
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self.enabled and self._task is None:
+            await self.refresh()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+
+    async def refresh(self) -> None:
+        try:
+            depth, rate = await self._queue_depth(), await self._drain_rate()
+        except Exception as e:
+            print(f"Unable to sample job backlog: {str(e)}", flush=True)
+            return
+        self._record(depth, rate)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            await self.refresh()
+
+
+class TokenBuckets:
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self._rate = rate
+        self._burst = max(burst, 1)
+        self._max_clients = max_clients
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._rate > 0
+
+    def acquire(self, client: str) -> Optional[int]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self._burst, now))
+            tokens = min(self._burst, tokens + (now - updated) * self._rate)
+            admitted = tokens >= 1
+            self._buckets[client] = (tokens - 1 if admitted else tokens, now)
+            if len(self._buckets) > self._max_clients:
+                self._buckets.popitem(last=False)
+        if admitted:
+            return None
+        return math.ceil((1 - tokens) / self._rate)
@@ -0,0 +1,304 @@
+import asyncio
+
+from os import environ as env
+from typing import Any, Optional
+
+from aio_pika.exceptions import AMQPException
+from aiohttp import web
+from bson.errors import BSONError
+from pymongo.errors import PyMongoError
+
+from common.health import AsyncHealthMonitor, HealthStatus
+from common.mongo.async_client import AsyncMongoDBClient
+from common.mongo.models import async_job as AsyncJob
+from common.mongo.models import job as Job
+from common.rabbit import lanes as Lanes
+from common.rabbit.async_client import AsyncRabbitMQClient
+from common import metrics
+from web import serialization, validation
+from web.admission import AsyncBackpressure, TokenBuckets
+from web.completion import AsyncCompletionWaiters
+
+RESULT_CACHE_TTL = float(env.get("RESULT_CACHE_TTL", 0))
+LONG_POLL_MAX_WAIT = float(env.get("LONG_POLL_MAX_WAIT", 30))
+RANKING_PAGE_SIZE = int(env.get("RANKING_PAGE_SIZE", 100))
+MAX_RANKING_PAGE_SIZE = int(env.get("MAX_RANKING_PAGE_SIZE", 10000))
+ADMISSION_HIGH_WATERMARK = int(env.get("ADMISSION_HIGH_WATERMARK", 0))
+ADMISSION_LOW_WATERMARK = int(
+    env.get("ADMISSION_LOW_WATERMARK", ADMISSION_HIGH_WATERMARK // 2)
+)
+ADMISSION_CHECK_INTERVAL = float(env.get("ADMISSION_CHECK_INTERVAL", 1))
+ADMISSION_DRAIN_WINDOW = float(env.get("ADMISSION_DRAIN_WINDOW", 60))
+ADMISSION_MAX_RETRY_AFTER = float(env.get("ADMISSION_MAX_RETRY_AFTER", 300))
+CLIENT_RATE_LIMIT = float(env.get("CLIENT_RATE_LIMIT", 0))
+CLIENT_RATE_BURST = float(env.get("CLIENT_RATE_BURST", 10))
+RESPONSE_COMPRESSION_MIN_BYTES = int(env.get("RESPONSE_COMPRESSION_MIN_BYTES", 1024))
+HEALTH_CHECK_TIMEOUT = float(env.get("HEALTH_CHECK_TIMEOUT", 2))
+HEALTH_CHECK_INTERVAL = float(env.get("HEALTH_CHECK_INTERVAL", 5))
+rabbit_client = AsyncRabbitMQClient(
+    env["RABBIT_HOST"], env["RABBIT_QUEUE"], health_timeout=HEALTH_CHECK_TIMEOUT
+)
+mongo_client = AsyncMongoDBClient(
+    env["MONGO_HOST"], env["MONGO_DB"], health_timeout=HEALTH_CHECK_TIMEOUT
+)
+health_monitor = AsyncHealthMonitor(
+    {
+        "rabbitmq": lambda: rabbit_client.is_healthy(),
+        "mongodb": lambda: mongo_client.is_healthy(),
+    },
+    interval=HEALTH_CHECK_INTERVAL,
+    timeout=HEALTH_CHECK_TIMEOUT,
+)
+completion_waiters = AsyncCompletionWaiters(lambda cb: rabbit_client.subscribe(cb))
+backpressure = AsyncBackpressure(
+    lambda: rabbit_client.queue_depth(),
+    lambda: AsyncJob.drain_rate(mongo_client, ADMISSION_DRAIN_WINDOW),
+    high_watermark=ADMISSION_HIGH_WATERMARK,
+    low_watermark=ADMISSION_LOW_WATERMARK,
+    interval=ADMISSION_CHECK_INTERVAL,
+    max_retry_after=ADMISSION_MAX_RETRY_AFTER,
+)
+client_buckets = TokenBuckets(CLIENT_RATE_LIMIT, CLIENT_RATE_BURST)
+routes = web.RouteTableDef()
+
+
+@routes.get("/health")
+async def health(request: web.Request) -> web.Response:
+    is_healthy = health_monitor.is_healthy
+    healthy_message = "All services are online"
+    unhealthy_message = "At least one service is offline"
+    status = HealthStatus.PASS if is_healthy else HealthStatus.FAIL
+    return _response(
+        is_healthy,
+        "Completed Health Check",
+        {
+            "status": status.name,
+            "info": healthy_message if is_healthy else unhealthy_message,
+            "dependencies": health_monitor.report,
+        },
+        status_code=(200 if is_healthy else 500),
+    )
+
+
+@routes.post("/word-count")
+async def word_count_post(request: web.Request) -> web.Response:
+    def handle_invalid_input() -> web.Response:
+        err = "You must provide a valid `url` in your POST request JSON"
+        return _response(False, err, status_code=400)
+
+    def handle_invalid_cache_options() -> web.Response:
+        err = "`max_age` must be a non-negative number and `force_refresh` a boolean"
+        return _response(False, err, status_code=400)
+
+    def handle_invalid_priority() -> web.Response:
+        err = f"`priority` must be one of {', '.join(Lanes.LANES)}"
+        return _response(False, err, status_code=400)
+
+    async def handle_valid_input(
+        url: str, max_age: float, priority: str
+    ) -> web.Response:
+        async def publish_job() -> web.Response:
+            wc_job = await AsyncJob.create(mongo_client, url)
+            job_id = str(wc_job["job_id"])
+            await rabbit_client.publish(
+                Lanes.job_message(job_id, url, priority), priority
+            )
+            return _response(True, f"Scheduled Job: {job_id}", wc_job, 202)
+
+        def reuse_job(wc_job: dict[str, Any]) -> web.Response:
+            job_id = wc_job["job_id"]
+            return _response(True, f"Cached Job: {job_id}", wc_job, 200)
+
+        async def admit_job() -> web.Response:
+            if retry_after := backpressure.retry_after():
+                return _handle_overloaded(retry_after)
+            return await publish_job()
+
+        try:
+            cached = (
+                await AsyncJob.find_cached(mongo_client, url, max_age)
+                if max_age
+                else None
+            )
+            return reuse_job(cached) if cached else await admit_job()
+        except (AMQPException, BSONError, PyMongoError):
+            return _handle_dependency_error()
+
+    request_content = await _request_content(request)
+    if request_content is None:
+        return _handle_invalid_mime_type()
+
+    url = request_content.get("url", "")
+    max_age = request_content.get("max_age", RESULT_CACHE_TTL)
+    force_refresh = request_content.get("force_refresh", False)
+    priority = request_content.get("priority", Lanes.DEFAULT_LANE)
+    if not validation.is_valid_url(url):
+        return handle_invalid_input()
+    if not validation.is_non_negative_number(max_age) or not isinstance(
+        force_refresh, bool
+    ):
+        return handle_invalid_cache_options()
+    if not validation.is_valid_priority(priority):
+        return handle_invalid_priority()
+    if retry_after := _rate_limit(request):
+        return _handle_rate_limited(retry_after)
+    return await handle_valid_input(url, 0 if force_refresh else max_age, priority)
+
+
+@routes.get("/word-count")
+async def word_count_get(request: web.Request) -> web.Response:
+    async def fetch_job(
+        oid: str, ranking: Optional[dict[str, Any]]
+    ) -> Optional[dict[str, Any]]:
+        return (
+            await AsyncJob.fetch_ranking(mongo_client, oid, **ranking)
+            if ranking
+            else await AsyncJob.fetch(mongo_client, oid)
+        )
+
+    async def fetch_when_finished(
+        oid: str, wait: float, ranking: Optional[dict[str, Any]]
+    ) -> Optional[dict[str, Any]]:
+        with completion_waiters.waiting_for(oid) as finished:
+            word_count_job = await fetch_job(oid, ranking)
+            if word_count_job is None or not is_in_progress(word_count_job):
+                return word_count_job
+            try:
+                await asyncio.wait_for(finished.wait(), wait)
+            except asyncio.TimeoutError:
+                return word_count_job
+            return await fetch_job(oid, ranking)
+
+    def is_in_progress(word_count_job: dict[str, Any]) -> bool:
+        return word_count_job.get("status") == Job.JobStatus.IN_PROGRESS.name
+
+    async def handle_valid_input(
+        oid: str, wait: float, ranking: Optional[dict[str, Any]]
+    ) -> web.Response:
+        word_count_job = (
+            await fetch_when_finished(oid, min(wait, LONG_POLL_MAX_WAIT), ranking)
+            if wait
+            else await fetch_job(oid, ranking)
+        )
+        if word_count_job is None:
+            return handle_invalid_input()
+        return _response(True, f"Fetched Job: {oid}", word_count_job, status_code=200)
+
+    def handle_invalid_input() -> web.Response:
+        err = "You must provide a valid `job_id` in your GET request JSON"
+        return _response(False, err, status_code=400)
+
+    def handle_invalid_wait() -> web.Response:
+        err = "`wait` must be a non-negative number of seconds"
+        return _response(False, err, status_code=400)
+
+    def handle_invalid_ranking() -> web.Response:
+        err = (
+            f"`top_k` must be an integer between 1 and {MAX_RANKING_PAGE_SIZE}, "
+            "`min_count` a non-negative integer, `prefix` a string and `cursor` "
+            "a `next_cursor` from a previous response"
+        )
+        return _response(False, err, status_code=400)
+
+    request_content = await _request_content(request)
+    if request_content is None:
+        return _handle_invalid_mime_type()
+
+    oid = request_content.get("job_id", "")
+    wait = request_content.get("wait", 0)
+    ranking = (
+        validation.ranking_options(
+            request_content, RANKING_PAGE_SIZE, MAX_RANKING_PAGE_SIZE
+        )
+        if validation.is_ranking_request(request_content)
+        else None
+    )
+    if not validation.is_non_negative_number(wait):
+        return handle_invalid_wait()
+    if validation.is_ranking_request(request_content) and ranking is None:
+        return handle_invalid_ranking()
+    try:
+        return (
+            await handle_valid_input(oid, wait, ranking)
+            if Job.is_valid_id(oid)
+            else handle_invalid_input()
+        )
+    except (BSONError, PyMongoError):
+        return _handle_dependency_error()
+
+
+def create_app() -> web.Application:
+    async def start_dependencies(app: web.Application) -> None:
+        try:
+            await rabbit_client.connect()
+        except (AMQPException, ConnectionError) as e:
+            print(f"Unable to connect to rabbitmq: {str(e)}", flush=True)
+        await completion_waiters.start()
+        await health_monitor.start()
+        await backpressure.start()
+
+    async def stop_dependencies(app: web.Application) -> None:
+        await backpressure.stop()
+        await health_monitor.stop()
+        await completion_waiters.stop()
+        await rabbit_client.close()
+
+    app = web.Application()
+    app.add_routes(routes)
+    app.on_startup.append(start_dependencies)
+    app.on_cleanup.append(stop_dependencies)
+    return app
+
+
+async def _request_content(request: web.Request) -> Optional[dict[str, Any]]:
+    if request.content_type != "application/json":
+        return None
+    try:
+        content = await request.json() if request.can_read_body else {}
+    except ValueError:
+        return None
+    return content if isinstance(content, dict) else {}
+
+
+def _handle_invalid_mime_type() -> web.Response:
+    err = "Please make requests using the application/json MIME type"
+    return _response(False, err, status_code=400)
+
+
+def _handle_dependency_error() -> web.Response:
+    err = "Oh dear! Something unexpected occurred..."
+    return _response(False, err, status_code=500)
+
+
+def _rate_limit(request: web.Request) -> Optional[int]:
+    forwarded = request.headers.get("X-Forwarded-For", "").split(",")[-1].strip()
+    return client_buckets.acquire(forwarded or request.remote or "unknown")
+
+
+def _handle_rate_limited(retry_after: int) -> web.Response:
+    metrics.increment("admission.rate_limited")
+    err = "Too many requests, please slow down"
+    return _retry_later(_response(False, err, status_code=429), retry_after)
+
+
+def _handle_overloaded(retry_after: int) -> web.Response:
+    metrics.increment("admission.shed")
+    err = "The job queue is overloaded, please retry later"
+    return _retry_later(_response(False, err, status_code=429), retry_after)
+
+
+def _retry_later(response: web.Response, retry_after: int) -> web.Response:
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def _response(
+    success: bool, message: str, data: dict[str, Any] = {}, status_code: int = 200
+) -> web.Response:
+    body = serialization.encode({"success": success, "message": message, "data": data})
+    response = web.Response(
+        body=body, status=status_code, content_type="application/json"
+    )
+    if len(body) >= RESPONSE_COMPRESSION_MIN_BYTES:
+        response.enable_compression()
+    return response
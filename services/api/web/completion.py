@@ -0,0 +1,100 @@
+import asyncio
+import os
+import threading
+import time
+
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator, Optional
+
+from aio_pika.exceptions import AMQPException
+from pika.exceptions import AMQPError
+
+Subscribe = Callable[[Callable[[dict[str, Any]], None]], None]
+AsyncSubscribe = Callable[[Callable[[dict[str, Any]], None]], Awaitable[None]]
+
+
+class CompletionWaiters:
+    def __init__(self, subscribe: Subscribe, reconnect_delay: float = 1.0):
+        self._subscribe = subscribe
+        self._reconnect_delay = reconnect_delay
+        self._waiters: dict[str, set[threading.Event]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._started_pid: Optional[int] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            self._started_pid = os.getpid()
+        threading.Thread(target=self._listen, daemon=True).start()
+
+    @contextmanager
+    def waiting_for(self, job_id: str) -> Iterator[threading.Event]:
+        done = threading.Event()
+        with self._lock:
+            self._waiters[job_id].add(done)
+        try:
+            yield done
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(job_id, set())
+                waiters.discard(done)
+                if not waiters:
+                    self._waiters.pop(job_id, None)
+
+    def notify(self, event: dict[str, Any]) -> None:
+        with self._lock:
+            waiters = list(self._waiters.get(str(event.get("job_id")), set()))
+        for done in waiters:
+            done.set()
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                self._subscribe(self.notify)
+            except AMQPError as e:
+                print(f"Lost job event subscription: {str(e)}", flush=True)
+            time.sleep(self._reconnect_delay)
+
+
+class AsyncCompletionWaiters:
+    def __init__(self, subscribe: AsyncSubscribe, reconnect_delay: float = 1.0):
+        self._subscribe = subscribe
+        self._reconnect_delay = reconnect_delay
+        self._waiters: dict[str, set[asyncio.Event]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+
+    @contextmanager
+    def waiting_for(self, job_id: str) -> Iterator[asyncio.Event]:
+        done = asyncio.Event()
+        self._waiters[job_id].add(done)
+        try:
+            yield done
+        finally:
+            waiters = self._waiters.get(job_id, set())
+            waiters.discard(done)
+            if not waiters:
+                self._waiters.pop(job_id, None)
+
+    def notify(self, event: dict[str, Any]) -> None:
+        for done in self._waiters.get(str(event.get("job_id")), set()):
+            done.set()
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                await self._subscribe(self.notify)
+                return
+            except (AMQPException, ConnectionError) as e:
+                print(f"Unable to subscribe to job events: {str(e)}", flush=True)
+            await asyncio.sleep(self._reconnect_delay)
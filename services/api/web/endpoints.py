@@ -1,27 +1,76 @@
+from itertools import chain
 from os import environ as env
-from enum import Enum
-from typing import Tuple, Any
-from urllib.parse import urlparse
+from typing import Any, Iterable, Optional, Tuple
 
 from bson.errors import BSONError
-from flask import Flask, jsonify, request, wrappers
+from flask import Flask, request, wrappers
 from pika.exceptions import AMQPError
 from pymongo.errors import PyMongoError
 
+from common import metrics
+from common.health import HealthMonitor, HealthStatus
 from common.mongo.client import MongoDBClient
 from common.mongo.models import job as Job
+from common.rabbit import lanes as Lanes
 from common.rabbit.client import RabbitMQClient
+from web import serialization, validation
+from web.admission import Backpressure, TokenBuckets
+from web.job_cache import CachedBody, JobCache
+from web.completion import CompletionWaiters
 
 server = Flask(__name__)
-HealthStatus = Enum("HealthStatus", "PASS FAIL")
 ResponseAndCode = Tuple[wrappers.Response, int]
-rabbit_client = RabbitMQClient(env["RABBIT_HOST"], env["RABBIT_QUEUE"])
-mongo_client = MongoDBClient(env["MONGO_HOST"], env["MONGO_DB"])
+RESULT_CACHE_TTL = float(env.get("RESULT_CACHE_TTL", 0))
+MAX_BATCH_SIZE = int(env.get("MAX_BATCH_SIZE", 10000))
+MAX_STATUS_BATCH_SIZE = int(env.get("MAX_STATUS_BATCH_SIZE", 1000))
+LONG_POLL_MAX_WAIT = float(env.get("LONG_POLL_MAX_WAIT", 30))
+RANKING_PAGE_SIZE = int(env.get("RANKING_PAGE_SIZE", 100))
+MAX_RANKING_PAGE_SIZE = int(env.get("MAX_RANKING_PAGE_SIZE", 10000))
+JOB_CACHE_MAX_BYTES = int(env.get("JOB_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+JOB_CACHE_MAX_ENTRY_BYTES = int(env.get("JOB_CACHE_MAX_ENTRY_BYTES", 8 * 1024 * 1024))
+ADMISSION_HIGH_WATERMARK = int(env.get("ADMISSION_HIGH_WATERMARK", 0))
+ADMISSION_LOW_WATERMARK = int(
+    env.get("ADMISSION_LOW_WATERMARK", ADMISSION_HIGH_WATERMARK // 2)
+)
+ADMISSION_CHECK_INTERVAL = float(env.get("ADMISSION_CHECK_INTERVAL", 1))
+ADMISSION_DRAIN_WINDOW = float(env.get("ADMISSION_DRAIN_WINDOW", 60))
+ADMISSION_MAX_RETRY_AFTER = float(env.get("ADMISSION_MAX_RETRY_AFTER", 300))
+CLIENT_RATE_LIMIT = float(env.get("CLIENT_RATE_LIMIT", 0))
+CLIENT_RATE_BURST = float(env.get("CLIENT_RATE_BURST", 10))
+RESPONSE_CHUNK_BYTES = int(env.get("RESPONSE_CHUNK_BYTES", 65536))
+RESPONSE_COMPRESSION_MIN_BYTES = int(env.get("RESPONSE_COMPRESSION_MIN_BYTES", 1024))
+HEALTH_CHECK_TIMEOUT = float(env.get("HEALTH_CHECK_TIMEOUT", 2))
+HEALTH_CHECK_INTERVAL = float(env.get("HEALTH_CHECK_INTERVAL", 5))
+rabbit_client = RabbitMQClient(
+    env["RABBIT_HOST"], env["RABBIT_QUEUE"], health_timeout=HEALTH_CHECK_TIMEOUT
+)
+mongo_client = MongoDBClient(
+    env["MONGO_HOST"], env["MONGO_DB"], health_timeout=HEALTH_CHECK_TIMEOUT
+)
+health_monitor = HealthMonitor(
+    {
+        "rabbitmq": lambda: rabbit_client.is_healthy,
+        "mongodb": lambda: mongo_client.is_healthy,
+    },
+    interval=HEALTH_CHECK_INTERVAL,
+)
+completion_waiters = CompletionWaiters(lambda cb: rabbit_client.subscribe(cb))
+job_cache = JobCache(JOB_CACHE_MAX_BYTES, JOB_CACHE_MAX_ENTRY_BYTES)
+backpressure = Backpressure(
+    lambda: rabbit_client.queue_depth(),
+    lambda: Job.drain_rate(mongo_client, ADMISSION_DRAIN_WINDOW),
+    high_watermark=ADMISSION_HIGH_WATERMARK,
+    low_watermark=ADMISSION_LOW_WATERMARK,
+    interval=ADMISSION_CHECK_INTERVAL,
+    max_retry_after=ADMISSION_MAX_RETRY_AFTER,
+)
+client_buckets = TokenBuckets(CLIENT_RATE_LIMIT, CLIENT_RATE_BURST)
 
 
 @server.route("/health")
 def health() -> ResponseAndCode:
-    is_healthy = rabbit_client.is_healthy and mongo_client.is_healthy
+    health_monitor.start()
+    is_healthy = health_monitor.is_healthy
     healthy_message = "All services are online"
     unhealthy_message = "At least one service is offline"
     status = HealthStatus.PASS if is_healthy else HealthStatus.FAIL
@@ -31,6 +80,7 @@ def health() -> ResponseAndCode:
         {
             "status": status.name,
             "info": healthy_message if is_healthy else unhealthy_message,
+            "dependencies": health_monitor.report,
         },
         status_code=(200 if is_healthy else 500),
     )
@@ -38,66 +88,332 @@ def health() -> ResponseAndCode:
 
 @server.route("/word-count", methods=["GET", "POST"])
 def word_count() -> ResponseAndCode:
-    def handle_invalid_mime_type() -> ResponseAndCode:
-        err = "Please make requests using the application/json MIME type"
-        return _response(False, err, status_code=400)
-
-    def handle_dependency_error() -> ResponseAndCode:
-        err = "Oh dear! Something unexpected occurred..."
-        return _response(False, err, status_code=500)
-
     def handle_post(request_content: dict) -> ResponseAndCode:
-        def is_valid(url: str) -> bool:
-            parsed = urlparse(str(url))
-            return all([parsed.scheme, parsed.netloc])
-
         def handle_invalid_input() -> ResponseAndCode:
             err = "You must provide a valid `url` in your POST request JSON"
             return _response(False, err, status_code=400)
 
-        def handle_valid_input(url: str) -> ResponseAndCode:
+        def handle_invalid_cache_options() -> ResponseAndCode:
+            err = (
+                "`max_age` must be a non-negative number and `force_refresh` a boolean"
+            )
+            return _response(False, err, status_code=400)
+
+        def handle_invalid_priority() -> ResponseAndCode:
+            return _response(False, _invalid_priority_message(), status_code=400)
+
+        def handle_valid_input(
+            url: str, max_age: float, priority: str
+        ) -> ResponseAndCode:
             def publish_job() -> ResponseAndCode:
                 wc_job = Job.create(mongo_client, url)
                 job_id = str(wc_job["job_id"])
-                rabbit_client.publish({"job_id": job_id})
+                rabbit_client.publish(
+                    Lanes.job_message(job_id, url, priority), priority
+                )
                 return _response(True, f"Scheduled Job: {job_id}", wc_job, 202)
 
-            try:
+            def reuse_job(wc_job: dict[str, Any]) -> ResponseAndCode:
+                job_id = wc_job["job_id"]
+                return _response(True, f"Cached Job: {job_id}", wc_job, 200)
+
+            def admit_job() -> ResponseAndCode:
+                backpressure.start()
+                if retry_after := backpressure.retry_after():
+                    return _handle_overloaded(retry_after)
                 return publish_job()
+
+            try:
+                cached = (
+                    Job.find_cached(mongo_client, url, max_age) if max_age else None
+                )
+                return reuse_job(cached) if cached else admit_job()
             except (AMQPError, BSONError, PyMongoError):
-                return handle_dependency_error()
+                return _handle_dependency_error()
 
         url = request_content.get("url", "")
-        return handle_valid_input(url) if is_valid(url) else handle_invalid_input()
+        max_age = request_content.get("max_age", RESULT_CACHE_TTL)
+        force_refresh = request_content.get("force_refresh", False)
+        priority = request_content.get("priority", Lanes.DEFAULT_LANE)
+        if not validation.is_valid_url(url):
+            return handle_invalid_input()
+        if not validation.is_non_negative_number(max_age) or not isinstance(
+            force_refresh, bool
+        ):
+            return handle_invalid_cache_options()
+        if not validation.is_valid_priority(priority):
+            return handle_invalid_priority()
+        if retry_after := _rate_limit():
+            return _handle_rate_limited(retry_after)
+        return handle_valid_input(url, 0 if force_refresh else max_age, priority)
 
     def handle_get(request_content: dict) -> ResponseAndCode:
-        def is_valid(oid: str) -> bool:
-            return bool(oid) and mongo_client.exists(Job.COLLECTION, oid)
+        def fetch_job(
+            oid: str, ranking: Optional[dict[str, Any]]
+        ) -> Optional[dict[str, Any]]:
+            return (
+                Job.fetch_ranking(mongo_client, oid, **ranking)
+                if ranking
+                else Job.fetch(mongo_client, oid)
+            )
+
+        def fetch_when_finished(
+            oid: str, wait: float, ranking: Optional[dict[str, Any]]
+        ) -> Optional[dict[str, Any]]:
+            completion_waiters.start()
+            with completion_waiters.waiting_for(oid) as finished:
+                word_count_job = fetch_job(oid, ranking)
+                if word_count_job is None or not is_in_progress(word_count_job):
+                    return word_count_job
+                return (
+                    fetch_job(oid, ranking) if finished.wait(wait) else word_count_job
+                )
 
-        def handle_valid_input(oid: str) -> ResponseAndCode:
-            word_count_job = Job.fetch(mongo_client, oid)
-            return _response(
-                True, f"Fetched Job: {oid}", word_count_job, status_code=200
+        def is_in_progress(word_count_job: dict[str, Any]) -> bool:
+            return word_count_job.get("status") == Job.JobStatus.IN_PROGRESS.name
+
+        def is_finished(word_count_job: dict[str, Any]) -> bool:
+            return word_count_job.get("status") in (
+                Job.JobStatus.COMPLETE.name,
+                Job.JobStatus.FAIL.name,
+            )
+
+        def handle_valid_input(
+            oid: str, wait: float, ranking: Optional[dict[str, Any]]
+        ) -> ResponseAndCode:
+            cache_key = (oid, *sorted(ranking.items())) if ranking else (oid,)
+            if cached := job_cache.get(cache_key):
+                return _cached_response(cached)
+            word_count_job = (
+                fetch_when_finished(oid, min(wait, LONG_POLL_MAX_WAIT), ranking)
+                if wait
+                else fetch_job(oid, ranking)
             )
+            if word_count_job is None:
+                return handle_invalid_input()
+            payload = _payload(True, f"Fetched Job: {oid}", word_count_job)
+            if is_finished(word_count_job) and not serialization.is_streamable(payload):
+                body = serialization.encode(payload)
+                return _cached_response(job_cache.put(cache_key, body))
+            return _encoded_response(serialization.iter_encode(payload), 200)
 
         def handle_invalid_input() -> ResponseAndCode:
             err = "You must provide a valid `job_id` in your GET request JSON"
             return _response(False, err, status_code=400)
 
+        def handle_invalid_wait() -> ResponseAndCode:
+            err = "`wait` must be a non-negative number of seconds"
+            return _response(False, err, status_code=400)
+
+        def handle_invalid_ranking() -> ResponseAndCode:
+            err = (
+                f"`top_k` must be an integer between 1 and {MAX_RANKING_PAGE_SIZE}, "
+                "`min_count` a non-negative integer, `prefix` a string and `cursor` "
+                "a `next_cursor` from a previous response"
+            )
+            return _response(False, err, status_code=400)
+
         oid = request_content.get("job_id", "")
+        wait = request_content.get("wait", 0)
+        ranking = (
+            validation.ranking_options(
+                request_content, RANKING_PAGE_SIZE, MAX_RANKING_PAGE_SIZE
+            )
+            if validation.is_ranking_request(request_content)
+            else None
+        )
+        if not validation.is_non_negative_number(wait):
+            return handle_invalid_wait()
+        if validation.is_ranking_request(request_content) and ranking is None:
+            return handle_invalid_ranking()
         try:
-            return handle_valid_input(oid) if is_valid(oid) else handle_invalid_input()
+            return (
+                handle_valid_input(oid, wait, ranking)
+                if Job.is_valid_id(oid)
+                else handle_invalid_input()
+            )
         except (BSONError, PyMongoError):
-            return handle_dependency_error()
+            return _handle_dependency_error()
 
     if not request.is_json:
-        return handle_invalid_mime_type()
+        return _handle_invalid_mime_type()
 
     request_content = request.json if request.json is not None else {}
     return {"GET": handle_get, "POST": handle_post}[request.method](request_content)
 
 
+@server.route("/word-count/batch", methods=["POST"])
+def word_count_batch() -> ResponseAndCode:
+    def handle_invalid_input(invalid: list[int]) -> ResponseAndCode:
+        err = (
+            "You must provide a list of at most "
+            f"{MAX_BATCH_SIZE} valid `urls` in your POST request JSON"
+        )
+        return _response(False, err, {"invalid_urls": invalid}, status_code=400)
+
+    def handle_invalid_priority() -> ResponseAndCode:
+        return _response(False, _invalid_priority_message(), status_code=400)
+
+    def handle_valid_input(urls: list[str], priority: str) -> ResponseAndCode:
+        def publish_jobs() -> ResponseAndCode:
+            jobs = Job.create_many(mongo_client, urls)
+            job_ids = [job["job_id"] for job in jobs]
+            rabbit_client.publish_many(
+                [
+                    Lanes.job_message(job["job_id"], job["url"], priority)
+                    for job in jobs
+                ],
+                priority,
+            )
+            message = f"Scheduled {len(job_ids)} Jobs"
+            return _response(True, message, {"job_ids": job_ids}, 202)
+
+        if retry_after := _rate_limit():
+            return _handle_rate_limited(retry_after)
+        backpressure.start()
+        if retry_after := backpressure.retry_after():
+            return _handle_overloaded(retry_after)
+        try:
+            return publish_jobs()
+        except (AMQPError, BSONError, PyMongoError):
+            return _handle_dependency_error()
+
+    if not request.is_json:
+        return _handle_invalid_mime_type()
+
+    request_content = request.json if isinstance(request.json, dict) else {}
+    urls = request_content.get("urls")
+    priority = request_content.get("priority", Lanes.BULK_LANE)
+    if not isinstance(urls, list) or not 0 < len(urls) <= MAX_BATCH_SIZE:
+        return handle_invalid_input([])
+    invalid = [i for i, url in enumerate(urls) if not validation.is_valid_url(url)]
+    if invalid:
+        return handle_invalid_input(invalid)
+    if not validation.is_valid_priority(priority):
+        return handle_invalid_priority()
+    return handle_valid_input(urls, priority)
+
+
+@server.route("/word-count/status")
+def word_count_status() -> ResponseAndCode:
+    def handle_invalid_input() -> ResponseAndCode:
+        err = (
+            "You must provide a list of at most "
+            f"{MAX_STATUS_BATCH_SIZE} `job_ids` in your GET request JSON"
+        )
+        return _response(False, err, status_code=400)
+
+    def handle_valid_input(oids: list[Any]) -> ResponseAndCode:
+        def status_of(oid: Any, found: dict[str, dict[str, Any]]) -> dict[str, Any]:
+            if not Job.is_valid_id(oid):
+                return {"job_id": oid, "error": "malformed job_id"}
+            return found.get(oid, {"job_id": oid, "error": "unknown job_id"})
+
+        try:
+            valid = list({oid for oid in oids if Job.is_valid_id(oid)})
+            found = Job.fetch_statuses(mongo_client, valid) if valid else {}
+        except (BSONError, PyMongoError):
+            return _handle_dependency_error()
+        jobs = [status_of(oid, found) for oid in oids]
+        return _response(True, f"Fetched {len(jobs)} Job Statuses", {"jobs": jobs})
+
+    if not request.is_json:
+        return _handle_invalid_mime_type()
+
+    request_content = request.json if isinstance(request.json, dict) else {}
+    oids = request_content.get("job_ids")
+    if not isinstance(oids, list) or not 0 < len(oids) <= MAX_STATUS_BATCH_SIZE:
+        return handle_invalid_input()
+    return handle_valid_input(oids)
+
+
+@server.route("/metrics")
+def metrics_snapshot() -> ResponseAndCode:
+    return _response(True, "Fetched Metrics", metrics.snapshot())
+
+
+def _handle_invalid_mime_type() -> ResponseAndCode:
+    err = "Please make requests using the application/json MIME type"
+    return _response(False, err, status_code=400)
+
+
+def _invalid_priority_message() -> str:
+    return f"`priority` must be one of {', '.join(Lanes.LANES)}"
+
+
+def _handle_dependency_error() -> ResponseAndCode:
+    err = "Oh dear! Something unexpected occurred..."
+    return _response(False, err, status_code=500)
+
+
+def _rate_limit() -> Optional[int]:
+    client = request.access_route[-1] if request.access_route else request.remote_addr
+    return client_buckets.acquire(client or "unknown")
+
+
+def _handle_rate_limited(retry_after: int) -> ResponseAndCode:
+    metrics.increment("admission.rate_limited")
+    err = "Too many requests, please slow down"
+    return _retry_later(_response(False, err, status_code=429), retry_after)
+
+
+def _handle_overloaded(retry_after: int) -> ResponseAndCode:
+    metrics.increment("admission.shed")
+    err = "The job queue is overloaded, please retry later"
+    return _retry_later(_response(False, err, status_code=429), retry_after)
+
+
+def _retry_later(
+    response_and_code: ResponseAndCode, retry_after: int
+) -> ResponseAndCode:
+    response, status_code = response_and_code
+    response.headers["Retry-After"] = str(retry_after)
+    return response, status_code
+
+
 def _response(
     success: bool, message: str, data: dict[str, Any] = {}, status_code: int = 200
 ) -> ResponseAndCode:
-    return jsonify({"success": success, "message": message, "data": data}), status_code
+    payload = _payload(success, message, data)
+    return _encoded_response(serialization.iter_encode(payload), status_code)
+
+
+def _cached_response(cached: CachedBody) -> ResponseAndCode:
+    encoding = _negotiate_encoding(len(cached.body))
+    etag = f"{cached.etag}-{encoding}" if encoding else cached.etag
+    if request.if_none_match.contains(etag):
+        response = server.response_class(status=304, headers=_vary_headers())
+        response.set_etag(etag)
+        return response, 304
+    response, status_code = _encoded_response([cached.body], 200)
+    response.set_etag(etag)
+    return response, status_code
+
+
+def _encoded_response(chunks: Iterable[bytes], status_code: int) -> ResponseAndCode:
+    body = serialization.buffered(chunks, RESPONSE_CHUNK_BYTES)
+    first = next(body)
+    encoding = _negotiate_encoding(len(first))
+    compressed = serialization.compress(chain([first], body), encoding)
+    response = server.response_class(
+        b"".join(compressed) if len(first) < RESPONSE_CHUNK_BYTES else compressed,
+        mimetype="application/json",
+        headers=_vary_headers(),
+    )
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response, status_code
+
+
+def _negotiate_encoding(size: int) -> Optional[str]:
+    if size < RESPONSE_COMPRESSION_MIN_BYTES:
+        return None
+    return request.accept_encodings.best_match(serialization.ENCODINGS)
+
+
+def _vary_headers() -> dict[str, str]:
+    return {"Vary": "Accept-Encoding"}
+
+
+def _payload(success: bool, message: str, data: dict[str, Any]) -> dict[str, Any]:
+    return {"success": success, "message": message, "data": data}
@@ -0,0 +1,68 @@
+import hashlib
+import threading
+
+from collections import OrderedDict
+from typing import Hashable, NamedTuple, Optional
+
+from common import metrics
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class JobCache:
+    def __init__(self, max_bytes: int, max_entry_bytes: int, name: str = "job_cache"):
+        self._max_bytes = max_bytes
+        self._max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self._name = name
+        self._entries: OrderedDict[Hashable, CachedBody] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._lookups = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedBody]:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+            self._record_lookup(cached is not None)
+        return cached
+
+    def put(self, key: Hashable, body: bytes) -> CachedBody:
+        cached = CachedBody(body, etag_of(body))
+        if len(body) > self._max_entry_bytes:
+            return cached
+        with self._lock:
+            if (previous := self._entries.pop(key, None)) is not None:
+                self._bytes -= len(previous.body)
+            self._entries[key] = cached
+            self._bytes += len(body)
+            while self._bytes > self._max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+                metrics.increment(f"{self._name}.evictions")
+            self._record_size()
+        return cached
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._record_size()
+
+    def _record_lookup(self, hit: bool) -> None:
+        self._hits += hit
+        self._lookups += 1
+        metrics.increment(f"{self._name}.{'hits' if hit else 'misses'}")
+        metrics.set_gauge(f"{self._name}.hit_ratio", self._hits / self._lookups)
+
+    def _record_size(self) -> None:
+        metrics.set_gauge(f"{self._name}.bytes", self._bytes)
+        metrics.set_gauge(f"{self._name}.entries", len(self._entries))
+
+
+def etag_of(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
@@ -0,0 +1,95 @@
+import zlib
+
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import orjson
+import zstandard
+
+ENCODINGS = ["zstd", "gzip"]
+STREAM_MIN_ITEMS = 100000
+STREAM_CHUNK_ITEMS = 10000
+ENVELOPE_MAX_KEYS = 32
+GZIP_LEVEL = 1
+ZSTD_LEVEL = 3
+
+
+def encode(obj: Any) -> bytes:
+    return orjson.dumps(obj)
+
+
+def iter_encode(
+    obj: Any,
+    min_items: int = STREAM_MIN_ITEMS,
+    chunk_items: int = STREAM_CHUNK_ITEMS,
+) -> Iterator[bytes]:
+    def iter_batches(
+        opening: bytes,
+        closing: bytes,
+        members: Iterable[Any],
+        encode_batch: Callable[[list[Any]], bytes],
+    ) -> Iterator[bytes]:
+        yield opening
+        members, separator = iter(members), b""
+        while batch := list(islice(members, chunk_items)):
+            yield separator + encode_batch(batch)[1:-1]
+            separator = b","
+        yield closing
+
+    if isinstance(obj, dict) and len(obj) > min_items:
+        yield from iter_batches(b"{", b"}", obj.items(), lambda b: encode(dict(b)))
+    elif isinstance(obj, list) and len(obj) > min_items:
+        yield from iter_batches(b"[", b"]", obj, encode)
+    elif isinstance(obj, dict) and is_streamable(obj, min_items):
+        yield b"{"
+        for i, (key, value) in enumerate(obj.items()):
+            yield (b"," if i else b"") + encode(key) + b":"
+            yield from iter_encode(value, min_items, chunk_items)
+        yield b"}"
+    else:
+        yield encode(obj)
+
+
+def is_streamable(obj: Any, min_items: int = STREAM_MIN_ITEMS) -> bool:
+    if not isinstance(obj, (dict, list)):
+        return False
+    if len(obj) > min_items:
+        return True
+    return (
+        isinstance(obj, dict)
+        and len(obj) <= ENVELOPE_MAX_KEYS
+        and any(is_streamable(value, min_items) for value in obj.values())
+    )
+
+
+def buffered(chunks: Iterable[bytes], size: int) -> Iterator[bytes]:
+    buffer = bytearray()
+    for chunk in chunks:
+        if not buffer and len(chunk) >= size:
+            yield chunk
+            continue
+        buffer += chunk
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def compress(chunks: Iterable[bytes], encoding: Optional[str]) -> Iterator[bytes]:
+    if encoding is None:
+        yield from chunks
+        return
+    compressor = _compressor(encoding)
+    for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
+
+
+def _compressor(encoding: str) -> Any:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    if encoding == "gzip":
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
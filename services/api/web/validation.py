@@ -0,0 +1,54 @@
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from common.mongo.models import job as Job
+from common.rabbit import lanes as Lanes
+
+RANKING_OPTIONS = ["top_k", "min_count", "prefix", "cursor"]
+
+
+def is_valid_url(url: Any) -> bool:
+    parsed = urlparse(str(url))
+    return all([parsed.scheme, parsed.netloc])
+
+
+def is_non_negative_number(value: Any) -> bool:
+    return (
+        isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+    )
+
+
+def is_non_negative_integer(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def is_valid_priority(value: Any) -> bool:
+    return isinstance(value, str) and value in Lanes.LANES
+
+
+def is_ranking_request(request_content: dict[str, Any]) -> bool:
+    return any(option in request_content for option in RANKING_OPTIONS)
+
+
+def ranking_options(
+    request_content: dict[str, Any], page_size: int, max_page_size: int
+) -> Optional[dict[str, Any]]:
+    limit = request_content.get("top_k", page_size)
+    min_count = request_content.get("min_count", 0)
+    prefix = request_content.get("prefix", "")
+    cursor = request_content.get("cursor")
+    offset = 0 if cursor is None else Job.decode_cursor(cursor)
+    if not (
+        is_non_negative_integer(limit)
+        and 0 < limit <= max_page_size
+        and is_non_negative_integer(min_count)
+        and isinstance(prefix, str)
+        and offset is not None
+    ):
+        return None
+    return {
+        "limit": limit,
+        "offset": offset,
+        "min_count": min_count,
+        "prefix": prefix.lower(),
+    }
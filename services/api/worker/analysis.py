@@ -0,0 +1,17 @@
+from typing import Iterable
+
+from worker import html_text, scraper, word_histogram
+
+
+def analyse(content: bytes) -> tuple[dict[str, int], str]:
+    text = scraper.extract_text(content)
+    return word_histogram.build(text), word_histogram.fingerprint(text)
+
+
+def analyse_stream(chunks: Iterable[str]) -> tuple[dict[str, int], str]:
+    counter = word_histogram.WordCounter()
+    extractor = html_text.TextExtractor(counter.feed, counter.flush)
+    for chunk in chunks:
+        extractor.feed(chunk)
+    extractor.close()
+    return counter.histogram(), counter.fingerprint()
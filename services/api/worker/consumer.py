@@ -1,64 +1,550 @@
+import functools
 import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
 from os import environ as env
-from typing import Any, Optional
+from typing import Any, Callable, NamedTuple, Optional
 
 import pika
 
+from pika.exceptions import AMQPError
 from bson.errors import BSONError
 from pymongo.errors import PyMongoError
 from requests.exceptions import RequestException
 
+from common import metrics, url as URL
 from common.mongo.client import MongoDBClient
+from common.mongo.models import histogram as Histogram
 from common.mongo.models import job as Job
+from common.rabbit import lanes as Lanes
 from common.rabbit.client import RabbitMQClient
-from worker import scraper, word_histogram
+from worker import analysis, metrics_server, scraper, word_histogram
+from worker.host_scheduler import HostScheduler
+from worker.lane_scheduler import LaneScheduler
+from worker.pipeline import Pipeline, Stage
+from worker.result_sink import ResultSink
 
 rabbit_client = RabbitMQClient(env["RABBIT_HOST"], env["RABBIT_QUEUE"])
 mongo_client = MongoDBClient(env["MONGO_HOST"], env["MONGO_DB"])
+metrics_reporter_started = threading.Event()
+WORKER_CONCURRENCY = int(env.get("WORKER_CONCURRENCY", 1))
+WORKER_PREFETCH = int(env.get("WORKER_PREFETCH", WORKER_CONCURRENCY))
+WORKER_MODE = env.get("WORKER_MODE", "pool")
+PIPELINE_FETCH_CONCURRENCY = int(env.get("PIPELINE_FETCH_CONCURRENCY", 32))
+PIPELINE_PARSE_PROCESSES = int(env.get("PIPELINE_PARSE_PROCESSES", os.cpu_count() or 1))
+PIPELINE_WRITE_CONCURRENCY = int(env.get("PIPELINE_WRITE_CONCURRENCY", 4))
+PIPELINE_QUEUE_SIZE = int(env.get("PIPELINE_QUEUE_SIZE", 64))
+WORKER_METRICS_INTERVAL = float(env.get("WORKER_METRICS_INTERVAL", 60))
+WORKER_METRICS_PORT = int(env.get("WORKER_METRICS_PORT", 0))
+HOST_CONCURRENCY = int(env.get("HOST_CONCURRENCY", 4))
+SLOW_HOST_CONCURRENCY = int(env.get("SLOW_HOST_CONCURRENCY", 1))
+SLOW_HOST_LATENCY = float(env.get("SLOW_HOST_LATENCY", 5))
+HOST_MAX_QUEUED = int(env.get("HOST_MAX_QUEUED", 0))
+HOST_DEFER_DELAY = float(env.get("HOST_DEFER_DELAY", 5))
+HISTOGRAM_PROCESSES = int(env.get("HISTOGRAM_PROCESSES", 0))
+HISTOGRAM_PARALLEL_MIN_CHARS = int(
+    env.get("HISTOGRAM_PARALLEL_MIN_CHARS", 16 * 1024 * 1024)
+)
+HISTOGRAM_CHUNK_CHARS = int(env.get("HISTOGRAM_CHUNK_CHARS", 4 * 1024 * 1024))
+HISTOGRAM_STORAGE = env.get("HISTOGRAM_STORAGE", "document")
+RESULT_BATCH_SIZE = int(env.get("RESULT_BATCH_SIZE", 0))
+RESULT_BATCH_DELAY = float(env.get("RESULT_BATCH_DELAY", 0.05))
+LANE_WEIGHTS = {
+    "high": int(env.get("HIGH_LANE_WEIGHT", 8)),
+    "normal": int(env.get("NORMAL_LANE_WEIGHT", 4)),
+    "low": int(env.get("LOW_LANE_WEIGHT", 1)),
+}
+
+
+class Task(NamedTuple):
+    oid: str
+    ack: Callable[[], None]
+    host: Optional[str] = None
+    content: Optional[bytes] = None
+    word_count: Optional[dict[str, int]] = None
+    validators: Optional[dict[str, str]] = None
+    unchanged_from: Optional[str] = None
+    content_hash: Optional[str] = None
+    error: Optional[str] = None
+    lane: str = Lanes.DEFAULT_LANE
+    queued_at: Optional[float] = None
+    requeue: Optional[Callable[[], None]] = None
+
+
+class Result(NamedTuple):
+    oid: str
+    update: dict[str, Any]
+    ack: Callable[[], None]
+    histogram: Optional[dict[str, Any]] = None
+    requeue: Optional[Callable[[], None]] = None
+
+
+class Counted(NamedTuple):
+    validators: dict[str, str]
+    content_hash: Optional[str] = None
+    word_count: Optional[dict[str, int]] = None
+    text: Optional[str] = None
 
 
 def consume() -> None:
-    def callback(
-        ch: pika.adapters.blocking_connection.BlockingChannel,
-        method: pika.spec.Basic.Deliver,
-        properties: pika.spec.BasicProperties,
-        body: bytes,
-    ) -> None:
-        def parse_objectid(body: bytes) -> Optional[Any]:
-            try:
-                return json.loads(body)["job_id"]
-            except (KeyError, json.decoder.JSONDecodeError):
-                print(f"Unable to parse job_id from json body({str(body)})", flush=True)
-            return None
+    def process(task: Task) -> None:
+        def count_words(url: str, validators: Optional[dict[str, str]]) -> Counted:
+            if WORKER_MODE == "streaming":
+                stream = scraper.stream(url, validators)
+                if stream.chunks is None:
+                    return Counted(stream.validators)
+                word_count, content_hash = analysis.analyse_stream(stream.chunks)
+                return Counted(stream.validators, content_hash, word_count)
+            page = scraper.fetch_page(url, validators)
+            if page.content is None:
+                return Counted(page.validators)
+            text = scraper.extract_text(page.content)
+            return Counted(page.validators, word_histogram.fingerprint(text), text=text)
+
+        def build_histogram(text: str) -> dict[str, int]:
+            if histogram_pool is None or len(text) < HISTOGRAM_PARALLEL_MIN_CHARS:
+                return word_histogram.build(text)
+            return word_histogram.build_parallel(
+                text, histogram_pool, HISTOGRAM_CHUNK_CHARS
+            )
 
         def run_job(oid: str) -> Optional[str]:
             try:
-                if mongo_client.exists(Job.COLLECTION, oid):
-                    job = Job.fetch(mongo_client, oid)
-                    word_count = word_histogram.build(scraper.scrape_text(job["url"]))
-                    job = Job.complete(mongo_client, oid, word_count)
-                    print(f"{json.dumps(job)}", flush=True)
-                else:
-                    print(
-                        f"Unable to find job: job_id({oid}) does not exist", flush=True
+                if job := find_job(oid):
+                    previous = find_previous(job["url"])
+                    counted = count_words(
+                        job["url"], previous and previous["validators"]
                     )
-            except BSONError:
-                print(f"Unable to find job: job_id({oid}) is malformed", flush=True)
+                    if counted.content_hash is None and previous:
+                        reuse_job(oid, previous["job_id"], counted.validators)
+                    elif not share_job(oid, counted.content_hash, counted.validators):
+                        word_count = (
+                            counted.word_count
+                            if counted.text is None
+                            else build_histogram(counted.text)
+                        )
+                        complete_job(
+                            oid,
+                            word_count or {},
+                            counted.validators,
+                            counted.content_hash,
+                        )
             except (PyMongoError, RequestException, RuntimeError) as e:
                 return str(e)
             return None
 
-        def handle_error(oid: str, err_msg: str) -> None:
-            try:
-                job = Job.fail(mongo_client, oid, err_msg)
-                print(f"{json.dumps(job)}", flush=True)
-            except PyMongoError:
-                print("Unable to call mongo client via Job model", flush=True)
+        record_wait(task)
+        if err_msg := run_job(task.oid):
+            fail_job(task.oid, err_msg)
 
-        if oid := parse_objectid(body):
-            if err_msg := run_job(oid):
-                handle_error(oid, err_msg)
+    def process_next() -> None:
+        task = deliveries.get()
+        try:
+            process(task)
+        finally:
+            task.ack()
 
+    def callback(
+        ch: pika.adapters.blocking_connection.BlockingChannel,
+        method: pika.spec.Basic.Deliver,
+        properties: pika.spec.BasicProperties,
+        body: bytes,
+    ) -> None:
+        if message := parse_message(body):
+            process(new_task(message, lambda: None))
         ch.basic_ack(delivery_tag=method.delivery_tag)  # type: ignore
 
-    rabbit_client.consume(callback)
+    def concurrent_callback(
+        ch: pika.adapters.blocking_connection.BlockingChannel,
+        method: pika.spec.Basic.Deliver,
+        properties: pika.spec.BasicProperties,
+        body: bytes,
+    ) -> None:
+        def report(future: Future) -> None:
+            if error := future.exception():
+                print(f"Unexpected error processing job: {str(error)}", flush=True)
+
+        if not (message := parse_message(body)):
+            ch.basic_ack(delivery_tag=method.delivery_tag)  # type: ignore
+            return
+        ack = functools.partial(ack_threadsafe, ch, method.delivery_tag)  # type: ignore
+        deliveries.put(new_task(message, ack))
+        pool.submit(process_next).add_done_callback(report)
+
+    if HISTOGRAM_STORAGE not in Histogram.STORAGE_FORMATS:
+        raise ValueError(f"Unknown histogram storage format: {HISTOGRAM_STORAGE}")
+    if WORKER_MODE == "pipeline":
+        consume_pipeline()
+        return
+    start_metrics_reporter()
+    deliveries = LaneScheduler(lambda task: task.lane, LANE_WEIGHTS)
+    with histogram_executor() as histogram_pool:
+        if WORKER_CONCURRENCY <= 1:
+            rabbit_client.consume(callback, prefetch_count=WORKER_PREFETCH)
+            return
+        with ThreadPoolExecutor(WORKER_CONCURRENCY, thread_name_prefix="job") as pool:
+            rabbit_client.consume(concurrent_callback, prefetch_count=WORKER_PREFETCH)
+
+
+def consume_pipeline() -> None:
+    def fetch(task: Task) -> Optional[Task]:
+        record_wait(task)
+        started = time.perf_counter()
+        try:
+            return fetch_page(task)
+        finally:
+            latency = time.perf_counter() - started
+            hosts.release(task.host or task.oid, latency if task.host else None)
+
+    def fetch_page(task: Task) -> Optional[Task]:
+        try:
+            if job := find_job(task.oid):
+                previous = find_previous(job["url"])
+                page = scraper.fetch_page(
+                    job["url"], previous and previous["validators"]
+                )
+                return task._replace(
+                    content=page.content,
+                    validators=page.validators,
+                    unchanged_from=(
+                        previous["job_id"]
+                        if previous and page.content is None
+                        else None
+                    ),
+                )
+        except (PyMongoError, RequestException, RuntimeError) as e:
+            return task._replace(error=str(e))
+        task.ack()
+        return None
+
+    def parse(task: Task) -> Task:
+        if task.error is not None or task.unchanged_from is not None:
+            return task
+        if task.content is None:
+            return task._replace(error="Page returned no content")
+        try:
+            word_count, content_hash = processes.submit(
+                analysis.analyse, task.content
+            ).result()
+        except Exception as e:
+            return task._replace(content=None, error=str(e))
+        return task._replace(
+            content=None, word_count=word_count, content_hash=content_hash
+        )
+
+    def write(task: Task) -> None:
+        try:
+            if task.error is None and task.unchanged_from is not None:
+                reuse_job(task.oid, task.unchanged_from, task.validators)
+            elif task.error is None and not share_job(
+                task.oid, task.content_hash, task.validators
+            ):
+                complete_job(
+                    task.oid, task.word_count or {}, task.validators, task.content_hash
+                )
+        except Exception as e:
+            task = task._replace(error=str(e))
+        try:
+            if task.error is not None:
+                fail_job(task.oid, task.error)
+        finally:
+            task.ack()
+
+    def write_behind(task: Task) -> None:
+        if task.error is None and task.unchanged_from is not None:
+            write(task)
+            return
+        try:
+            result = (
+                Result(task.oid, Job.failure(task.error), task.ack)
+                if task.error is not None
+                else completion(task)
+            )
+        except PyMongoError as e:
+            result = Result(task.oid, Job.failure(str(e)), task.ack)
+        results.add(result._replace(requeue=task.requeue))
+
+    def abandon(task: Task, error: Exception) -> None:
+        try:
+            fail_job(task.oid, str(error))
+        finally:
+            task.ack()
+
+    def completion(task: Task) -> Result:
+        if task.content_hash and (histogram_id := find_shared(task.content_hash)):
+            metrics.increment("histograms.shared")
+            update = Job.completion(histogram_id, task.validators, task.content_hash)
+            return Result(task.oid, update, task.ack)
+        histogram = Job.histogram(
+            mongo_client, task.word_count or {}, storage=HISTOGRAM_STORAGE
+        )
+        update = Job.completion(task.oid, task.validators, task.content_hash)
+        return Result(task.oid, update, task.ack, histogram)
+
+    def callback(
+        ch: pika.adapters.blocking_connection.BlockingChannel,
+        method: pika.spec.Basic.Deliver,
+        properties: pika.spec.BasicProperties,
+        body: bytes,
+    ) -> None:
+        ack = functools.partial(ack_threadsafe, ch, method.delivery_tag)  # type: ignore
+        requeue = functools.partial(
+            requeue_threadsafe, ch, method.delivery_tag  # type: ignore
+        )
+        if not (message := parse_message(body)):
+            ch.basic_ack(delivery_tag=method.delivery_tag)  # type: ignore
+            return
+        host = URL.host_of(message["url"]) if message.get("url") else None
+        if host is not None and hosts.is_backlogged(host) and defer(message):
+            ch.basic_ack(delivery_tag=method.delivery_tag)  # type: ignore
+            return
+        pipeline.submit(new_task(message, ack, host, requeue))
+
+    hosts = HostScheduler(
+        lambda task: (task.host or task.oid) if isinstance(task, Task) else None,
+        concurrency=HOST_CONCURRENCY,
+        slow_concurrency=SLOW_HOST_CONCURRENCY,
+        slow_latency=SLOW_HOST_LATENCY,
+        max_queued=HOST_MAX_QUEUED,
+        lane=lambda task: task.lane if isinstance(task, Task) else Lanes.DEFAULT_LANE,
+        weights=LANE_WEIGHTS,
+    )
+
+    results = ResultSink(store_results, RESULT_BATCH_SIZE, RESULT_BATCH_DELAY)
+
+    with ProcessPoolExecutor(
+        PIPELINE_PARSE_PROCESSES, mp_context=multiprocessing.get_context("forkserver")
+    ) as processes:
+        pipeline = Pipeline(
+            [
+                Stage("fetch", fetch, PIPELINE_FETCH_CONCURRENCY),
+                Stage("parse", parse, PIPELINE_PARSE_PROCESSES),
+                Stage(
+                    "write",
+                    write_behind if RESULT_BATCH_SIZE > 1 else write,
+                    PIPELINE_WRITE_CONCURRENCY,
+                ),
+            ],
+            queue_size=PIPELINE_QUEUE_SIZE,
+            report_interval=WORKER_METRICS_INTERVAL,
+            inbox=hosts,
+            on_error=abandon,
+        )
+        results.start()
+        pipeline.start()
+        try:
+            rabbit_client.consume(callback, prefetch_count=WORKER_PREFETCH)
+        finally:
+            pipeline.stop()
+            results.stop()
+
+
+def start_metrics_reporter() -> None:
+    def report() -> None:
+        while True:
+            time.sleep(WORKER_METRICS_INTERVAL)
+            print(json.dumps({"metrics": metrics.snapshot()}), flush=True)
+
+    if metrics_reporter_started.is_set():
+        return
+    metrics_reporter_started.set()
+    if WORKER_METRICS_INTERVAL > 0:
+        threading.Thread(target=report, daemon=True).start()
+    if WORKER_METRICS_PORT > 0:
+        try:
+            metrics_server.serve(WORKER_METRICS_PORT)
+        except OSError as e:
+            print(f"Unable to serve metrics: {str(e)}", flush=True)
+
+
+def histogram_executor() -> Any:
+    if HISTOGRAM_PROCESSES <= 1:
+        return nullcontext()
+    return ProcessPoolExecutor(
+        HISTOGRAM_PROCESSES, mp_context=multiprocessing.get_context("forkserver")
+    )
+
+
+def new_task(
+    message: dict[str, Any],
+    ack: Callable[[], None],
+    host: Optional[str] = None,
+    requeue: Optional[Callable[[], None]] = None,
+) -> Task:
+    queued_at = message.get("queued_at")
+    return Task(
+        message["job_id"],
+        ack,
+        host,
+        lane=Lanes.lane_of(message),
+        queued_at=queued_at if isinstance(queued_at, (int, float)) else None,
+        requeue=requeue,
+    )
+
+
+def record_wait(task: Task) -> None:
+    if task.queued_at is not None:
+        waited = max(time.time() - task.queued_at, 0)
+        metrics.observe(f"lanes.{task.lane}.wait_seconds", waited)
+
+
+def parse_message(body: bytes) -> Optional[dict[str, Any]]:
+    try:
+        message: dict[str, Any] = json.loads(body)
+        if message["job_id"]:
+            return message
+    except (KeyError, TypeError, json.decoder.JSONDecodeError):
+        pass
+    print(f"Unable to parse job_id from json body({str(body)})", flush=True)
+    return None
+
+
+def defer(message: dict[str, Any]) -> bool:
+    try:
+        rabbit_client.publish_delayed(message, Lanes.lane_of(message), HOST_DEFER_DELAY)
+    except AMQPError:
+        print(f"Unable to defer job: job_id({message['job_id']})", flush=True)
+        return False
+    metrics.increment("hosts.deferred")
+    return True
+
+
+def find_job(oid: str) -> Optional[dict[str, Any]]:
+    try:
+        if job := Job.fetch(mongo_client, oid, histogram=False):
+            return job
+        print(f"Unable to find job: job_id({oid}) does not exist", flush=True)
+    except BSONError:
+        print(f"Unable to find job: job_id({oid}) is malformed", flush=True)
+    return None
+
+
+def find_previous(url: str) -> Optional[dict[str, Any]]:
+    try:
+        return Job.find_validated(mongo_client, url)
+    except PyMongoError:
+        print(f"Unable to find previous job for {url}", flush=True)
+    return None
+
+
+def find_shared(content_hash: str) -> Optional[str]:
+    try:
+        return Job.find_shared(mongo_client, content_hash)
+    except PyMongoError:
+        print(f"Unable to find histogram for content {content_hash}", flush=True)
+    return None
+
+
+def complete_job(
+    oid: str,
+    word_count: dict[str, int],
+    validators: Optional[dict[str, str]] = None,
+    content_hash: Optional[str] = None,
+) -> None:
+    job = Job.complete(
+        mongo_client,
+        oid,
+        word_count,
+        validators,
+        storage=HISTOGRAM_STORAGE,
+        content_hash=content_hash,
+    )
+    print(f"{json.dumps(job)}", flush=True)
+    announce(oid, job)
+
+
+def share_job(
+    oid: str,
+    content_hash: Optional[str],
+    validators: Optional[dict[str, str]] = None,
+) -> bool:
+    if content_hash is None or (histogram_id := find_shared(content_hash)) is None:
+        return False
+    job = Job.complete_shared(mongo_client, oid, histogram_id, content_hash, validators)
+    metrics.increment("histograms.shared")
+    print(f"{json.dumps(job)}", flush=True)
+    announce(oid, job)
+    return True
+
+
+def reuse_job(
+    oid: str, source_oid: str, validators: Optional[dict[str, str]] = None
+) -> None:
+    job = Job.complete_from(mongo_client, oid, source_oid, validators)
+    if job is None or job.get("status") != Job.JobStatus.COMPLETE.name:
+        raise RuntimeError(f"Previous result job_id({source_oid}) is unavailable")
+    metrics.increment("scraper.not_modified")
+    print(f"{json.dumps(job)}", flush=True)
+    announce(oid, job)
+
+
+def store_results(results: list[Result]) -> None:
+    written: set[int] = set()
+    try:
+        try:
+            errors = Job.apply(
+                mongo_client, [(r.oid, r.update, r.histogram) for r in results]
+            )
+        except PyMongoError as e:
+            errors = {i: str(e) for i in range(len(results))}
+        written.update(i for i in range(len(results)) if i not in errors)
+        for i, result in enumerate(results):
+            if i in errors:
+                if fail_job(result.oid, errors[i]):
+                    written.add(i)
+                continue
+            job = {k: v for k, v in result.update.items() if k in Job.STATUS_FIELDS}
+            print(json.dumps({**job, "job_id": result.oid}), flush=True)
+            announce(result.oid, result.update)
+    finally:
+        for i, result in enumerate(results):
+            if i in written or result.requeue is None:
+                result.ack()
+            else:
+                result.requeue()
+
+
+def fail_job(oid: str, err_msg: str) -> bool:
+    try:
+        job = Job.fail(mongo_client, oid, err_msg)
+    except PyMongoError:
+        print("Unable to call mongo client via Job model", flush=True)
+        return False
+    print(f"{json.dumps(job)}", flush=True)
+    announce(oid, job)
+    return True
+
+
+def announce(oid: str, job: Optional[dict[str, Any]]) -> None:
+    if job is None:
+        return
+    try:
+        rabbit_client.notify({"job_id": oid, "status": job.get("status")})
+    except AMQPError:
+        print(f"Unable to announce job: job_id({oid})", flush=True)
+
+
+def ack_threadsafe(
+    ch: pika.adapters.blocking_connection.BlockingChannel, delivery_tag: int
+) -> None:
+    try:
+        ch.connection.add_callback_threadsafe(
+            functools.partial(ch.basic_ack, delivery_tag=delivery_tag)
+        )
+    except AMQPError:
+        print(f"Unable to ack delivery({delivery_tag})", flush=True)
+
+
+def requeue_threadsafe(
+    ch: pika.adapters.blocking_connection.BlockingChannel, delivery_tag: int
+) -> None:
+    try:
+        ch.connection.add_callback_threadsafe(
+            functools.partial(ch.basic_nack, delivery_tag=delivery_tag, requeue=True)
+        )
+    except AMQPError:
+        print(f"Unable to requeue delivery({delivery_tag})", flush=True)
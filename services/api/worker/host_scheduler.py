@@ -0,0 +1,132 @@
+import threading
+
+from collections import OrderedDict, deque
+from typing import Any, Callable, Optional
+
+from common import metrics
+from worker.lane_scheduler import WeightedRoundRobin
+
+
+class HostScheduler:
+    def __init__(
+        self,
+        key: Callable[[Any], Optional[str]],
+        concurrency: int,
+        slow_concurrency: int,
+        slow_latency: float,
+        max_queued: int,
+        smoothing: float = 0.2,
+        max_hosts: int = 10000,
+        lane: Optional[Callable[[Any], str]] = None,
+        weights: Optional[dict[str, int]] = None,
+    ):
+        self._key = key
+        self._lane = lane or (lambda _: "")
+        self._lanes = WeightedRoundRobin(weights or {})
+        self._concurrency = max(concurrency, 1)
+        self._slow_concurrency = max(min(slow_concurrency, concurrency), 1)
+        self._slow_latency = slow_latency
+        self._max_queued = max_queued
+        self._smoothing = smoothing
+        self._max_hosts = max_hosts
+        self._unkeyed: dict[str, deque[Any]] = {}
+        self._queued: dict[str, dict[str, deque[Any]]] = {}
+        self._rotation: dict[str, deque[str]] = {}
+        self._backlog: dict[str, int] = {}
+        self._in_flight: dict[str, int] = {}
+        self._latency: OrderedDict[str, float] = OrderedDict()
+        self._slow: set[str] = set()
+        self._size = 0
+        self._condition = threading.Condition()
+
+    def put(self, item: Any) -> None:
+        host, lane = self._key(item), self._lane(item)
+        with self._condition:
+            if host is None:
+                self._unkeyed.setdefault(lane, deque()).append(item)
+            else:
+                queued = self._queued.setdefault(lane, {})
+                if host not in queued:
+                    queued[host] = deque()
+                    self._rotation.setdefault(lane, deque()).append(host)
+                queued[host].append(item)
+                self._backlog[host] = self._backlog.get(host, 0) + 1
+            self._size += 1
+            self._condition.notify()
+
+    def get(self) -> Any:
+        with self._condition:
+            while (item := self._next()) is None:
+                self._condition.wait()
+            self._size -= 1
+            return item
+
+    def release(self, host: str, latency: Optional[float] = None) -> None:
+        with self._condition:
+            self._in_flight[host] -= 1
+            if not self._in_flight[host]:
+                del self._in_flight[host]
+            if latency is not None:
+                self._observe(host, latency)
+            self._record()
+            self._condition.notify_all()
+
+    def is_backlogged(self, host: str) -> bool:
+        with self._condition:
+            return 0 < self._max_queued <= self._backlog.get(host, 0)
+
+    def is_slow(self, host: str) -> bool:
+        return host in self._slow
+
+    def qsize(self) -> int:
+        return self._size
+
+    def _next(self) -> Optional[Any]:
+        waiting = [
+            lane
+            for lane in {**self._queued, **self._unkeyed}
+            if self._queued.get(lane) or self._unkeyed.get(lane)
+        ]
+        for lane in self._lanes.ranked(waiting):
+            if (item := self._next_in(lane)) is not None:
+                self._lanes.charge(lane, waiting)
+                return item
+            waiting.remove(lane)
+        return None
+
+    def _next_in(self, lane: str) -> Optional[Any]:
+        rotation, queued = self._rotation.get(lane, deque()), self._queued.get(lane, {})
+        for _ in range(len(rotation)):
+            host = rotation[0]
+            rotation.rotate(-1)
+            if self._in_flight.get(host, 0) >= self._limit(host):
+                continue
+            item = queued[host].popleft()
+            if not queued[host]:
+                del queued[host]
+                rotation.remove(host)
+            self._backlog[host] -= 1
+            if not self._backlog[host]:
+                del self._backlog[host]
+            self._in_flight[host] = self._in_flight.get(host, 0) + 1
+            return item
+        unkeyed = self._unkeyed.get(lane)
+        return unkeyed.popleft() if unkeyed else None
+
+    def _observe(self, host: str, latency: float) -> None:
+        previous = self._latency.pop(host, latency)
+        self._latency[host] = previous + self._smoothing * (latency - previous)
+        if 0 < self._slow_latency < self._latency[host]:
+            self._slow.add(host)
+        else:
+            self._slow.discard(host)
+        while len(self._latency) > self._max_hosts:
+            self._slow.discard(self._latency.popitem(last=False)[0])
+
+    def _limit(self, host: str) -> int:
+        return self._slow_concurrency if self.is_slow(host) else self._concurrency
+
+    def _record(self) -> None:
+        metrics.set_gauge("hosts.slow", len(self._slow))
+        metrics.set_gauge("hosts.queued", len(self._backlog))
+        metrics.set_gauge("hosts.in_flight", len(self._in_flight))
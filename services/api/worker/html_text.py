@@ -0,0 +1,168 @@
+import codecs
+import re
+
+from html.parser import HTMLParser
+from typing import AnyStr, Callable, Optional, Protocol, Union
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+ENGINES = ["bs4", "stdlib", "lxml"]
+SKIPPED_TAGS = {"script", "style", "template"}
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+META_CHARSET = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.I)
+SNIFF_BYTES = 1024
+NUL_REPLACEMENT = "\ufffd".encode("utf-8")
+
+
+class Extractor(Protocol):
+    def feed(self, data: str) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class TextExtractor(HTMLParser):
+    def __init__(self, on_text: Callable[[str], None], on_break: Callable[[], None]):
+        super().__init__(convert_charrefs=True)
+        self._on_text = on_text
+        self._on_break = on_break
+        self._skipping: list[str] = []
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        self._on_break()
+        if tag in SKIPPED_TAGS:
+            self._skipping.append(tag)
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        self._on_break()
+
+    def handle_endtag(self, tag: str) -> None:
+        self._on_break()
+        if tag in self._skipping:
+            while self._skipping.pop() != tag:
+                pass
+
+    def handle_data(self, data: str) -> None:
+        if not self._skipping:
+            self._on_text(data)
+
+    def handle_comment(self, data: str) -> None:
+        self._on_break()
+
+    def handle_decl(self, decl: str) -> None:
+        self._on_break()
+
+    def handle_pi(self, data: str) -> None:
+        self._on_break()
+
+    def unknown_decl(self, data: str) -> None:
+        self._on_break()
+        if data.upper().startswith("CDATA["):
+            self.handle_data(data[len("CDATA[") :])
+            self._on_break()
+
+
+class SoupExtractor:
+    def __init__(self, on_text: Callable[[str], None], on_break: Callable[[], None]):
+        self._on_text = on_text
+        self._on_break = on_break
+        self._chunks: list = []
+
+    def feed(self, data: AnyStr) -> None:
+        self._chunks.append(data)
+
+    def close(self) -> None:
+        soup = BeautifulSoup(_joined(self._chunks), "html.parser")
+        self._chunks = []
+        for string in soup.stripped_strings:
+            self._on_text(string)
+            self._on_break()
+
+
+class LxmlExtractor:
+    def __init__(self, on_text: Callable[[str], None], on_break: Callable[[], None]):
+        self._on_text = on_text
+        self._on_break = on_break
+        self._chunks: list = []
+
+    def feed(self, data: AnyStr) -> None:
+        self._chunks.append(data)
+
+    def close(self) -> None:
+        markup = _joined(self._chunks)
+        self._chunks = []
+        if isinstance(markup, str):
+            markup = markup.encode("utf-8")
+        markup = markup.replace(b"\x00", NUL_REPLACEMENT)
+        parser = etree.HTMLParser(encoding="utf-8")
+        root = etree.HTML(markup, parser) if markup else None
+        if root is not None:
+            self._walk(root, False)
+
+    def _walk(self, element: etree._Element, skipping: bool) -> None:
+        self._on_break()
+        skipped = skipping or element.tag in SKIPPED_TAGS
+        if not skipped and isinstance(element.tag, str) and element.text:
+            self._on_text(element.text)
+        for child in element:
+            self._walk(child, skipped)
+        self._on_break()
+        if not skipping and element.tail:
+            self._on_text(element.tail)
+
+
+def extractor(
+    engine: str, on_text: Callable[[str], None], on_break: Callable[[], None]
+) -> Extractor:
+    if engine == "stdlib":
+        return TextExtractor(on_text, on_break)
+    if engine == "lxml":
+        return LxmlExtractor(on_text, on_break)
+    if engine == "bs4":
+        return SoupExtractor(on_text, on_break)
+    raise ValueError(f"Unsupported text extractor: {engine}")
+
+
+def stripped_strings(content: bytes, engine: str = "bs4") -> list[str]:
+    def on_break() -> None:
+        if string := "".join(pending).strip():
+            strings.append(string)
+        pending.clear()
+
+    strings: list[str] = []
+    pending: list[str] = []
+    parser = extractor(engine, pending.append, on_break)
+    parser.feed(content if engine == "bs4" else decode(content))  # type: ignore
+    parser.close()
+    on_break()
+    return strings
+
+
+def decode(content: bytes, declared: Optional[str] = None) -> str:
+    return content.decode(sniff_encoding(content, declared), errors="replace")
+
+
+def sniff_encoding(head: bytes, declared: Optional[str] = None) -> str:
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    meta = META_CHARSET.search(head[:SNIFF_BYTES])
+    for candidate in (declared, meta and meta.group(1).decode("ascii")):
+        if not candidate:
+            continue
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+
+def _joined(chunks: list) -> Union[str, bytes]:
+    joined: Union[str, bytes] = chunks[0][:0].join(chunks) if chunks else ""
+    return joined
@@ -0,0 +1,56 @@
+import threading
+
+from collections import deque
+from typing import Any, Callable, Iterable
+
+
+class WeightedRoundRobin:
+    def __init__(self, weights: dict[str, int]):
+        self._weights = weights
+        self._current: dict[str, int] = {}
+
+    def ranked(self, lanes: Iterable[str]) -> list[str]:
+        return sorted(
+            lanes,
+            key=lambda lane: self._current.get(lane, 0) + self.weight(lane),
+            reverse=True,
+        )
+
+    def charge(self, lane: str, lanes: list[str]) -> None:
+        for waiting in lanes:
+            self._current[waiting] = self._current.get(waiting, 0) + self.weight(
+                waiting
+            )
+        self._current[lane] -= sum(map(self.weight, lanes))
+
+    def weight(self, lane: str) -> int:
+        return max(self._weights.get(lane, 1), 1)
+
+
+class LaneScheduler:
+    def __init__(self, lane: Callable[[Any], str], weights: dict[str, int]):
+        self._lane = lane
+        self._rotation = WeightedRoundRobin(weights)
+        self._queued: dict[str, deque[Any]] = {lane: deque() for lane in weights}
+        self._size = 0
+        self._condition = threading.Condition()
+
+    def put(self, item: Any) -> None:
+        lane = self._lane(item)
+        with self._condition:
+            self._queued.setdefault(lane, deque()).append(item)
+            self._size += 1
+            self._condition.notify()
+
+    def get(self) -> Any:
+        with self._condition:
+            while not self._size:
+                self._condition.wait()
+            waiting = [lane for lane, queued in self._queued.items() if queued]
+            lane = self._rotation.ranked(waiting)[0]
+            self._rotation.charge(lane, waiting)
+            self._size -= 1
+            return self._queued[lane].popleft()
+
+    def qsize(self) -> int:
+        return self._size
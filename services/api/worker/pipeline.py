@@ -0,0 +1,122 @@
+import json
+import queue
+import threading
+import time
+
+from typing import Any, Callable, NamedTuple, Optional, Protocol
+
+from common import metrics
+
+_STOP = object()
+
+
+class Stage(NamedTuple):
+    name: str
+    handler: Callable[[Any], Optional[Any]]
+    concurrency: int
+
+
+class Inbox(Protocol):
+    def put(self, item: Any) -> None:
+        ...
+
+    def get(self) -> Any:
+        ...
+
+    def qsize(self) -> int:
+        ...
+
+
+class Pipeline:
+    def __init__(
+        self,
+        stages: list[Stage],
+        queue_size: int,
+        report_interval: float,
+        inbox: Optional[Inbox] = None,
+        on_error: Optional[Callable[[Any, Exception], None]] = None,
+    ):
+        self._stages = stages
+        self._on_error = on_error
+        self._queues: list[Inbox] = [
+            inbox or queue.Queue(),
+            *(queue.Queue(maxsize=queue_size) for _ in stages[1:]),
+        ]
+        self._report_interval = report_interval
+        self._busy = [0.0] * len(stages)
+        self._reported_busy = [0.0] * len(stages)
+        self._reported_at = time.perf_counter()
+        self._lock = threading.Lock()
+        self._threads: list[list[threading.Thread]] = []
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._threads = [
+            [
+                threading.Thread(
+                    target=self._work, args=(i,), name=f"{stage.name}-{n}", daemon=True
+                )
+                for n in range(stage.concurrency)
+            ]
+            for i, stage in enumerate(self._stages)
+        ]
+        for thread in (t for threads in self._threads for t in threads):
+            thread.start()
+        if self._report_interval > 0:
+            threading.Thread(target=self._report_periodically, daemon=True).start()
+
+    def submit(self, item: Any) -> None:
+        self._queues[0].put(item)
+
+    def stop(self) -> None:
+        for stage_queue, threads in zip(self._queues, self._threads):
+            for _ in threads:
+                stage_queue.put(_STOP)
+            for thread in threads:
+                thread.join()
+        self._stopped.set()
+
+    def report(self) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            elapsed = max(now - self._reported_at, 1e-9)
+            busy, self._reported_busy = self._reported_busy, list(self._busy)
+            self._reported_at = now
+        for i, stage in enumerate(self._stages):
+            utilization = (self._reported_busy[i] - busy[i]) / (
+                elapsed * stage.concurrency
+            )
+            metrics.set_gauge(f"pipeline.{stage.name}.utilization", utilization)
+            metrics.set_gauge(
+                f"pipeline.{stage.name}.queue_depth", self._queues[i].qsize()
+            )
+
+    def _work(self, index: int) -> None:
+        stage = self._stages[index]
+        while (item := self._queues[index].get()) is not _STOP:
+            started = time.perf_counter()
+            try:
+                result = stage.handler(item)
+            except Exception as e:
+                print(f"Unexpected error in {stage.name} stage: {str(e)}", flush=True)
+                self._abandon(item, e)
+                result = None
+            with self._lock:
+                self._busy[index] += time.perf_counter() - started
+            metrics.increment(f"pipeline.{stage.name}.processed")
+            if result is not None and index + 1 < len(self._queues):
+                self._queues[index + 1].put(result)
+
+    def _abandon(self, item: Any, error: Exception) -> None:
+        if self._on_error is None:
+            return
+        try:
+            self._on_error(item, error)
+        except Exception as e:
+            print(f"Unable to abandon pipeline item: {str(e)}", flush=True)
+
+    def _report_periodically(self) -> None:
+        while not self._stopped.wait(self._report_interval):
+            self.report()
+            print(json.dumps({"metrics": metrics.snapshot()}), flush=True)
@@ -0,0 +1,80 @@
+import threading
+import time
+
+from typing import Any, Callable, Optional
+
+from common import metrics
+
+
+class ResultSink:
+    def __init__(
+        self,
+        flush: Callable[[list[Any]], None],
+        max_batch: int,
+        max_delay: float,
+    ):
+        self._flush = flush
+        self._max_batch = max(max_batch, 1)
+        self._max_delay = max_delay
+        self._pending: list[Any] = []
+        self._oldest = 0.0
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, item: Any) -> None:
+        with self._condition:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append(item)
+            if len(self._pending) in (1, self._max_batch):
+                self._condition.notify()
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while batch := self._next_batch():
+            started = time.perf_counter()
+            try:
+                self._flush(batch)
+            except Exception as e:
+                print(f"Unexpected error flushing results: {str(e)}", flush=True)
+            metrics.increment("results.batches")
+            metrics.increment("results.written", len(batch))
+            metrics.set_gauge("results.flush_seconds", time.perf_counter() - started)
+
+    def _next_batch(self) -> list[Any]:
+        with self._condition:
+            while not self._is_due():
+                if self._stopped:
+                    return []
+                self._condition.wait(self._wait_time())
+            batch = self._pending[: self._max_batch]
+            self._pending = self._pending[self._max_batch :]
+            if self._pending:
+                self._oldest = time.monotonic()
+            return batch
+
+    def _is_due(self) -> bool:
+        if not self._pending:
+            return False
+        return (
+            self._stopped
+            or len(self._pending) >= self._max_batch
+            or time.monotonic() - self._oldest >= self._max_delay
+        )
+
+    def _wait_time(self) -> Optional[float]:
+        if not self._pending:
+            return None
+        return max(self._oldest + self._max_delay - time.monotonic(), 0)
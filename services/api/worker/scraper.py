@@ -1,11 +1,132 @@
+import codecs
+import itertools
+import time
+
 import requests
 
-from bs4 import BeautifulSoup
+from email.message import Message
+from os import environ as env
+from typing import Iterator, NamedTuple, Optional
+
+from worker import html_text, sessions
+
+SCRAPER_MAX_BODY_BYTES = int(env.get("SCRAPER_MAX_BODY_BYTES", 256 * 1024 * 1024))
+SCRAPER_CHUNK_BYTES = int(env.get("SCRAPER_CHUNK_BYTES", 64 * 1024))
+SCRAPER_CONNECT_TIMEOUT = float(env.get("SCRAPER_CONNECT_TIMEOUT", 5))
+SCRAPER_READ_TIMEOUT = float(env.get("SCRAPER_READ_TIMEOUT", 30))
+SCRAPER_TOTAL_TIMEOUT = float(env.get("SCRAPER_TOTAL_TIMEOUT", 120))
+SCRAPER_POOL_HOSTS = int(env.get("SCRAPER_POOL_HOSTS", 100))
+SCRAPER_POOL_SIZE = int(env.get("SCRAPER_POOL_SIZE", 16))
+TEXT_EXTRACTOR = env.get("TEXT_EXTRACTOR", "bs4")
+session = sessions.create_session(SCRAPER_POOL_HOSTS, SCRAPER_POOL_SIZE)
+VALIDATORS = {
+    "etag": ("ETag", "If-None-Match"),
+    "last_modified": ("Last-Modified", "If-Modified-Since"),
+}
+
+
+class Page(NamedTuple):
+    content: Optional[bytes]
+    validators: dict[str, str]
+
+
+class Stream(NamedTuple):
+    chunks: Optional[Iterator[str]]
+    validators: dict[str, str]
+
+
+def fetch_page(url: str, validators: Optional[dict[str, str]] = None) -> Page:
+    with _get(url, validators) as response:
+        if response.status_code == 304:
+            return Page(None, _validators(response, validators))
+        return Page(b"".join(_iter_body(url, response)), _validators(response))
+
+
+def stream(url: str, validators: Optional[dict[str, str]] = None) -> Stream:
+    response = _get(url, validators)
+    if response.status_code == 304:
+        response.close()
+        return Stream(None, _validators(response, validators))
+    return Stream(_iter_text(url, response), _validators(response))
+
+
+def extract_text(content: bytes) -> str:
+    return " ".join(html_text.stripped_strings(content, TEXT_EXTRACTOR))
 
 
-def scrape_text(url: str) -> str:
-    response = requests.get(url, allow_redirects=True)
-    if response.status_code == 200:
-        soup = BeautifulSoup(response.content, "html.parser")
-        return " ".join(t for t in soup.stripped_strings)
+def _get(url: str, validators: Optional[dict[str, str]] = None) -> requests.Response:
+    response = session.get(
+        url,
+        allow_redirects=True,
+        stream=True,
+        timeout=(SCRAPER_CONNECT_TIMEOUT, SCRAPER_READ_TIMEOUT),
+        **({"headers": _conditional_headers(validators)} if validators else {}),
+    )
+    if response.status_code == 200 or (validators and response.status_code == 304):
+        return response
+    response.close()
     raise RuntimeError(f"Unable to scrape {url}")
+
+
+def _iter_text(url: str, response: requests.Response) -> Iterator[str]:
+    with response:
+        chunks, head = _iter_body(url, response), b""
+        while len(head) < html_text.SNIFF_BYTES and (chunk := next(chunks, b"")):
+            head += chunk
+        encoding = html_text.sniff_encoding(head, _declared_charset(response))
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        for chunk in itertools.chain([head], chunks):
+            if text := decoder.decode(chunk):
+                yield text
+        if text := decoder.decode(b"", final=True):
+            yield text
+
+
+def _iter_body(url: str, response: requests.Response) -> Iterator[bytes]:
+    def too_large() -> RuntimeError:
+        err = f"Unable to scrape {url}: body exceeds {SCRAPER_MAX_BODY_BYTES} bytes"
+        return RuntimeError(err)
+
+    def too_slow() -> RuntimeError:
+        err = f"Unable to scrape {url}: took longer than {SCRAPER_TOTAL_TIMEOUT}s"
+        return RuntimeError(err)
+
+    length = response.headers.get("content-length", "")
+    if SCRAPER_MAX_BODY_BYTES and length.isdigit():
+        if int(length) > SCRAPER_MAX_BODY_BYTES:
+            raise too_large()
+    received, started = 0, time.monotonic()
+    for chunk in response.iter_content(SCRAPER_CHUNK_BYTES):
+        received += len(chunk)
+        if SCRAPER_MAX_BODY_BYTES and received > SCRAPER_MAX_BODY_BYTES:
+            raise too_large()
+        if SCRAPER_TOTAL_TIMEOUT and time.monotonic() - started > SCRAPER_TOTAL_TIMEOUT:
+            raise too_slow()
+        yield chunk
+
+
+def _declared_charset(response: requests.Response) -> Optional[str]:
+    message = Message()
+    message["content-type"] = response.headers.get("content-type", "")
+    return message.get_content_charset()
+
+
+def _conditional_headers(validators: dict[str, str]) -> dict[str, str]:
+    return {
+        request_header: validators[key]
+        for key, (_, request_header) in VALIDATORS.items()
+        if validators.get(key)
+    }
+
+
+def _validators(
+    response: requests.Response, previous: Optional[dict[str, str]] = None
+) -> dict[str, str]:
+    return {
+        **(previous or {}),
+        **{
+            key: response.headers[response_header]
+            for key, (response_header, _) in VALIDATORS.items()
+            if response.headers.get(response_header)
+        },
+    }
@@ -0,0 +1,94 @@
+import functools
+import threading
+
+from collections import OrderedDict
+from http.cookiejar import DefaultCookiePolicy
+from typing import Any
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from common import metrics
+
+
+class HostMetrics:
+    def __init__(self, max_hosts: int):
+        self._max_hosts = max(max_hosts, 1)
+        self._hosts: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def increment(self, host: str, name: str) -> None:
+        self._touch(host)
+        metrics.increment(f"scraper.{host}.{name}")
+
+    def set_gauge(self, host: str, name: str, value: float) -> None:
+        self._touch(host)
+        metrics.set_gauge(f"scraper.{host}.{name}", value)
+
+    def _touch(self, host: str) -> None:
+        with self._lock:
+            self._hosts.pop(host, None)
+            self._hosts[host] = None
+            evicted = [
+                self._hosts.popitem(last=False)[0]
+                for _ in range(len(self._hosts) - self._max_hosts)
+            ]
+        for stale in evicted:
+            metrics.discard(f"scraper.{stale}.")
+
+
+class _CountingPool:
+    host: str
+    num_connections: int
+    num_requests: int
+
+    def __init__(self, *args: Any, host_metrics: HostMetrics, **kwargs: Any):
+        super().__init__(*args, **kwargs)  # type: ignore
+        self._host_metrics = host_metrics
+
+    def _new_conn(self) -> Any:
+        self._host_metrics.increment(self.host, "connections")
+        return super()._new_conn()  # type: ignore
+
+    def urlopen(self, *args: Any, **kwargs: Any) -> Any:
+        response = super().urlopen(*args, **kwargs)  # type: ignore
+        self._host_metrics.increment(self.host, "requests")
+        self._host_metrics.set_gauge(
+            self.host,
+            "reuse_ratio",
+            1 - self.num_connections / max(self.num_requests, 1),
+        )
+        return response
+
+
+class CountingHTTPConnectionPool(_CountingPool, HTTPConnectionPool):
+    pass
+
+
+class CountingHTTPSConnectionPool(_CountingPool, HTTPSConnectionPool):
+    pass
+
+
+class PooledAdapter(HTTPAdapter):
+    def init_poolmanager(self, connections: int, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(connections, *args, **kwargs)
+        host_metrics = HostMetrics(connections)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": functools.partial(
+                CountingHTTPConnectionPool, host_metrics=host_metrics
+            ),
+            "https": functools.partial(
+                CountingHTTPSConnectionPool, host_metrics=host_metrics
+            ),
+        }
+
+
+def create_session(pool_hosts: int, pool_size: int) -> requests.Session:
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = PooledAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
@@ -1,10 +1,105 @@
+import hashlib
 import re
+import string
 
 from collections import Counter
+from concurrent.futures import Executor
+from typing import Any
 
 
 WORDS = re.compile(r"(\w[\w']*\w|\w)")
+SEPARATOR = re.compile(r"\s")
+ASCII_WORD_CHARS = string.ascii_lowercase + string.digits + "_'"
+ASCII_TABLE = bytes(
+    ord(chr(b).lower()) if chr(b).lower() in ASCII_WORD_CHARS else ord(" ")
+    for b in range(256)
+)
+CHUNK_CHARS = 4 * 1024 * 1024
 
 
 def build(string: str) -> dict[str, int]:
-    return dict(Counter(WORDS.findall(string.lower())))
+    return dict(count(string))
+
+
+def build_parallel(
+    string: str, executor: Executor, chunk_chars: int = CHUNK_CHARS
+) -> dict[str, int]:
+    chunks = split(string, chunk_chars)
+    if len(chunks) == 1:
+        return build(string)
+    total: Counter[str] = Counter()
+    for partial in executor.map(count, chunks):
+        total.update(partial)
+    return dict(total)
+
+
+def count(string: str) -> Counter[str]:
+    if not string.isascii():
+        return Counter(WORDS.findall(string.lower()))
+    counts: Counter[str] = Counter()
+    runs = Counter(string.encode("ascii").translate(ASCII_TABLE).split())
+    for run, occurrences in runs.items():
+        if word := run.strip(b"'"):
+            counts[word.decode("ascii")] += occurrences
+    return counts
+
+
+def fingerprint(string: str) -> str:
+    digest = hashlib.sha256()
+    _digest(digest, string)
+    return digest.hexdigest()
+
+
+def split(string: str, chunk_chars: int) -> list[str]:
+    chunks, start = [], 0
+    while len(string) - start > chunk_chars:
+        separator = SEPARATOR.search(string, start + chunk_chars)
+        if separator is None:
+            break
+        chunks.append(string[start : separator.end()])
+        start = separator.end()
+    chunks.append(string[start:])
+    return chunks
+
+
+class WordCounter:
+    def __init__(self) -> None:
+        self._counts: Counter[str] = Counter()
+        self._carry: list[str] = []
+        self._digest = hashlib.sha256()
+
+    def feed(self, text: str) -> None:
+        cut = _separator_tail(text)
+        if cut == 0:
+            self._carry.append(text)
+            return
+        self._count("".join([*self._carry, text[:cut]]))
+        self._carry = [text[cut:]]
+
+    def flush(self) -> None:
+        self._count("".join(self._carry))
+        self._carry = []
+
+    def histogram(self) -> dict[str, int]:
+        self.flush()
+        return dict(self._counts)
+
+    def fingerprint(self) -> str:
+        self.flush()
+        return self._digest.hexdigest()
+
+    def _count(self, text: str) -> None:
+        self._counts.update(count(text))
+        _digest(self._digest, text)
+
+
+def _separator_tail(text: str) -> int:
+    cut = len(text)
+    while cut and not text[cut - 1].isspace():
+        cut -= 1
+    return cut
+
+
+def _digest(digest: Any, string: str) -> None:
+    if words := " ".join(string.split()):
+        digest.update(words.encode() + b" ")